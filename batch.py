@@ -0,0 +1,312 @@
+# Profiles many CSV/XLSX files outside the web app: charts and insights of
+# each file are written as JSON, one file per dataset, by a pool of worker
+# processes. Finished files are recorded in <output>/manifest.jsonl, so an
+# interrupted run picks up where it stopped.
+#
+#   python batch.py "exports/*.csv" --output profiles
+#   python batch.py exports/ --workers 8 --memory-limit 4096 --top 20
+#   python batch.py exports/ --output profiles --force   # redo finished files
+
+import argparse
+import concurrent.futures as cf
+import glob
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data import STREAMING_THRESHOLD, EXCEL_STREAMING_THRESHOLD, CHUNK_SIZE
+from utils.cache import hash_file
+from utils.chart_generator import generate_charts, charts_from_accumulator, CHARTS_VERSION
+from utils.dtypes import optimize_dtypes
+from utils.excel import read_excel_sheets, profile_excel_in_chunks
+from utils.executor import make_executor
+from utils.insights import generate_insights, insights_from_accumulator, INSIGHTS_VERSION
+from utils.metrics import begin_trace, end_trace, span
+from utils.profile import profile_dataset
+from utils.streaming import profile_csv_in_chunks
+
+EXTENSIONS = ('.csv', '.xlsx')
+MANIFEST = 'manifest.jsonl'
+CHART_OPTIONS = {'scatter_mode': 'sample'}
+# Seconds one chart or insight task may run before its placeholder is used
+TASK_TIMEOUT = 120.0
+# Threads per worker process running a file's chart and insight tasks, so
+# TASK_TIMEOUT can be enforced
+TASK_THREADS = 2
+
+
+def find_files(sources):
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for root, _, names in os.walk(source):
+                paths.update(os.path.join(root, name) for name in names if name.lower().endswith(EXTENSIONS))
+        else:
+            paths.update(path for path in glob.glob(source, recursive=True)
+                         if os.path.isfile(path) and path.lower().endswith(EXTENSIONS))
+    return sorted(paths)
+
+
+# Caps the data segment of each worker, so a dataset too large for its share
+# of memory fails with MemoryError instead of starving the other workers
+def limit_memory(megabytes):
+    if not megabytes:
+        return
+    import resource
+    limit = megabytes * 2**20
+    kind = resource.RLIMIT_DATA if hasattr(resource, 'RLIMIT_DATA') else resource.RLIMIT_AS
+    resource.setrlimit(kind, (limit, limit))
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def output_name(path, content_hash, compress):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{content_hash[:12]}.json" + (".gz" if compress else "")
+
+
+def build_result(path, sheets, streaming):
+    is_csv = path.lower().endswith('.csv')
+    if streaming:
+        with span('stream_profile'):
+            if is_csv:
+                acc = profile_csv_in_chunks(path, CHUNK_SIZE)
+            else:
+                acc = profile_excel_in_chunks(path, sheets, CHUNK_SIZE)
+        with span('charts'):
+            charts = charts_from_accumulator(acc)
+        with span('insights'):
+            insights = insights_from_accumulator(acc)
+        return {"features": list(acc.columns), "rows": acc.rows, "charts": charts, "insights": insights,
+                "complete": True}
+    with span('read'):
+        df = pd.read_csv(path) if is_csv else read_excel_sheets(path, sheets)
+    with span('optimize_dtypes'):
+        df, _ = optimize_dtypes(df)
+    with span('profile'):
+        profile = profile_dataset(df)
+    chart_report = {}
+    insight_report = {}
+    # Deadlines only apply to tasks on a pool. A task past its deadline keeps
+    # its thread, which the worker process takes down when it exits.
+    executor = make_executor('thread', TASK_THREADS)
+    try:
+        with span('charts'):
+            charts = generate_charts(df, profile, executor, TASK_TIMEOUT, chart_report, **CHART_OPTIONS)
+        with span('insights'):
+            insights = generate_insights(df, profile, executor, TASK_TIMEOUT, insight_report)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return {"features": list(df.columns), "rows": len(df), "charts": charts, "insights": insights,
+            "complete": not chart_report["timeouts"] and not insight_report["timeouts"]}
+
+
+# Runs in a worker process. Returns the manifest entry of `path`; failures
+# are reported in it rather than raised.
+def profile_file(path, output, sheets=None, compress=False):
+    stat = os.stat(path)
+    entry = {"path": path, "size": stat.st_size, "mtime": stat.st_mtime,
+             "charts_version": CHARTS_VERSION, "insights_version": INSIGHTS_VERSION}
+    threshold = STREAMING_THRESHOLD if path.lower().endswith('.csv') else EXCEL_STREAMING_THRESHOLD
+    streaming = stat.st_size > threshold
+    trace = begin_trace()
+    try:
+        with span('hash'):
+            content_hash = hash_file(path)
+        result = build_result(path, sheets, streaming)
+        with span('write'):
+            name = output_name(path, content_hash, compress)
+            document = dict(result, source=path, content_hash=content_hash, streaming=streaming)
+            target = os.path.join(output, name)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with (gzip.open if compress else open)(tmp, 'wt') as f:
+                f.write(json.dumps(document, default=_json_default))
+            os.replace(tmp, target)
+        entry.update(status="done", output=name, content_hash=content_hash, rows=result["rows"],
+                     charts=len(result["charts"]), complete=result["complete"])
+    except MemoryError:
+        entry.update(status="failed", error="memory limit exceeded")
+    except Exception as e:
+        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+    finally:
+        end_trace(trace)
+    entry["seconds"] = trace.elapsed()
+    entry["stages"] = {name: round(stage["seconds"], 4) for name, stage in trace.spans.items()}
+    return entry
+
+
+# Latest entry per path, from a previous run's manifest
+def load_manifest(path):
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            entries[entry["path"]] = entry
+    return entries
+
+
+# Finished with the same file (size and mtime) and generator versions
+def is_current(entry, path):
+    if entry is None or entry.get("status") != "done":
+        return False
+    stat = os.stat(path)
+    return (entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+            and entry.get("charts_version") == CHARTS_VERSION
+            and entry.get("insights_version") == INSIGHTS_VERSION)
+
+
+# Queue of the paths this worker process has started, set by _init_worker
+_started = None
+
+
+def _init_worker(memory_limit, started):
+    global _started
+    _started = started
+    limit_memory(memory_limit)
+
+
+# Runs in a worker process: records that `path` started before profiling it,
+# so a file that kills its worker can be told from those it took down with it
+def _profile_started(profile, path, *args):
+    _started.put(path)
+    return profile(path, *args)
+
+
+# (path, manifest entry) as each file finishes; the entry is None for files
+# lost when a worker died, which breaks the whole pool. Paths that reached a
+# worker are added to `started`.
+def _run_pool(paths, workers, memory_limit, output, sheets, compress, started, profile=profile_file):
+    context = multiprocessing.get_context('spawn')
+    queue = context.SimpleQueue()
+
+    def drain():
+        while not queue.empty():
+            started.add(queue.get())
+
+    # One process per file: memory returns to the OS between files and a
+    # worker killed for memory takes down only the files still in the pool
+    try:
+        with cf.ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                    initargs=(memory_limit, queue), max_tasks_per_child=1) as pool:
+            futures = {pool.submit(_profile_started, profile, path, output, sheets, compress): path
+                       for path in paths}
+            for future in cf.as_completed(futures):
+                # Read as files finish, so the pipe never fills up
+                drain()
+                try:
+                    yield futures[future], future.result()
+                except cf.process.BrokenProcessPool:
+                    yield futures[future], None
+    finally:
+        drain()
+        queue.close()
+
+
+def run(paths, output, workers, memory_limit, sheets=None, compress=False, profile=profile_file):
+    entries = []
+    # Largest first, so one big file does not start last and hold up the run
+    paths = sorted(paths, key=os.path.getsize, reverse=True)
+    with open(os.path.join(output, MANIFEST), 'a') as manifest:
+        def record(entry):
+            entries.append(entry)
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            print(f"[{len(entries)}] {entry['status']:6} {entry['path']}", flush=True)
+
+        # When a worker dies, the files that were running are suspects and
+        # each is rerun alone; the files that had not started go to a fresh
+        # pool. Each broken pool adds at least the file that broke it to the
+        # suspects, so this ends.
+        suspects = []
+        while paths:
+            started = set()
+            lost = []
+            for path, entry in _run_pool(paths, workers, memory_limit, output, sheets, compress, started, profile):
+                if entry is None:
+                    lost.append(path)
+                else:
+                    record(entry)
+            suspects.extend(path for path in lost if path in started)
+            paths = [path for path in lost if path not in started]
+        for path in suspects:
+            entry = None
+            for _, entry in _run_pool([path], 1, memory_limit, output, sheets, compress, set(), profile):
+                pass
+            record(entry or {"path": path, "status": "failed", "error": "worker process died",
+                             "seconds": None, "stages": {}})
+    return entries
+
+
+def print_summary(entries, skipped, wall, top):
+    done = [e for e in entries if e["status"] == "done"]
+    failed = [e for e in entries if e["status"] != "done"]
+    print()
+    print(f"{len(done)} profiled, {len(failed)} failed, {skipped} already done, in {wall:.1f}s")
+    timed = sorted((e for e in entries if e.get("seconds") is not None), key=lambda e: e["seconds"], reverse=True)
+    if timed:
+        print()
+        print(f"Slowest files (of {len(timed)}):")
+        for entry in timed[:top]:
+            stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in
+                               sorted(entry["stages"].items(), key=lambda item: item[1], reverse=True)[:3])
+            rows = entry.get("rows")
+            print(f"  {entry['seconds']:8.2f}s {rows if rows is not None else '-':>10} rows  {entry['path']}  ({stages})")
+    for entry in failed:
+        print(f"  failed: {entry['path']}: {entry['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile CSV/XLSX files into chart and insight JSON.")
+    parser.add_argument('sources', nargs='+', help="directories (searched recursively) or glob patterns")
+    parser.add_argument('--output', default='profiles', help="directory for the JSON results and the manifest")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--memory-limit', type=int, default=None, metavar='MB',
+                        help="memory ceiling per worker, in MB")
+    parser.add_argument('--sheet', action='append', dest='sheets', help="workbook sheet to profile (repeatable)")
+    parser.add_argument('--compress', action='store_true', help="write gzipped JSON")
+    parser.add_argument('--force', action='store_true', help="profile files the manifest lists as done")
+    parser.add_argument('--top', type=int, default=10, help="slowest files to list in the summary")
+    parser.add_argument('--summary', help="also write every file's timings as JSON to this path")
+    args = parser.parse_args(argv)
+
+    paths = find_files(args.sources)
+    if not paths:
+        print("No CSV or XLSX files found.", file=sys.stderr)
+        return 2
+    os.makedirs(args.output, exist_ok=True)
+    previous = {} if args.force else load_manifest(os.path.join(args.output, MANIFEST))
+    todo = [path for path in paths if not is_current(previous.get(path), path)]
+    skipped = len(paths) - len(todo)
+
+    started = time.perf_counter()
+    entries = run(todo, args.output, args.workers, args.memory_limit, args.sheets, args.compress)
+    wall = time.perf_counter() - started
+    print_summary(entries, skipped, wall, args.top)
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump({"wall": wall, "skipped": skipped, "files": entries}, f, indent=1)
+    return 1 if any(entry["status"] != "done" for entry in entries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
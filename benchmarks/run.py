@@ -0,0 +1,282 @@
+# Benchmarks chart, insight and upload performance on synthetic datasets
+# (benchmarks/synthetic.py) and checks the results against stored baselines.
+#
+#   python -m benchmarks.run                    # every case, fails on regressions
+#   python -m benchmarks.run --cases wide --skip-e2e
+#   python -m benchmarks.run --update-baseline  # record this machine's numbers
+#
+# Baselines hold absolute timings, so record them on the machine that checks them.
+
+import argparse
+import concurrent.futures as cf
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import pandas as pd
+
+from benchmarks.synthetic import CASES, make_case
+from utils.chart_generator import chart_tasks
+from utils.dtypes import optimize_dtypes
+from utils.insights import insight_tasks
+from utils.profile import profile_dataset
+
+BASELINE_FILE = os.path.join(REPO_ROOT, 'benchmarks', 'baselines.json')
+# Same as the default app.config['CHART_OPTIONS'] in data.py
+CHART_OPTIONS = {'scatter_mode': 'sample'}
+# Allowed growth over the baseline before a metric counts as a regression
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+BYTES_TOLERANCE = 0.1
+# Wall time changes smaller than this are noise, whatever the ratio
+MIN_TIME_DELTA = 0.02
+QUICK_SCALE = 0.1
+
+# Used when the checkout has no dashboard.html; serializes what the real
+# template is given so payload sizes stay comparable
+FALLBACK_TEMPLATE = ('{{ {"messages": get_flashed_messages(), "features": features, '
+                     '"charts": charts, "insights": insights}|tojson }}')
+
+
+# Peak resident set of this process in bytes, or None when unavailable. On
+# Linux VmHWM is read rather than ru_maxrss, which survives exec and would
+# report the benchmark runner's own peak in its spawned children.
+def peak_rss():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        return None
+
+
+def payload_bytes(results):
+    return len(json.dumps(results, default=str).encode())
+
+
+# Best wall time of `repeat` calls, then one more call under tracemalloc for
+# the peak of Python and NumPy allocations (tracing slows the call, so it is
+# never timed)
+def measure(fn, repeat=3):
+    walls = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        walls.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {"wall": min(walls), "peak_alloc": peak}
+
+
+def _run_group(tasks):
+    return [item for task in tasks for item in task.fn(*task.args)]
+
+
+# One entry per load step, chart kind and insight section. Chart tasks of the
+# same kind (every histogram, say) are timed together.
+def microbenchmarks(csv_path, repeat=3):
+    results = {}
+    df, results["read_csv"] = measure(lambda: pd.read_csv(csv_path), repeat)
+    (df, _), results["optimize_dtypes"] = measure(lambda: optimize_dtypes(df), repeat)
+    profile, results["profile"] = measure(lambda: profile_dataset(df), repeat)
+
+    groups = defaultdict(list)
+    for task in chart_tasks(df, profile, **CHART_OPTIONS):
+        groups[f"chart/{task.fn.__name__.replace('_chart', '')}"].append(task)
+    for task in insight_tasks(profile):
+        groups[f"insight/{task.fn.__name__.replace('_section', '')}"].append(task)
+    for name, tasks in groups.items():
+        output, results[name] = measure(lambda: _run_group(tasks), repeat)
+        results[name]["payload_bytes"] = payload_bytes(output)
+        results[name]["items"] = len(output)
+    return results
+
+
+# Runs in a fresh process per case so peak RSS belongs to that upload alone.
+# The app is imported from `workdir`, where it keeps its uploads and cache.
+def upload_benchmark(csv_path, workdir):
+    os.chdir(workdir)
+    from jinja2 import ChoiceLoader, DictLoader
+    import data
+
+    data.app.jinja_loader = ChoiceLoader([data.app.jinja_loader,
+                                          DictLoader({'dashboard.html': FALLBACK_TEMPLATE})])
+    client = data.app.test_client()
+    import_rss = peak_rss()
+
+    def upload():
+        with open(csv_path, 'rb') as f:
+            started = time.perf_counter()
+            response = client.post('/dashboard.html', data={'dataset': (f, os.path.basename(csv_path))},
+                                   content_type='multipart/form-data')
+            return response, time.perf_counter() - started
+
+    response, wall = upload()
+    # The same file again is answered from the result cache
+    cached, wall_cached = upload()
+    metrics = {"wall": wall, "wall_cached": wall_cached, "payload_bytes": len(response.data),
+               "peak_rss": peak_rss(), "import_rss": import_rss, "status": response.status_code}
+    try:
+        page = json.loads(response.data)
+        metrics.update(charts=len(page["charts"]), insights=len(page["insights"]), errors=page["messages"])
+    except ValueError:
+        pass  # the real template, not the fallback
+    return metrics
+
+
+def run_suite(cases, scale, repeat, micro=True, e2e=True):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in cases:
+            csv_path = os.path.join(workdir, f"{name}.csv")
+            make_case(name, scale).to_csv(csv_path, index=False)
+            upload_size = os.path.getsize(csv_path)
+            print(f"{name}: {upload_size / 2**20:.1f} MB CSV", flush=True)
+            if micro:
+                for bench, metrics in microbenchmarks(csv_path, repeat).items():
+                    results[f"micro/{name}/{bench}"] = metrics
+            if e2e:
+                case_dir = os.path.join(workdir, name)
+                os.mkdir(case_dir)
+                context = multiprocessing.get_context('spawn')
+                with cf.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    metrics = pool.submit(upload_benchmark, csv_path, case_dir).result()
+                metrics["upload_size"] = upload_size
+                results[f"e2e/{name}"] = metrics
+    return results
+
+
+def _tolerance(metric, tolerances):
+    if metric.startswith('wall'):
+        return tolerances["time"]
+    if metric.startswith('peak'):
+        return tolerances["memory"]
+    if metric.endswith('bytes'):
+        return tolerances["bytes"]
+    return None
+
+
+# (key, metric, baseline, current) for every metric past its tolerance
+def regressions(results, baselines, tolerances):
+    found = []
+    for key, metrics in results.items():
+        for metric, current in metrics.items():
+            baseline = baselines.get(key, {}).get(metric)
+            tolerance = _tolerance(metric, tolerances)
+            if tolerance is None or not isinstance(current, (int, float)) or not baseline:
+                continue
+            if metric.startswith('wall') and current - baseline < MIN_TIME_DELTA:
+                continue
+            if current > baseline * (1 + tolerance):
+                found.append((key, metric, baseline, current))
+    return found
+
+
+def _format(metric, value):
+    if metric.startswith('wall'):
+        return f"{value:.3f}s"
+    if metric.startswith('peak') or metric.endswith(('bytes', 'rss', 'size')):
+        return f"{value / 2**20:.2f}MB"
+    return str(value)
+
+
+def print_results(results):
+    for key, metrics in results.items():
+        shown = " ".join(f"{metric}={_format(metric, value)}" for metric, value in metrics.items()
+                         if value is not None and metric != 'errors')
+        print(f"{key:48} {shown}")
+        if metrics.get("errors"):
+            print(f"{'':48} errors: {metrics['errors']}")
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(path, results, scale):
+    stored = load_baselines(path)
+    if stored is None or stored.get("scale") != scale:
+        stored = {"scale": scale, "results": {}}
+    stored["results"].update(results)
+    with open(path, 'w') as f:
+        json.dump(stored, f, indent=1, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark profiling, charts, insights and uploads "
+                                                 "on synthetic datasets.")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplies every case's row count")
+    parser.add_argument('--quick', action='store_true', help=f"shorthand for --scale {QUICK_SCALE} --repeat 1")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per microbenchmark (best is kept)")
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-e2e', action='store_true')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store these results as the baseline instead of checking against it")
+    parser.add_argument('--output', help="also write the results as JSON to this path")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--bytes-tolerance', type=float, default=BYTES_TOLERANCE)
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.scale, args.repeat = QUICK_SCALE, 1
+
+    results = run_suite(args.cases, args.scale, args.repeat, not args.skip_micro, not args.skip_e2e)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"scale": args.scale, "results": results}, f, indent=1, sort_keys=True)
+
+    if args.update_baseline:
+        save_baselines(args.baseline, results, args.scale)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    stored = load_baselines(args.baseline)
+    if stored is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    if stored["scale"] != args.scale:
+        print(f"Baseline was recorded at --scale {stored['scale']}; not comparable with --scale {args.scale}.")
+        return 2
+    tolerances = {"time": args.time_tolerance, "memory": args.memory_tolerance, "bytes": args.bytes_tolerance}
+    found = regressions(results, stored["results"], tolerances)
+    for key, metric, baseline, current in found:
+        print(f"REGRESSION {key} {metric}: {_format(metric, baseline)} -> {_format(metric, current)}")
+    if found:
+        return 1
+    print(f"No regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
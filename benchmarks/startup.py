@@ -0,0 +1,93 @@
+# Cold start of the app: import time per module (python -X importtime) and
+# the latency of a fresh process's first requests.
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --top 40 --output startup.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter; prints one JSON line of timings in seconds
+FIRST_REQUEST_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+import data
+imported = time.perf_counter()
+app = data.create_app(preload=True)
+preloaded = time.perf_counter()
+client = app.test_client()
+client.get('/cache/stats')
+first = time.perf_counter()
+client.get('/cache/stats')
+second = time.perf_counter()
+print(json.dumps({"import": imported - started, "preload": preloaded - imported,
+                  "first_request": first - preloaded, "second_request": second - first}))
+'''
+
+
+def _run(args, workdir):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable] + args, cwd=workdir, env=env, capture_output=True, text=True, check=True)
+
+
+# (module, self seconds, cumulative seconds, depth) for every module `import data` loads
+def import_times(workdir):
+    modules = []
+    for line in _run(['-X', 'importtime', '-c', 'import data'], workdir).stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return modules
+
+
+def request_times(workdir):
+    return json.loads(_run(['-c', FIRST_REQUEST_SCRIPT], workdir).stdout.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time per module and first-request latency.")
+    parser.add_argument('--top', type=int, default=25, help="slowest modules to list, by cumulative time")
+    parser.add_argument('--repeat', type=int, default=3, help="fresh processes per measurement (best is kept)")
+    parser.add_argument('--output', help="also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [import_times(workdir) for _ in range(args.repeat)]
+        best = {}
+        for modules in runs:
+            for name, self_time, cumulative, depth in modules:
+                if name not in best or cumulative < best[name][1]:
+                    best[name] = (self_time, cumulative, depth)
+        requests = [request_times(workdir) for _ in range(args.repeat)]
+    timings = {key: min(run[key] for run in requests) for key in requests[0]}
+
+    print(f"{'module':48} {'self':>9} {'cumulative':>11}")
+    slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_time, cumulative, depth) in slowest:
+        print(f"{'  ' * depth + name:48} {self_time * 1000:8.1f}ms {cumulative * 1000:10.1f}ms")
+    print()
+    own = {name: times for name, times in best.items() if name == 'data' or name.startswith('utils.')}
+    print("Repository modules (self time):")
+    for name, (self_time, _, _) in sorted(own.items(), key=lambda item: item[1][0], reverse=True):
+        print(f"  {name:46} {self_time * 1000:8.1f}ms")
+    print()
+    for key, seconds in timings.items():
+        print(f"{key:48} {seconds * 1000:8.1f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"modules": {name: {"self": s, "cumulative": c} for name, (s, c, _) in best.items()},
+                       "startup": timings}, f, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Share of columns of each kind; normalized, so only the ratios matter
+DEFAULT_MIX = {"float": 0.4, "int": 0.2, "category": 0.2, "text": 0.1, "datetime": 0.05, "bool": 0.05}
+COLUMN_KINDS = tuple(DEFAULT_MIX)
+
+WORDS = np.array(["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+                  "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa"])
+
+
+# How many columns of each kind `columns` splits into, largest remainders first
+def column_counts(columns, mix=None):
+    mix = DEFAULT_MIX if mix is None else mix
+    unknown = set(mix) - set(COLUMN_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown column kinds {sorted(unknown)}, expected some of {COLUMN_KINDS}")
+    total = sum(mix.values())
+    shares = {kind: columns * weight / total for kind, weight in mix.items()}
+    counts = {kind: int(share) for kind, share in shares.items()}
+    by_remainder = sorted(shares, key=lambda kind: shares[kind] - counts[kind], reverse=True)
+    for kind in by_remainder[:columns - sum(counts.values())]:
+        counts[kind] += 1
+    return counts
+
+
+def _column(kind, rows, cardinality, rng, shared):
+    if kind == "float":
+        # Half the float columns follow a common factor so correlations exist
+        noise = rng.normal(size=rows)
+        return shared * rng.uniform(-1, 1) + noise if rng.random() < 0.5 else noise * rng.lognormal()
+    if kind == "int":
+        return rng.integers(0, max(cardinality, 2), rows)
+    if kind == "category":
+        # Zipf-like frequencies, like most real categorical columns
+        weights = 1.0 / np.arange(1, cardinality + 1)
+        labels = np.array([f"cat_{i}" for i in range(cardinality)])
+        return labels[rng.choice(cardinality, rows, p=weights / weights.sum())]
+    if kind == "text":
+        first = WORDS[rng.integers(0, len(WORDS), rows)]
+        second = WORDS[rng.integers(0, len(WORDS), rows)]
+        return np.char.add(np.char.add(first, " "), np.char.add(second, rng.integers(0, cardinality, rows).astype(str)))
+    if kind == "datetime":
+        start = np.datetime64("2020-01-01")
+        return start + np.sort(rng.integers(0, 5 * 365 * 24, rows)).astype("timedelta64[h]")
+    if kind == "bool":
+        return rng.random(rows) < rng.uniform(0.05, 0.95)
+    raise ValueError(f"Unknown column kind '{kind}'")
+
+
+# A reproducible frame of `rows` x `columns` with the given mix of column
+# kinds. `null_ratio` of each column's cells are blanked at random and
+# `cardinality` bounds the distinct values of int, category and text columns.
+def make_dataset(rows, columns, mix=None, null_ratio=0.0, cardinality=20, seed=0):
+    rng = np.random.default_rng(seed)
+    shared = rng.normal(size=rows)
+    data = {}
+    for kind, count in column_counts(columns, mix).items():
+        for n in range(count):
+            values = pd.Series(_column(kind, rows, cardinality, rng, shared))
+            if null_ratio > 0:
+                values = values.mask(rng.random(rows) < null_ratio)
+            data[f"{kind}_{n}"] = values
+    return pd.DataFrame(data)
+
+
+# Named shapes the benchmark suite runs, each stressing a different axis
+CASES = {
+    "narrow": dict(rows=20_000, columns=8),
+    "tall": dict(rows=200_000, columns=8),
+    "wide": dict(rows=5_000, columns=120),
+    "sparse": dict(rows=20_000, columns=12, null_ratio=0.4),
+    "high_cardinality": dict(rows=20_000, columns=12, cardinality=10_000),
+    "text_heavy": dict(rows=20_000, columns=12, mix={"text": 0.6, "category": 0.3, "float": 0.1}),
+    "numeric_only": dict(rows=50_000, columns=24, mix={"float": 0.8, "int": 0.2}),
+}
+
+
+def make_case(name, scale=1.0, seed=0):
+    params = dict(CASES[name])
+    params["rows"] = max(int(params["rows"] * scale), 10)
+    return make_dataset(seed=seed, **params)
@@ -1,29 +1,542 @@
 
-from flask import Flask, render_template,send_from_directory, request, redirect, url_for, session, flash, jsonify
-import numpy as np
-import cv2
-import base64
+from flask import Flask, Response, stream_with_context, render_template,send_from_directory, request, redirect, url_for, session, flash, jsonify
+import importlib
 import os
+import threading
+import uuid
 from werkzeug.utils import secure_filename
 import pandas as pd
 
-from utils.chart_generator import generate_charts
-from utils.insights import generate_insights
+from utils.chart_generator import chart_tasks, charts_from_accumulator, CHARTS_VERSION
+from utils.insights import generate_insights, insight_tasks, insights_from_accumulator, INSIGHTS_VERSION
+from utils.streaming import DatasetAccumulator, profile_csv_in_chunks, CHUNK_SIZE
+from utils.profile import profile_dataset
+from utils.cache import ResultCache, options_fingerprint
+from utils.executor import make_executor, run_tasks, iter_tasks, TASK_TIMEOUT
+from utils.datasets import DatasetRegistry, LazyChartSet
+from utils.jobs import JobQueue, JOB_WORKERS
+from utils.columnar import ColumnarStore, STORE_FOLDER
+from utils.dtypes import optimize_dtypes, DTYPES_VERSION
+from utils.preprocessing import preprocess_dataset, preprocess_chunks, preprocess_csv_in_chunks
+from utils.excel import list_sheets, read_excel_sheets, iter_excel_chunks, profile_excel_in_chunks
+from utils.timeseries import build_pyramid, series_columns, window_json
+from utils.incremental import ProfileStateStore, extend_profile
+from utils.uploads import UploadStore, QuotaExceeded, USER_QUOTA_BYTES, TOTAL_QUOTA_BYTES, UPLOAD_TTL
+from utils.decimation import LINE_MAX_POINTS
+from utils.metrics import MetricsRegistry, begin_trace, end_trace, current_trace, span, set_rows, record_tasks
 
 app = Flask(__name__)
 app.secret_key = 'manjal'
 
 UPLOAD_FOLDER = 'uploads'
+CACHE_FOLDER = 'cache'
 ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
+# CSV uploads larger than this are profiled chunk by chunk instead of loaded whole
+STREAMING_THRESHOLD = 200 * 1024 * 1024
+# Same for workbooks, which are compressed and far slower to parse per byte
+EXCEL_STREAMING_THRESHOLD = 50 * 1024 * 1024
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-if not os.path.exists(UPLOAD_FOLDER):
-    os.mkdir(UPLOAD_FOLDER)
+# Index of the deduplicated uploads (utils.uploads), and the bytes each owner
+# and the whole store may hold before least recently used uploads are evicted
+app.config['UPLOAD_DB'] = os.path.join(UPLOAD_FOLDER, 'index.sqlite3')
+app.config['UPLOAD_USER_QUOTA'] = USER_QUOTA_BYTES
+app.config['UPLOAD_TOTAL_QUOTA'] = TOTAL_QUOTA_BYTES
+app.config['UPLOAD_TTL'] = UPLOAD_TTL
+app.config['STREAMING_THRESHOLD'] = STREAMING_THRESHOLD
+app.config['EXCEL_STREAMING_THRESHOLD'] = EXCEL_STREAMING_THRESHOLD
+# Profile every upload chunk by chunk, as if it were over the thresholds:
+# histograms, quantiles and distinct counts become approximate but memory
+# stays bounded. A single upload opts in with the form field approximate=1.
+app.config['APPROXIMATE_PROFILES'] = False
+app.config['CSV_CHUNK_SIZE'] = CHUNK_SIZE
+app.config['CACHE_FOLDER'] = CACHE_FOLDER
+# Keyword arguments forwarded to generate_charts (bin_rule, scatter_mode, ...)
+app.config['CHART_OPTIONS'] = {'scatter_mode': 'sample'}
+# Pool for chart/insight tasks: 'serial', 'thread' or 'process'
+app.config['TASK_EXECUTOR'] = 'thread'
+app.config['TASK_WORKERS'] = os.cpu_count()
+# Processes that parse the selected sheets of a workbook side by side. Parsing
+# holds the GIL, so threads would not help; with fewer than 2 the sheets are
+# parsed one after another in the request's thread.
+app.config['SHEET_WORKERS'] = min(4, os.cpu_count())
+app.config['TASK_TIMEOUT'] = TASK_TIMEOUT
+# Render chart placeholders and compute each config on first API request
+app.config['LAZY_CHARTS'] = False
+# Memory for the frames that lazy chart sets hold until their charts are built,
+# least recently viewed dataset evicted first
+app.config['LAZY_CHARTS_MEMORY_BYTES'] = 512 * 1024 * 1024
+# Coerce types, drop duplicate rows and impute missing values before profiling
+app.config['PREPROCESS_UPLOADS'] = False
+# Profile uploads in the background job queue and return a job id right away
+app.config['ASYNC_UPLOADS'] = False
+app.config['JOB_WORKERS'] = JOB_WORKERS
+app.config['JOB_DB'] = os.path.join(CACHE_FOLDER, 'jobs.sqlite3')
+# Parsed uploads as memory-mappable Arrow files, so re-profiling skips CSV/Excel parsing
+app.config['COLUMNAR_FOLDER'] = os.path.join(UPLOAD_FOLDER, STORE_FOLDER)
+# Time each stage into a Server-Timing header and the /metrics histograms
+app.config['INSTRUMENTATION'] = True
+# Memory for zoom pyramids (utils.timeseries), least recently zoomed evicted first
+app.config['PYRAMID_MEMORY_BYTES'] = 256 * 1024 * 1024
+# Profile CSV uploads with mergeable sketches whatever their size and keep the
+# state, so an upload that appends rows to a known file only parses the new rows
+app.config['INCREMENTAL_UPLOADS'] = False
+app.config['PROFILE_STATE_FOLDER'] = os.path.join(CACHE_FOLDER, 'profiles')
+
+# Imported only when first needed; create_app(preload=True) imports them up front
+PRELOAD_MODULES = ('openpyxl', 'python_calamine', 'pyarrow.feather')
+
+# Per-process services, created by init_services on a process's first
+# request, so the parent of a preforking server never starts threads or pools
+result_cache = None
+upload_store = None
+task_executor = None
+sheet_executor = None
+datasets = None
+time_pyramids = None
+dataset_sources = None
+columnar_store = None
+profile_states = None
+jobs = None
+metrics = MetricsRegistry()
+services_lock = threading.Lock()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def columnar_key(content_hash, sheets=None):
+    key = f"{content_hash}-t{DTYPES_VERSION}"
+    if sheets:
+        key += f"-{options_fingerprint(sheets)}"
+    return key
+
+
+# `sheets` selects workbook sheets by name (the first sheet when empty).
+# `columns` limits the frame to those columns; with a columnar copy the others
+# are never read.
+def load_dataframe(filepath, filename, content_hash, sheets=None, columns=None):
+    store_key = columnar_key(content_hash, sheets)
+    with span('columnar_load'):
+        df = columnar_store.load(store_key, columns)
+    if df is not None:
+        set_rows(len(df))
+        return df
+    with span('read'):
+        if filename.endswith('.csv'):
+            df = pd.read_csv(filepath)
+        else:
+            df = read_excel_sheets(filepath, sheets, sheet_executor)
+    set_rows(len(df))
+    with span('optimize_dtypes'):
+        df, report = optimize_dtypes(df)
+    app.logger.info(
+        "%s: %.1f MB -> %.1f MB in memory (downcast %s, datetime %s, category %s)",
+        filename, report["memory_before"] / 2**20, report["memory_after"] / 2**20,
+        report["downcast"], report["datetime"], report["category"])
+    with span('columnar_save'):
+        columnar_store.save(store_key, df)
+    upload_store.describe(content_hash, {col: str(dtype) for col, dtype in df.dtypes.items()})
+    return df if columns is None else df[columns]
+
+
+def prepare_dataframe(filepath, filename, content_hash, sheets=None):
+    df = load_dataframe(filepath, filename, content_hash, sheets)
+    if app.config['PREPROCESS_UPLOADS']:
+        with span('preprocess'):
+            df = preprocess_dataset(df)
+    return df
+
+
+def build_profile(df):
+    with span('profile'):
+        return profile_dataset(df)
+
+
+# Where a dataset's rows come from, kept in its result and in dataset_sources
+# so its zoom pyramids can be built on demand
+def upload_source(filename, content_hash, sheets=None):
+    return {"filename": filename, "content_hash": content_hash, "sheets": sheets or None}
+
+
+def remember_source(dataset_id, filename, content_hash, sheets=None):
+    dataset_sources.add(dataset_id, upload_source(filename, content_hash, sheets))
+
+
+def dataset_source(dataset_id):
+    source = dataset_sources.get(dataset_id)
+    if source is None:
+        result = result_cache.get(dataset_id)
+        source = result.get("source") if result is not None else None
+        if source is not None:
+            dataset_sources.add(dataset_id, source)
+    return source
+
+
+# Viewing a dataset's charts counts as using its upload, for eviction
+def touch_dataset(dataset_id):
+    source = dataset_source(dataset_id)
+    if source is not None:
+        upload_store.touch(source["content_hash"], upload_owner())
+
+
+# The charts of a dataset, restored from the result cache when this process
+# has not built them (e.g. after a restart, or in another worker)
+def dataset_charts(dataset_id):
+    chart_set = datasets.get(dataset_id)
+    if chart_set is None:
+        result = result_cache.get(dataset_id)
+        if result is None:
+            return None
+        chart_set = LazyChartSet.from_charts(result["charts"])
+        datasets.add(dataset_id, chart_set)
+    return chart_set
+
+
+# The zoom pyramid of a datetime column, built from the upload on the first
+# zoom request and kept within PYRAMID_MEMORY_BYTES. None for unknown
+# datasets and columns that are not datetimes.
+def zoom_pyramid(dataset_id, column):
+    pyramid = time_pyramids.get((dataset_id, column))
+    if pyramid is not None:
+        return pyramid
+    source = dataset_source(dataset_id)
+    if source is None:
+        return None
+    ext = source["filename"].rsplit('.', 1)[-1].lower()
+    filepath = upload_store.path(source["content_hash"], ext)
+    # With a columnar copy only the time column and the series are read.
+    # Preprocessing drops duplicate rows, which needs every column.
+    header = None
+    if not app.config['PREPROCESS_UPLOADS']:
+        header = columnar_store.header(columnar_key(source["content_hash"], source["sheets"]))
+    if header is None:
+        df = prepare_dataframe(filepath, source["filename"], source["content_hash"], source["sheets"])
+    elif column in header.columns and pd.api.types.is_datetime64_any_dtype(header[column]):
+        df = load_dataframe(filepath, source["filename"], source["content_hash"], source["sheets"],
+                            [column] + series_columns(header))
+    else:
+        return None
+    if column not in df.columns or not pd.api.types.is_datetime64_any_dtype(df[column]):
+        return None
+    with span('pyramids'):
+        pyramid = build_pyramid(df, column)
+    time_pyramids.add((dataset_id, column), pyramid, pyramid.nbytes)
+    return pyramid
+
+
+# Profile of a CSV upload continued from the stored state of the file it
+# extends, when there is one. Each upload's state is kept for the next append.
+def profile_csv_incrementally(filepath, content_hash, chunksize):
+    acc = profile_states.get(filepath, content_hash)
+    if acc is not None:
+        return acc
+    with span('prefix_match'):
+        acc, base, offset = profile_states.find_prefix(filepath)
+    if acc is not None:
+        with span('profile_appended'):
+            acc = extend_profile(acc, filepath, offset, chunksize)
+    if acc is None:
+        base = None
+        acc = profile_csv_in_chunks(filepath, chunksize)
+    with span('profile_state_put'):
+        profile_states.put(filepath, content_hash, acc, base)
+    return acc
+
+
+def profile_large_file(filepath, filename, content_hash, sheets=None):
+    chunksize = app.config['CSV_CHUNK_SIZE']
+    is_csv = filename.endswith('.csv')
+    if not app.config['PREPROCESS_UPLOADS']:
+        if is_csv and app.config['INCREMENTAL_UPLOADS']:
+            return profile_csv_incrementally(filepath, content_hash, chunksize)
+        if is_csv:
+            return profile_csv_in_chunks(filepath, chunksize)
+        return profile_excel_in_chunks(filepath, sheets, chunksize, sheet_executor)
+    # Uploads are shared by content hash, so concurrent requests for the same
+    # file each need their own cleaned copy
+    cleaned = f"{filepath}.{uuid.uuid4().hex}.clean.csv"
+    try:
+        if is_csv:
+            preprocess_csv_in_chunks(filepath, cleaned, chunksize)
+        else:
+            preprocess_chunks(lambda: iter_excel_chunks(filepath, sheets, chunksize), cleaned)
+        if not os.path.exists(cleaned):
+            return DatasetAccumulator()  # no rows, so nothing was written
+        return profile_csv_in_chunks(cleaned, chunksize)
+    finally:
+        if os.path.exists(cleaned):
+            os.remove(cleaned)
+
+
+# `job`, a utils.jobs.JobHandle, receives progress and each task's results as they settle
+def build_dashboard(filepath, filename, content_hash, streaming, job=None, sheets=None):
+    if streaming:
+        # One step for the charts and one for the insights, both built from the profile
+        if job is not None:
+            job.add_work(2)
+        with span('stream_profile'):
+            acc = profile_large_file(filepath, filename, content_hash, sheets)
+        set_rows(acc.rows)
+        upload_store.describe(content_hash, {col: str(column.dtype) for col, column in acc.columns.items()})
+        with span('charts'):
+            charts = charts_from_accumulator(acc)
+        if job is not None:
+            job.add_results("charts", charts)
+        with span('insights'):
+            insights = insights_from_accumulator(acc)
+        if job is not None:
+            job.add_results("insights", insights)
+        return {
+            "features": list(acc.columns),
+            "charts": charts,
+            "insights": insights,
+            "rows": acc.rows,
+            "source": upload_source(filename, content_hash, sheets),
+            "complete": True,
+        }
+    df = prepare_dataframe(filepath, filename, content_hash, sheets)
+    profile = build_profile(df)
+    chart_plan = chart_tasks(df, profile, **app.config['CHART_OPTIONS'])
+    insight_plan = insight_tasks(profile)
+    chart_progress = insight_progress = None
+    if job is not None:
+        job.add_work(len(chart_plan) + len(insight_plan))
+        chart_progress = lambda n, items: job.add_results("charts", items)
+        insight_progress = lambda n, items: job.add_results("insights", items)
+    with span('charts'):
+        charts, chart_report = run_tasks(chart_plan, task_executor, app.config['TASK_TIMEOUT'], chart_progress)
+    with span('insights'):
+        insights, insight_report = run_tasks(insight_plan, task_executor, app.config['TASK_TIMEOUT'],
+                                             insight_progress)
+    record_tasks('chart', chart_report)
+    record_tasks('insight', insight_report)
+    for name, report in (("charts", chart_report), ("insights", insight_report)):
+        app.logger.info(
+            "%s: %d tasks, wall %.3fs, task cpu %.3fs (x%.2f), %d errors, %d timeouts",
+            name, report["tasks"], report["wall"], report["task_cpu"], report["parallelism"],
+            report["errors"], report["timeouts"])
+    return {
+        "features": list(df.columns),
+        "charts": charts,
+        "insights": insights,
+        "rows": len(df),
+        "source": upload_source(filename, content_hash, sheets),
+        "complete": not (chart_report["timeouts"] or insight_report["timeouts"]),
+    }
+
+
+# Insights are computed now; charts are only planned and registered under
+# dataset_id so /api/datasets/<dataset_id>/charts/<chart_id> can build them.
+def build_lazy_dashboard(filepath, filename, content_hash, dataset_id, sheets=None):
+    df = prepare_dataframe(filepath, filename, content_hash, sheets)
+    profile = build_profile(df)
+    chart_set = LazyChartSet(chart_tasks(df, profile, **app.config['CHART_OPTIONS']),
+                             task_executor, app.config['TASK_TIMEOUT'])
+    # The chart tasks keep the frame and the profile's numeric matrix alive
+    datasets.add(dataset_id, chart_set, int(df.memory_usage(deep=True).sum()) + profile.numeric_values.nbytes)
+    insight_report = {}
+    with span('insights'):
+        insights = generate_insights(df, profile=profile, executor=task_executor,
+                                     task_timeout=app.config['TASK_TIMEOUT'], report=insight_report)
+    record_tasks('insight', insight_report)
+    return {
+        "features": list(df.columns),
+        "charts": chart_set.metadata,
+        "insights": insights,
+        "rows": len(df),
+        "source": upload_source(filename, content_hash, sheets),
+    }
+
+
+# The dashboard as (event, data) pairs, each sent as soon as it is ready:
+# "dataset" (id and columns) right after loading, then "insights" sections
+# and "chart"s in the order their tasks finish (cheapest first), then "done".
+# `order` in each item is its position in the non-streamed dashboard. Large
+# files profiled in chunks are sent whole once profiling finishes.
+def stream_dashboard(filepath, filename, content_hash, cache_key, streaming, sheets=None):
+    result = result_cache.get(cache_key)
+    if result is None and streaming:
+        result = build_dashboard(filepath, filename, content_hash, streaming, sheets=sheets)
+        result_cache.put(cache_key, result)
+    if result is not None:
+        if datasets.get(cache_key) is None:
+            datasets.add(cache_key, LazyChartSet.from_charts(result["charts"]))
+        yield "dataset", {"dataset_id": cache_key, "features": result["features"]}
+        yield "insights", {"order": 0, "lines": result["insights"]}
+        for n, chart in enumerate(result["charts"]):
+            yield "chart", dict(chart, order=n)
+        yield "done", {"complete": True}
+        return
+
+    df = prepare_dataframe(filepath, filename, content_hash, sheets)
+    yield "dataset", {"dataset_id": cache_key, "features": list(df.columns)}
+    profile = build_profile(df)
+    insight_plan = insight_tasks(profile)
+    chart_plan = chart_tasks(df, profile, **app.config['CHART_OPTIONS'])
+    # Position of each chart task's first chart in the full chart list
+    chart_offsets = [0]
+    for task in chart_plan:
+        chart_offsets.append(chart_offsets[-1] + len(task.fallbacks))
+    results = [None] * (len(insight_plan) + len(chart_plan))
+    report = {}
+    for n, items in iter_tasks(insight_plan + chart_plan, task_executor, app.config['TASK_TIMEOUT'], report):
+        results[n] = items
+        if n < len(insight_plan):
+            yield "insights", {"order": n, "lines": items}
+        else:
+            offset = chart_offsets[n - len(insight_plan)]
+            for k, chart in enumerate(items):
+                yield "chart", dict(chart, order=offset + k)
+
+    insight_names = {task.fn.__name__ for task in insight_plan}
+    record_tasks('insight', {"timings": [t for t in report["timings"] if t[0] in insight_names]})
+    record_tasks('chart', {"timings": [t for t in report["timings"] if t[0] not in insight_names]})
+
+    result = {
+        "features": list(df.columns),
+        "charts": [chart for items in results[len(insight_plan):] for chart in items],
+        "insights": [line for items in results[:len(insight_plan)] for line in items],
+        "rows": len(df),
+        "source": upload_source(filename, content_hash, sheets),
+        "complete": not report["timeouts"],
+    }
+    if result["complete"]:
+        result_cache.put(cache_key, result)
+    datasets.add(cache_key, LazyChartSet.from_charts(result["charts"]))
+    yield "done", {"complete": result["complete"]}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+
+def run_profiling_job(job, filepath, filename, content_hash, cache_key, streaming, sheets=None):
+    trace = begin_trace() if app.config['INSTRUMENTATION'] else None
+    try:
+        result = build_dashboard(filepath, filename, content_hash, streaming, job, sheets)
+    finally:
+        if trace is not None:
+            end_trace(trace)
+            trace.add('job', trace.elapsed())
+            metrics.observe(trace)
+    if result["complete"]:
+        result_cache.put(cache_key, result)
+    datasets.add(cache_key, LazyChartSet.from_charts(result["charts"]))
+    job.set_result({"charts": result["charts"], "insights": result["insights"]})
+
+
+def init_services():
+    global result_cache, upload_store, task_executor, sheet_executor, datasets, time_pyramids, dataset_sources, columnar_store, profile_states, jobs
+    with services_lock:
+        if jobs is not None:
+            return
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        result_cache = ResultCache(app.config['CACHE_FOLDER'])
+        columnar_store = ColumnarStore(app.config['COLUMNAR_FOLDER'])
+        upload_store = UploadStore(app.config['UPLOAD_FOLDER'], app.config['UPLOAD_DB'],
+                                   app.config['UPLOAD_USER_QUOTA'], app.config['UPLOAD_TOTAL_QUOTA'],
+                                   app.config['UPLOAD_TTL'], on_evict=columnar_store.remove)
+        task_executor = make_executor(app.config['TASK_EXECUTOR'], app.config['TASK_WORKERS'])
+        # Worker processes start on the first multi-sheet read
+        workers = app.config['SHEET_WORKERS']
+        sheet_executor = make_executor('process', workers) if workers > 1 else None
+        datasets = DatasetRegistry(max_bytes=app.config['LAZY_CHARTS_MEMORY_BYTES'])
+        # utils.timeseries pyramids per (dataset, column), for the zoom endpoint
+        time_pyramids = DatasetRegistry(max_datasets=float('inf'), max_bytes=app.config['PYRAMID_MEMORY_BYTES'])
+        dataset_sources = DatasetRegistry(max_datasets=1024)
+        profile_states = ProfileStateStore(app.config['PROFILE_STATE_FOLDER'])
+        queue = JobQueue(app.config['JOB_DB'], run_profiling_job, app.config['JOB_WORKERS'])
+        # Claims are atomic, so every worker recovering the same jobs is safe
+        queue.recover()
+        jobs = queue
+
+
+def warm_imports():
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+# Entry point for WSGI servers, e.g.
+#   gunicorn --preload --workers 4 "data:create_app(preload=True)"
+# With --preload the parent imports everything once and forked workers share
+# those pages; each worker still creates its own services on its first request.
+def create_app(config=None, preload=False):
+    if config:
+        app.config.update(config)
+    if preload:
+        warm_imports()
+    return app
+
+
+def dataset_cache_key(content_hash, streaming, sheets=None):
+    # Keyed by content, generator versions, options and mode, so re-uploads skip parsing entirely
+    options = {
+        "charts": app.config['CHART_OPTIONS'],
+        "preprocess": app.config['PREPROCESS_UPLOADS'],
+        "sheets": sheets or None,
+    }
+    return (f"{content_hash}-c{CHARTS_VERSION}-i{INSIGHTS_VERSION}-"
+            f"{options_fingerprint(options)}-{'s' if streaming else 'f'}")
+
+
+# Uploads are charged to the logged-in user, or else to the client address
+def upload_owner():
+    return session.get('user') or request.remote_addr or 'anonymous'
+
+
+# Whether this upload should take the chunked, approximate profile whatever its size
+def approximate_requested():
+    return app.config['APPROXIMATE_PROFILES'] or request.form.get('approximate') in ('1', 'true', 'on')
+
+
+# Stores the upload by content (hashing it on the way to disk) and returns
+# (filename, path, content hash, streaming). Raises QuotaExceeded.
+def save_upload(file):
+    filename = secure_filename(file.filename)
+    filepath, content_hash = upload_store.save(file.stream, filename, upload_owner())
+    threshold = app.config['STREAMING_THRESHOLD' if filename.endswith('.csv') else 'EXCEL_STREAMING_THRESHOLD']
+    streaming = os.path.getsize(filepath) > threshold or approximate_requested()
+    if filename.endswith('.csv') and app.config['INCREMENTAL_UPLOADS']:
+        streaming = True
+    return filename, filepath, content_hash, streaming
+
+
+def submit_job(filename, filepath, content_hash, cache_key, streaming, sheets=None):
+    return jobs.submit(filepath=filepath, filename=filename, content_hash=content_hash,
+                       cache_key=cache_key, streaming=streaming, sheets=sheets)
+
+
+@app.before_request
+def start_request_trace():
+    if jobs is None:
+        init_services()
+    if app.config['INSTRUMENTATION']:
+        begin_trace()
+
+
+# Requests that ran any instrumented stage report them in Server-Timing and
+# feed the /metrics histograms
+@app.after_request
+def report_request_trace(response):
+    trace = current_trace()
+    if trace is not None and trace.spans:
+        trace.add('total', trace.elapsed())
+        response.headers['Server-Timing'] = trace.server_timing()
+        metrics.observe(trace)
+    return response
+
+
+@app.teardown_request
+def finish_request_trace(exc):
+    trace = current_trace()
+    if trace is not None:
+        end_trace(trace)
+
+
 @app.route('/')
 def login():
     return render_template('login.html')
@@ -33,6 +546,9 @@ def login():
 def serve_page2():
 
     dataset_name = None
+    dataset_id = None
+    job_id = None
+    sheet_names = []
     features = []
     charts = []
     insights = []
@@ -46,36 +562,240 @@ def serve_page2():
             flash('No selected file', 'error')
             return redirect(request.url)
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            try:
+                with span('save_upload'):
+                    filename, filepath, content_hash, streaming = save_upload(file)
+            except QuotaExceeded as e:
+                flash(str(e), 'error')
+                return redirect(request.url)
+            # Workbook sheets to profile, by name; several are stacked together
+            sheets = request.form.getlist('sheet')
             
             # Read dataset
             try:
-                if filename.endswith('.csv'):
-                    df = pd.read_csv(filepath)
-                else:
-                    df = pd.read_excel(filepath)
+                if not filename.endswith('.csv'):
+                    sheet_names = list_sheets(filepath)
+                cache_key = dataset_cache_key(content_hash, streaming, sheets)
+                dataset_id = cache_key
+                remember_source(dataset_id, filename, content_hash, sheets)
+                with span('cache_get'):
+                    result = result_cache.get(cache_key)
+                if result is None and app.config['ASYNC_UPLOADS']:
+                    job_id = submit_job(filename, filepath, content_hash, cache_key, streaming, sheets)
+                    result = {"features": [], "charts": [], "insights": []}
+                elif result is None and app.config['LAZY_CHARTS'] and not streaming:
+                    result = build_lazy_dashboard(filepath, filename, content_hash, dataset_id, sheets)
+                elif result is None:
+                    result = build_dashboard(filepath, filename, content_hash, streaming, sheets=sheets)
+                    # Results with timed-out placeholders are not worth keeping
+                    if result["complete"]:
+                        with span('cache_put'):
+                            result_cache.put(cache_key, result)
+                    datasets.add(dataset_id, LazyChartSet.from_charts(result["charts"]))
+                elif datasets.get(dataset_id) is None:
+                    datasets.add(dataset_id, LazyChartSet.from_charts(result["charts"]))
+                if "rows" in result:
+                    set_rows(result["rows"])
                 dataset_name = filename
-                features = list(df.columns)
-                
-                charts = generate_charts(df)
-                insights = generate_insights(df)
-                
+                features = result["features"]
+                charts = result["charts"]
+                insights = result["insights"]
+
             except Exception as e:
                 flash(f'Error reading dataset: {str(e)}', 'error')
         else:
             flash('Allowed file types: csv, xlsx', 'error')
     
-    return render_template('dashboard.html',  
-                           dataset_name=dataset_name,
-                           features=features,
-                           charts=charts,
-                           insights=insights,)
+    with span('render'):
+        page = render_template('dashboard.html',  
+                               dataset_name=dataset_name,
+                               dataset_id=dataset_id,
+                               job_id=job_id,
+                               sheet_names=sheet_names,
+                               features=features,
+                               charts=charts,
+                               insights=insights,)
+    return page
+
+
+@app.route('/api/datasets/<dataset_id>/charts')
+def list_charts(dataset_id):
+    chart_set = dataset_charts(dataset_id)
+    if chart_set is None:
+        return jsonify({"error": "Unknown dataset"}), 404
+    touch_dataset(dataset_id)
+    return jsonify({"dataset_id": dataset_id, "charts": chart_set.metadata})
+
+
+@app.route('/api/datasets/<dataset_id>/charts/<chart_id>')
+def get_chart(dataset_id, chart_id):
+    chart_set = dataset_charts(dataset_id)
+    if chart_set is None:
+        return jsonify({"error": "Unknown dataset"}), 404
+    touch_dataset(dataset_id)
+    chart = chart_set.chart(chart_id)
+    if chart is None:
+        return jsonify({"error": "Unknown chart"}), 404
+    return jsonify(chart)
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    file = request.files.get('dataset')
+    if file is None or file.filename == '' or not allowed_file(file.filename):
+        return jsonify({"error": "Expected a csv or xlsx file in 'dataset'"}), 400
+    try:
+        filename, filepath, content_hash, streaming = save_upload(file)
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 413
+    sheets = request.form.getlist('sheet')
+    cache_key = dataset_cache_key(content_hash, streaming, sheets)
+    remember_source(cache_key, filename, content_hash, sheets)
+    job_id = submit_job(filename, filepath, content_hash, cache_key, streaming, sheets)
+    return jsonify({"job_id": job_id, "dataset_id": cache_key}), 202
+
+
+# One window of a datetime column's pyramid, at the finest resolution with at
+# most ?points buckets (the chart width). ?start and ?end are ISO times,
+# open-ended when omitted; ?columns=a,b limits the numeric series (empty for
+# counts only).
+@app.route('/api/datasets/<dataset_id>/timeseries/<column>')
+def zoom_timeseries(dataset_id, column):
+    pyramid = zoom_pyramid(dataset_id, column)
+    if pyramid is None:
+        return jsonify({"error": "Unknown dataset or datetime column"}), 404
+    touch_dataset(dataset_id)
+    try:
+        start, end = (pd.Timestamp(request.args[key]).to_datetime64() if request.args.get(key) else None
+                      for key in ('start', 'end'))
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO dates or times"}), 400
+    points = request.args.get('points', LINE_MAX_POINTS, type=int)
+    columns = request.args.get('columns')
+    if columns is not None:
+        columns = [col for col in columns.split(',') if col]
+    window = pyramid.window(start, end, points, columns)
+    return jsonify(dict(window_json(window), dataset_id=dataset_id, column=column))
+
+
+# Uploads a dataset and streams its dashboard as server-sent events (see
+# stream_dashboard). Read it with fetch(); static/js/dashboard_stream.js
+# parses the events.
+@app.route('/api/stream', methods=['POST'])
+def stream_upload():
+    file = request.files.get('dataset')
+    if file is None or file.filename == '' or not allowed_file(file.filename):
+        return jsonify({"error": "Expected a csv or xlsx file in 'dataset'"}), 400
+    try:
+        filename, filepath, content_hash, streaming = save_upload(file)
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 413
+    sheets = request.form.getlist('sheet')
+    cache_key = dataset_cache_key(content_hash, streaming, sheets)
+    remember_source(cache_key, filename, content_hash, sheets)
+
+    # The Server-Timing header only covers the upload: it is sent before the
+    # body is built. The stream has its own trace, observed in /metrics and
+    # sent to the client in the "done" event.
+    def events():
+        trace = begin_trace() if app.config['INSTRUMENTATION'] else None
+        try:
+            for event, data in stream_dashboard(filepath, filename, content_hash, cache_key, streaming, sheets):
+                if event == "done" and trace is not None and trace.spans:
+                    data = dict(data, server_timing=trace.server_timing())
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event("error", {"error": f"Error reading dataset: {e}"})
+        finally:
+            if trace is not None:
+                end_trace(trace)
+                trace.add('stream', trace.elapsed())
+                metrics.observe(trace)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# Sheet names of an uploaded workbook, so a client can choose `sheet` values
+@app.route('/api/sheets', methods=['POST'])
+def workbook_sheets():
+    file = request.files.get('dataset')
+    if file is None or not file.filename.endswith('.xlsx'):
+        return jsonify({"error": "Expected an xlsx file in 'dataset'"}), 400
+    try:
+        filename, filepath, _, _ = save_upload(file)
+    except QuotaExceeded as e:
+        return jsonify({"error": str(e)}), 413
+    return jsonify({"filename": filename, "sheets": list_sheets(filepath)})
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({
+        "job_id": job_id,
+        "dataset_id": job["payload"]["cache_key"],
+        "status": job["status"],
+        "total": job["total"],
+        "completed": job["completed"],
+        "progress": job["progress"],
+        "error": job["error"],
+    })
+
+
+# Charts and insights finished so far; pass ?charts=N&insights=M to skip the
+# ones already received
+@app.route('/api/jobs/<job_id>/results')
+def job_results(job_id):
+    job = jobs.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    result = jobs.results(job_id)
+    if result is None and job["status"] == 'done':
+        result = result_cache.get(job["payload"]["cache_key"])
+    if result is None:
+        result = {"charts": [], "insights": []}
+    charts_from = request.args.get('charts', 0, type=int)
+    insights_from = request.args.get('insights', 0, type=int)
+    return jsonify({
+        "job_id": job_id,
+        "status": job["status"],
+        "charts": result["charts"][charts_from:],
+        "insights": result["insights"][insights_from:],
+    })
+
+
+@app.route('/jobs/metrics')
+def job_metrics():
+    return jsonify(jobs.metrics())
+
+
+# Stage duration and memory histograms in the Prometheus text format
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(dict(result_cache.stats(), pyramid_bytes=time_pyramids.nbytes, lazy_chart_bytes=datasets.nbytes))
+
+
+@app.route('/uploads/stats')
+def upload_stats():
+    return jsonify(upload_store.stats())
+
+
+# The caller's stored uploads, most recently used first
+@app.route('/api/uploads')
+def list_uploads():
+    return jsonify({"uploads": upload_store.uploads(upload_owner())})
 
 
 
 if __name__ == "__main__":
    port = int(os.environ.get("PORT", 5000))
-   app.run(host="0.0.0.0", port=port, debug=True)
+   create_app().run(host="0.0.0.0", port=port, debug=os.environ.get("FLASK_DEBUG") == "1")
 
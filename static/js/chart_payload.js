@@ -0,0 +1,58 @@
+// Decodes chart configs produced with CHART_OPTIONS encoding='typed'.
+// {"__typed__": dtype, "length": n, "data": base64} becomes a plain array
+// (NaN -> null so Chart.js draws gaps) and {"__points__": {x: .., y: ..}}
+// becomes [{x, y}, ...]. Configs without packed buffers pass through unchanged.
+(function (global) {
+    var ARRAY_TYPES = {
+        float32: Float32Array,
+        float64: Float64Array,
+        int32: Int32Array
+    };
+
+    function decodeTypedArray(payload) {
+        var binary = atob(payload.data);
+        var bytes = new Uint8Array(binary.length);
+        for (var i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        var view = new ARRAY_TYPES[payload.__typed__](bytes.buffer, 0, payload.length);
+        return Array.from(view, function (v) { return Number.isNaN(v) ? null : v; });
+    }
+
+    function decodePoints(columns) {
+        var names = Object.keys(columns);
+        var decoded = names.map(function (name) { return decodeTypedArray(columns[name]); });
+        var length = decoded.length ? decoded[0].length : 0;
+        var points = new Array(length);
+        for (var i = 0; i < length; i++) {
+            var point = {};
+            for (var c = 0; c < names.length; c++) {
+                point[names[c]] = decoded[c][i];
+            }
+            points[i] = point;
+        }
+        return points;
+    }
+
+    function decodeChartConfig(value) {
+        if (Array.isArray(value)) {
+            return value.map(decodeChartConfig);
+        }
+        if (value === null || typeof value !== 'object') {
+            return value;
+        }
+        if (value.__typed__) {
+            return decodeTypedArray(value);
+        }
+        if (value.__points__) {
+            return decodePoints(value.__points__);
+        }
+        var out = {};
+        Object.keys(value).forEach(function (key) {
+            out[key] = decodeChartConfig(value[key]);
+        });
+        return out;
+    }
+
+    global.decodeChartConfig = decodeChartConfig;
+})(window);
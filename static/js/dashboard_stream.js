@@ -0,0 +1,52 @@
+// Uploads a dataset to /api/stream and calls handlers[event](data) for each
+// server-sent event as it arrives: "dataset", "insights", "chart", "done" and
+// "error". Charts and insight sections arrive cheapest first; each carries
+// `order`, its position in the full dashboard. Returns a promise that
+// settles when the stream ends.
+(function (global) {
+    function dispatch(block, handlers) {
+        var event = 'message';
+        var data = [];
+        block.split('\n').forEach(function (line) {
+            if (line.indexOf('event:') === 0) {
+                event = line.slice(6).trim();
+            } else if (line.indexOf('data:') === 0) {
+                data.push(line.slice(5).trim());
+            }
+        });
+        if (data.length && handlers[event]) {
+            handlers[event](JSON.parse(data.join('\n')));
+        }
+    }
+
+    function streamDashboard(formData, handlers) {
+        return fetch('/api/stream', { method: 'POST', body: formData }).then(function (response) {
+            if (!response.ok) {
+                return response.json().then(function (body) {
+                    if (handlers.error) {
+                        handlers.error(body);
+                    }
+                });
+            }
+            var reader = response.body.getReader();
+            var decoder = new TextDecoder();
+            var buffer = '';
+
+            function pump() {
+                return reader.read().then(function (chunk) {
+                    if (chunk.done) {
+                        return;
+                    }
+                    buffer += decoder.decode(chunk.value, { stream: true });
+                    var blocks = buffer.split('\n\n');
+                    buffer = blocks.pop();
+                    blocks.forEach(function (block) { dispatch(block, handlers); });
+                    return pump();
+                });
+            }
+            return pump();
+        });
+    }
+
+    global.streamDashboard = streamDashboard;
+})(window);
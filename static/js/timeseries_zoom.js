@@ -0,0 +1,39 @@
+// Refetches a time series chart (one with a "zoom" entry) for the window
+// [start, end] (ISO strings, or null for open ends) at one bucket per pixel
+// of the chart's width, then redraws it in place. `chart` is the Chart.js
+// instance built from the chart's config.
+(function (global) {
+    function zoomTimeSeries(chart, datasetId, zoom, start, end) {
+        var params = new URLSearchParams({ points: Math.max(Math.floor(chart.width), 1) });
+        if (start) {
+            params.set('start', start);
+        }
+        if (end) {
+            params.set('end', end);
+        }
+        params.set('columns', zoom.series || '');
+        var url = '/api/datasets/' + encodeURIComponent(datasetId) + '/timeseries/' +
+            encodeURIComponent(zoom.column) + '?' + params.toString();
+        return fetch(url).then(function (response) {
+            return response.json();
+        }).then(function (window_) {
+            if (window_.error) {
+                throw new Error(window_.error);
+            }
+            chart.data.labels = window_.buckets;
+            if (zoom.series) {
+                var stats = window_.series[zoom.series];
+                chart.data.datasets[0].data = stats.mean;
+                chart.data.datasets[1].data = stats.min;
+                chart.data.datasets[2].data = stats.max;
+            } else {
+                chart.data.datasets[0].data = window_.count;
+            }
+            chart.options.scales.x.title.text = zoom.column + ' (' + window_.resolution + ')';
+            chart.update();
+            return window_;
+        });
+    }
+
+    global.zoomTimeSeries = zoomTimeSeries;
+})(window);
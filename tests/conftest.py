@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+import data
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    cache = tmp_path / "cache"
+    monkeypatch.setitem(data.app.config, 'UPLOAD_FOLDER', str(uploads))
+    monkeypatch.setitem(data.app.config, 'UPLOAD_DB', str(tmp_path / "uploads.sqlite3"))
+    monkeypatch.setitem(data.app.config, 'COLUMNAR_FOLDER', str(uploads / "columnar"))
+    monkeypatch.setitem(data.app.config, 'CACHE_FOLDER', str(cache))
+    monkeypatch.setitem(data.app.config, 'JOB_DB', str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setitem(data.app.config, 'PROFILE_STATE_FOLDER', str(cache / "profiles"))
+    monkeypatch.setattr(data, 'jobs', None)
+    data.init_services()
+    return data.app.test_client()
+
+
+def wait_for(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f'/api/jobs/{job_id}').get_json()
+        if status["status"] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
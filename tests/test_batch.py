@@ -0,0 +1,42 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import batch
+
+
+# Runs in the batch's worker processes, so it must be importable by name
+def crash_or_profile(path, *args):
+    if os.path.basename(path).startswith("crash"):
+        os._exit(1)
+    return batch.profile_file(path, *args)
+
+
+def test_crashing_file_fails_alone(tmp_path, monkeypatch):
+    sources = tmp_path / "in"
+    output = tmp_path / "out"
+    sources.mkdir()
+    output.mkdir()
+    rng = np.random.default_rng(8)
+    names = ["crash.csv"] + [f"f{n}.csv" for n in range(5)]
+    for n, name in enumerate(names):
+        # The crashing file is the largest, so it is started first
+        rows = 400 if name == "crash.csv" else 100 + n
+        pd.DataFrame({"x": rng.normal(size=rows), "k": rng.choice(list("ab"), rows)}).to_csv(sources / name, index=False)
+
+    pools = []
+    run_pool = batch._run_pool
+    monkeypatch.setattr(batch, '_run_pool', lambda paths, *args: pools.append(list(paths)) or run_pool(paths, *args))
+    entries = batch.run(batch.find_files([str(sources)]), str(output), 2, None, profile=crash_or_profile)
+
+    status = {os.path.basename(entry["path"]): entry["status"] for entry in entries}
+    assert status == {name: "failed" if name == "crash.csv" else "done" for name in names}
+    # Only files that were running when the worker died are rerun alone
+    alone = [os.path.basename(paths[0]) for paths in pools[1:] if len(paths) == 1]
+    assert len(alone) <= 2
+    assert "crash.csv" in alone
+    with open(output / batch.MANIFEST) as f:
+        assert len([json.loads(line) for line in f]) == len(names)
+    assert len(os.listdir(output)) == len(names)  # five results and the manifest
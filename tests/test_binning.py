@@ -0,0 +1,20 @@
+import numpy as np
+
+from utils.binning import histogram, histogram_labels
+
+
+def test_discrete_bins_are_labelled_by_value():
+    edges, counts, discrete = histogram(np.array([1, 2, 2, 5]))
+    assert discrete
+    assert histogram_labels(edges, discrete) == ["1", "2", "3", "4", "5"]
+    assert counts.tolist() == [1, 2, 0, 0, 1]
+
+
+def test_unit_wide_continuous_bins_keep_their_range():
+    # 0.5 .. 100.5 in 100 bins: one unit wide, on half-integer edges
+    values = np.concatenate([np.linspace(0.5, 100.5, 1000), [0.75]])
+    edges, counts, discrete = histogram(values, 'fixed', bins=100)
+    assert not discrete
+    assert np.allclose(np.diff(edges), 1)
+    labels = histogram_labels(edges, discrete)
+    assert labels[0] == "0.5 – 1.5"
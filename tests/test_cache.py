@@ -0,0 +1,82 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+import data
+from utils.cache import ResultCache
+
+
+def value(size, seed=0):
+    return {"payload": np.random.default_rng(seed).bytes(size)}
+
+
+def test_memory_tier_is_bounded_by_size_lru_first(tmp_path):
+    cache = ResultCache(str(tmp_path), memory_limit=2500)
+    for key in "abc":
+        cache.put(key, value(1000))
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["memory_bytes"] <= 2500
+    assert stats["memory_evictions"] == 1
+    # "a" was evicted from memory but is still on disk
+    assert cache.get("a") is not None
+    assert cache.stats()["disk_hits"] == 1
+    # ...and reloading it pushed out the least recently used entry, "b"
+    cache.get("c")
+    assert cache.stats()["memory_hits"] == 1
+    cache.get("b")
+    assert cache.stats()["disk_hits"] == 2
+
+
+def test_oversized_values_stay_on_disk_only(tmp_path):
+    cache = ResultCache(str(tmp_path), memory_limit=100)
+    cache.put("big", value(1000))
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.get("big") is not None
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    cache = ResultCache(str(tmp_path), memory_limit=0, disk_limit=2500)
+    for n, key in enumerate("ab"):
+        cache.put(key, value(1000, n))
+        os.utime(os.path.join(tmp_path, f"{key}.pkl"), (n, n))
+    cache.put("c", value(1000, 2))
+    assert cache.stats()["disk_evictions"] == 1
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+
+
+def test_missing_and_corrupt_entries_are_misses(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    (tmp_path / "broken.pkl").write_bytes(b"not a pickle")
+    assert cache.get("nothing") is None
+    assert cache.get("broken") is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_key_changes_with_versions_and_options(client, monkeypatch):
+    key = data.dataset_cache_key("abc", False)
+    assert data.dataset_cache_key("abc", False) == key
+    assert data.dataset_cache_key("abc", True) != key
+    assert data.dataset_cache_key("abc", False, ["Sheet2"]) != key
+    for name in ('INSIGHTS_VERSION', 'CHARTS_VERSION'):
+        version = getattr(data, name)
+        monkeypatch.setattr(data, name, version + 1)
+        assert data.dataset_cache_key("abc", False) != key
+        monkeypatch.setattr(data, name, version)
+    monkeypatch.setitem(data.app.config, 'CHART_OPTIONS', {'scatter_mode': 'density'})
+    assert data.dataset_cache_key("abc", False) != key
+
+
+def test_reupload_of_identical_bytes_hits_the_cache(client):
+    df = pd.DataFrame({"x": np.arange(200) % 7, "y": np.linspace(0, 1, 200)})
+    body = df.to_csv(index=False).encode()
+    streams = []
+    for name in ("first.csv", "renamed.csv"):
+        response = client.post('/api/stream', data={'dataset': (io.BytesIO(body), name)},
+                               content_type='multipart/form-data')
+        streams.append(response.get_data(as_text=True))
+    assert data.result_cache.stats()["memory_hits"] == 1
+    # Same charts, served from the cache the second time
+    assert streams[0].count("event: chart") == streams[1].count("event: chart")
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.correlation import top_correlations, top_pairs
+from utils.streaming import CorrelationAccumulator
+
+
+def sample_frame(rows=600, seed=6):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=rows)
+    df = pd.DataFrame({
+        "a": base,
+        "b": 0.9 * base + 0.3 * rng.normal(size=rows),
+        "c": -0.6 * base + rng.normal(size=rows),
+        "d": rng.normal(size=rows),
+        "constant": np.full(rows, 4.0),
+        "e": 0.4 * base + rng.normal(size=rows),
+    })
+    # Missing values, differently placed per column
+    df.loc[rng.random(rows) < 0.1, "b"] = np.nan
+    df.loc[rng.random(rows) < 0.2, "c"] = np.nan
+    df.loc[::9, "e"] = np.nan
+    return df
+
+
+# Upper-triangle pairs of df.corr() as (i, j, r), strongest first
+def expected_pairs(df, k):
+    corr = df.corr().to_numpy()
+    pairs = [(i, j, corr[i, j]) for i in range(len(corr)) for j in range(i + 1, len(corr))
+             if np.isfinite(corr[i, j])]
+    return sorted(pairs, key=lambda pair: -abs(pair[2]))[:k]
+
+
+@pytest.mark.parametrize("block", [2, 4, 256])
+def test_top_correlations_match_dataframe_corr(block):
+    df = sample_frame()
+    k = 6
+    result = top_correlations(df.to_numpy(dtype=np.float64), k, block=block)
+    expected = expected_pairs(df, k)
+    assert [(i, j) for i, j, _ in result] == [(i, j) for i, j, _ in expected]
+    assert np.allclose([r for *_, r in result], [r for *_, r in expected], atol=1e-4)
+
+
+def test_constant_column_never_qualifies():
+    df = sample_frame()
+    constant = df.columns.get_loc("constant")
+    pairs = top_correlations(df.to_numpy(dtype=np.float64), 100)
+    assert pairs and all(constant not in (i, j) for i, j, _ in pairs)
+
+
+def test_top_pairs_order_by_strength():
+    corr = np.array([[1.0, 0.2, -0.9, np.nan],
+                     [0.2, 1.0, 0.5, 0.1],
+                     [-0.9, 0.5, 1.0, 0.3],
+                     [np.nan, 0.1, 0.3, 1.0]])
+    assert top_pairs(corr, 3) == [(0, 2, -0.9), (1, 2, 0.5), (2, 3, 0.3)]
+    assert len(top_pairs(corr, 10)) == 5  # the NaN pair is left out
+
+
+def test_chunked_and_merged_accumulators_match_dataframe_corr():
+    df = sample_frame()
+    values = df.to_numpy(dtype=np.float64)
+    left = CorrelationAccumulator(df.columns)
+    for start in range(0, 300, 70):
+        left.update(values[start:min(start + 70, 300)])
+    right = CorrelationAccumulator(df.columns)
+    right.update(values[300:])
+    left.merge(right)
+    result = left.corr()
+    expected = df.corr()
+    off_diagonal = ~np.eye(len(df.columns), dtype=bool)
+    assert np.allclose(result.to_numpy()[off_diagonal], expected.to_numpy()[off_diagonal],
+                       atol=1e-9, equal_nan=True)
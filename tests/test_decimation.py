@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from utils.decimation import decimate
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [3, 4, 5, 10, 1000])
+def test_point_budget_is_kept(method, max_points):
+    values = np.sin(np.linspace(0, 50, 5000)) + np.random.default_rng(3).normal(size=5000)
+    idx = decimate(values, max_points, method)
+    assert len(idx) <= max_points
+    assert idx[0] == 0 and idx[-1] == len(values) - 1
+
+
+@pytest.mark.parametrize("max_points", [0, 1, 2])
+def test_too_few_points_are_rejected(max_points):
+    with pytest.raises(ValueError):
+        decimate(np.arange(10.0), max_points)
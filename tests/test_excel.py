@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from utils.excel import read_excel_sheets, profile_excel_in_chunks, SHEET_COLUMN
+from utils.executor import make_executor
+
+
+def test_sheets_parsed_in_processes_match_serial(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / "book.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        for sheet, rows in (("a", 300), ("b", 200)):
+            pd.DataFrame({"x": rng.normal(size=rows), "k": rng.choice(list("pq"), rows)}).to_excel(
+                writer, sheet_name=sheet, index=False)
+    executor = make_executor('process', 2)
+    try:
+        pd.testing.assert_frame_equal(read_excel_sheets(path, ["a", "b"], executor),
+                                      read_excel_sheets(path, ["a", "b"]))
+        pooled = profile_excel_in_chunks(path, ["a", "b"], 100, executor)
+    finally:
+        executor.shutdown()
+    serial = profile_excel_in_chunks(path, ["a", "b"], 100)
+    assert pooled.rows == serial.rows == 500
+    assert pooled.columns[SHEET_COLUMN].top.counts.to_dict() == {"a": 300, "b": 200}
+    assert pooled.columns["x"].moments.mean == serial.columns["x"].moments.mean
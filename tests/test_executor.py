@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from utils.executor import Task, iter_tasks, make_executor, run_tasks
+
+
+def nap(seconds, value):
+    time.sleep(seconds)
+    return [value]
+
+
+def fail(value):
+    raise RuntimeError(value)
+
+
+@pytest.fixture(params=['serial', 'thread', 'process'])
+def executor(request):
+    executor = make_executor(request.param, 4)
+    yield executor
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_results_are_in_task_order(executor):
+    # Later tasks finish first
+    tasks = [Task(nap, (0.05 * (4 - n), n), ["fallback"]) for n in range(4)]
+    results, report = run_tasks(tasks, executor)
+    assert results == [0, 1, 2, 3]
+    assert report["errors"] == report["timeouts"] == 0
+    assert len(report["timings"]) == 4
+
+
+def test_raising_task_gets_its_fallbacks(executor):
+    tasks = [Task(nap, (0, "a"), ["a?"]), Task(fail, ("b",), ["b?", "b??"]), Task(nap, (0, "c"), ["c?"])]
+    results, report = run_tasks(tasks, executor)
+    assert results == ["a", "b?", "b??", "c"]
+    assert report["errors"] == 1
+
+
+@pytest.mark.parametrize("kind", ['thread', 'process'])
+def test_task_over_its_deadline_gets_its_fallbacks(kind):
+    executor = make_executor(kind, 2)
+    try:
+        tasks = [Task(nap, (2.0, "slow"), ["slow?"]), Task(nap, (0, "fast"), ["fast?"])]
+        started = time.perf_counter()
+        results, report = run_tasks(tasks, executor, timeout=0.3)
+        assert time.perf_counter() - started < 1.5
+        assert results == ["slow?", "fast"]
+        assert report["timeouts"] == 1
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_cheapest_tasks_run_first():
+    tasks = [Task(nap, (0, n), [None], cost=cost) for n, cost in enumerate([3, 1, 2])]
+    assert [n for n, _ in iter_tasks(tasks)] == [1, 2, 0]
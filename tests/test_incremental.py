@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data
+from utils.incremental import ProfileStateStore, extend_profile
+from utils.streaming import profile_csv_in_chunks
+
+CHUNK = 40
+
+
+def summary(acc):
+    columns = {}
+    for col, c in acc.columns.items():
+        columns[col] = {"count": c.count, "nulls": c.nulls, "top": c.top.counts.sort_index().to_dict()}
+        if c.is_numeric:
+            m = c.moments
+            columns[col].update(mean=round(m.mean, 9), std=round(m.std, 9), min=m.min, max=m.max)
+    return {"rows": acc.rows, "duplicates": acc.duplicates, "columns": columns}
+
+
+def frame(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"x": rng.integers(0, 20, rows), "y": rng.normal(size=rows).round(3),
+                         "k": rng.choice(["a", "b", None], rows)})
+
+
+def write(path, df, newline="\n", terminated=True, header=True):
+    text = df.to_csv(index=False, header=header, lineterminator=newline)
+    if not terminated:
+        text = text[:-len(newline)]
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return text
+
+
+# Profiles `old`, stores its state and profiles `new` from it as
+# data.profile_csv_incrementally does: the extended profile, or None when
+# the store offers no usable prefix
+def extend(tmp_path, old, new):
+    store = ProfileStateStore(str(tmp_path / "states"))
+    store.put(str(old), "old", profile_csv_in_chunks(str(old), CHUNK))
+    acc, base, offset = store.find_prefix(str(new))
+    if acc is None:
+        return None
+    return extend_profile(acc, str(new), offset, CHUNK)
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_appended_rows_extend_the_profile(tmp_path, newline):
+    df = frame(150, 0)
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    write(old, df.iloc[:100], newline)
+    # Rows repeated from the prefix count as duplicates of it
+    write(new, pd.concat([df.iloc[:100], df.iloc[100:], df.iloc[:5]]), newline)
+    extended = extend(tmp_path, old, new)
+    assert extended is not None
+    assert summary(extended) == summary(profile_csv_in_chunks(str(new), CHUNK))
+    assert extended.duplicates >= 5
+
+
+def test_unterminated_last_row_is_ended_not_extended(tmp_path):
+    df = frame(60, 1)
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    write(old, df.iloc[:50], terminated=False)
+    write(new, df)
+    extended = extend(tmp_path, old, new)
+    assert summary(extended) == summary(profile_csv_in_chunks(str(new), CHUNK))
+
+
+def test_unterminated_last_row_continued_is_not_a_prefix(tmp_path):
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    old.write_bytes(b"x,y\n1,2\n3,4")
+    new.write_bytes(b"x,y\n1,2\n3,45\n6,7\n")
+    store = ProfileStateStore(str(tmp_path / "states"))
+    store.put(str(old), "old", profile_csv_in_chunks(str(old)))
+    assert store.find_prefix(str(new)) == (None, None, None)
+
+
+def test_changed_header_is_not_a_prefix(tmp_path):
+    df = frame(80, 2)
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    write(old, df.iloc[:50])
+    write(new, df.rename(columns={"y": "z"}))
+    assert extend(tmp_path, old, new) is None
+
+
+def test_changed_schema_falls_back(tmp_path):
+    df = frame(80, 3)
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    text = write(old, df.iloc[:50])
+    with open(new, "w", newline="") as f:
+        f.write(text + "".join(f"oops,{i},a\n" for i in range(CHUNK)))
+    # x stops being numeric in the appended rows
+    assert extend(tmp_path, old, new) is None
+
+
+def test_edited_file_is_not_a_prefix(tmp_path):
+    df = frame(80, 4)
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    write(old, df.iloc[:50])
+    edited = df.copy()
+    edited.loc[10, "x"] = 99
+    write(new, edited)
+    assert extend(tmp_path, old, new) is None
+
+
+def test_incremental_upload_matches_full_profile(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(data.app.config, 'INCREMENTAL_UPLOADS', True)
+    monkeypatch.setitem(data.app.config, 'CSV_CHUNK_SIZE', CHUNK)
+    df = frame(200, 5)
+    for rows, name in ((120, "old.csv"), (200, "new.csv")):
+        path = tmp_path / name
+        write(path, df.iloc[:rows])
+        with open(path, "rb") as f:
+            filepath, content_hash = data.upload_store.save(f, name, "tester")
+        acc = data.profile_csv_incrementally(filepath, content_hash, CHUNK)
+        # The second upload must be profiled from the first one's state
+        monkeypatch.setattr(data, 'profile_csv_in_chunks', None)
+    assert summary(acc) == summary(profile_csv_in_chunks(filepath, CHUNK))
+    # The appended upload's state is stored for the next one
+    assert summary(data.profile_states.get(filepath, content_hash)) == summary(acc)
@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import data
+from conftest import wait_for
+
+
+def upload(client, name, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"x": rng.normal(size=500), "y": rng.integers(0, 5, 500), "label": rng.choice(list("abc"), 500)})
+    body = df.to_csv(index=False).encode()
+    return client.post('/api/jobs', data={'dataset': (io.BytesIO(body), name)}, content_type='multipart/form-data')
+
+
+def test_streamed_job_completes(client, monkeypatch):
+    monkeypatch.setitem(data.app.config, 'STREAMING_THRESHOLD', 0)
+    response = upload(client, 'streamed.csv')
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    status = wait_for(client, job_id)
+    assert status["status"] == 'done'
+    assert status["total"] == 2
+    assert status["progress"] == 1.0
+    results = client.get(f'/api/jobs/{job_id}/results').get_json()
+    assert results["charts"]
+
+
+def test_charts_are_served_from_the_result_cache(client, monkeypatch):
+    response = upload(client, 'cached.csv')
+    dataset_id = response.get_json()["dataset_id"]
+    assert wait_for(client, response.get_json()["job_id"])["status"] == 'done'
+    # As in a restarted or different worker process
+    monkeypatch.setattr(data, 'datasets', data.DatasetRegistry())
+    listing = client.get(f'/api/datasets/{dataset_id}/charts')
+    assert listing.status_code == 200
+    chart_id = listing.get_json()["charts"][0]["id"]
+    assert client.get(f'/api/datasets/{dataset_id}/charts/{chart_id}').get_json()["id"] == chart_id
+    assert client.get('/api/datasets/unknown/charts').status_code == 404
+
+
+def test_preprocessed_empty_workbook(client, monkeypatch, tmp_path):
+    monkeypatch.setitem(data.app.config, 'EXCEL_STREAMING_THRESHOLD', 0)
+    monkeypatch.setitem(data.app.config, 'PREPROCESS_UPLOADS', True)
+    path = tmp_path / "empty.xlsx"
+    openpyxl.Workbook().save(path)
+    response = client.post('/api/jobs', data={'dataset': (io.BytesIO(path.read_bytes()), 'empty.xlsx')},
+                           content_type='multipart/form-data')
+    status = wait_for(client, response.get_json()["job_id"])
+    assert status["status"] == 'done', status["error"]
+    assert not list((tmp_path / "uploads").rglob("*.clean.csv"))
+
+
+def test_lazy_chart_sets_are_bounded_by_memory(client, tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    for n in range(3):
+        path = tmp_path / f"lazy{n}.csv"
+        pd.DataFrame({"x": rng.normal(size=2000), "y": rng.normal(size=2000)}).to_csv(path, index=False)
+        paths.append(path)
+    data.build_lazy_dashboard(str(paths[0]), "lazy0.csv", "hash0", "lazy0")
+    one = data.datasets.nbytes
+    assert one > 0
+    data.datasets.max_bytes = int(one * 1.5)
+    for n in (1, 2):
+        data.build_lazy_dashboard(str(paths[n]), f"lazy{n}.csv", f"hash{n}", f"lazy{n}")
+    assert data.datasets.nbytes == one
+    assert data.datasets.get("lazy0") is None and data.datasets.get("lazy1") is None
+    assert data.datasets.get("lazy2") is not None
+    assert client.get('/cache/stats').get_json()["lazy_chart_bytes"] == one
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from scipy.stats import gaussian_kde
+
+from utils.kde import binned_kde
+
+
+@pytest.mark.parametrize("bandwidth", ["scott", "silverman"])
+def test_matches_gaussian_kde(bandwidth):
+    sample = np.random.default_rng(4).normal(10, 3, 5000)
+    (x_vals, y_vals), = binned_kde(sample[:, None], bandwidth)
+    expected = gaussian_kde(sample, bw_method=bandwidth)(x_vals)
+    assert np.allclose(y_vals, expected, atol=1e-3 * expected.max())
+
+
+def test_columns_are_estimated_independently():
+    rng = np.random.default_rng(5)
+    values = np.column_stack([rng.normal(0, 1, 2000), rng.exponential(5, 2000)])
+    values[::7, 0] = np.nan
+    both = binned_kde(values)
+    for c in range(2):
+        alone, = binned_kde(values[:, c:c + 1])
+        assert np.allclose(both[c][1], alone[1])
+
+
+def test_non_finite_values_are_missing():
+    values = np.array([[1.0, np.inf, 1.0],
+                       [2.0, np.nan, -np.inf],
+                       [np.inf, 3.0, np.nan],
+                       [4.0, np.nan, np.nan]])
+    with_inf, only_inf, single = binned_kde(values)
+    finite, = binned_kde(np.array([[1.0], [2.0], [4.0]]))
+    assert np.allclose(with_inf[0], finite[0]) and np.allclose(with_inf[1], finite[1])
+    assert np.all(np.isfinite(with_inf[1]))
+    assert only_inf is None  # one finite value: no spread
+    assert single is None
@@ -0,0 +1,13 @@
+import pandas as pd
+
+from utils.dtypes import optimize_dtypes
+from utils.insights import generate_insights
+
+
+def test_category_columns_share_one_dtype_line():
+    df = pd.DataFrame({"a": ["x", "y"] * 50, "b": ["p", "q", "r", "s"] * 25, "n": range(100)})
+    df, _ = optimize_dtypes(df)
+    assert [str(df[col].dtype) for col in "ab"] == ["category", "category"]
+    insights = generate_insights(df)
+    section = insights[insights.index("--- Data Types ---") + 1:]
+    assert [line for line in section if "'category'" in line] == ["2 column(s) of type 'category'"]
@@ -0,0 +1,28 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block:
+            event, data = block.split("\n", 1)
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_is_traced(client):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"x": rng.normal(size=300), "y": rng.normal(size=300)})
+    response = client.post('/api/stream', data={'dataset': (io.BytesIO(df.to_csv(index=False).encode()), 's.csv')},
+                           content_type='multipart/form-data')
+    events = read_events(response)
+    assert events[-1][0] == "done"
+    assert "profile" in events[-1][1]["server_timing"]
+    # One KDE task per numeric column
+    kde = [data for event, data in events if event == "chart" and data["title"].startswith("KDE")]
+    assert len(kde) == 2 and not any(chart["error"] for chart in kde)
+    assert 'stage="stream"' in client.get('/metrics').get_data(as_text=True)
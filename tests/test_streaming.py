@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import data
+from utils.dtypes import optimize_dtypes
+from utils.insights import datetime_section, insights_from_accumulator
+from utils.profile import profile_dataset
+from utils.streaming import DatasetAccumulator, RowHashSet, profile_csv_in_chunks
+
+
+def test_infinite_values_are_counted_apart():
+    df = pd.DataFrame({"a": [1.0, np.inf, 2.0, -np.inf, 3.0, np.nan], "b": [1, 2, 3, 4, 5, 6]})
+    acc = DatasetAccumulator()
+    acc.update(df.iloc[:3])
+    acc.update(df.iloc[3:])
+    column = acc.columns["a"]
+    assert column.infinite == 2
+    assert column.nulls == 1
+    assert column.moments.count == 3
+    assert column.moments.mean == 2.0
+    assert (column.moments.min, column.moments.max) == (1.0, 3.0)
+    assert column.histogram.counts.sum() == 3
+
+
+def test_infinite_values_survive_merge():
+    left = DatasetAccumulator()
+    left.update(pd.DataFrame({"a": [np.inf, 1.0]}))
+    right = DatasetAccumulator()
+    right.update(pd.DataFrame({"a": [-np.inf, 2.0]}))
+    left.merge(right)
+    assert left.columns["a"].infinite == 2
+    assert left.columns["a"].moments.count == 2
+
+
+def test_row_hash_set_counts_duplicates_across_chunks():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 5000, 20000).astype(np.uint64)
+    seen = RowHashSet()
+    new = np.concatenate([seen.add(hashes[i:i + 1000]) for i in range(0, len(hashes), 1000)])
+    assert new.sum() == len(seen) == len(np.unique(hashes))
+    assert np.array_equal(np.sort(seen.hashes), np.unique(hashes))
+
+
+def test_empty_numeric_column_is_skipped():
+    acc = DatasetAccumulator()
+    acc.update(pd.read_csv(io.StringIO("a,b\n1,\n2,\n3,\n")))
+    hist = acc.columns["b"].histogram
+    assert len(hist.edges()) == 0 and len(hist.centers()) == 0
+    assert np.isnan(hist.quantile(0.5))
+    assert hist.count_outside(0, 1) == 0
+    insights = insights_from_accumulator(acc)
+    assert not any("'b'" in line for line in insights if "mean=" in line or "skew" in line)
+    assert any(line.startswith("Numeric column 'a'") for line in insights)
+
+
+def test_streamed_upload_with_empty_column(client, monkeypatch):
+    monkeypatch.setitem(data.app.config, 'STREAMING_THRESHOLD', 0)
+    response = client.post('/api/stream', data={'dataset': (io.BytesIO(b"a,b\n1,\n2,\n3,\n"), 'e.csv')},
+                           content_type='multipart/form-data')
+    body = response.get_data(as_text=True)
+    assert "event: done" in body and "event: error" not in body
+
+
+def test_upload_opts_in_to_approximate_profile(client):
+    csv = b"a,b\n1,x\n2,y\n3,z\n"
+    exact = client.post('/api/jobs', data={'dataset': (io.BytesIO(csv), 'a.csv')},
+                        content_type='multipart/form-data').get_json()
+    approximate = client.post('/api/jobs', data={'dataset': (io.BytesIO(csv), 'a.csv'), 'approximate': '1'},
+                              content_type='multipart/form-data').get_json()
+    assert exact["dataset_id"].endswith("-f")
+    assert approximate["dataset_id"].endswith("-s")
+
+
+def test_datetime_columns_are_detected_from_the_first_chunk(tmp_path):
+    path = tmp_path / "d.csv"
+    dates = pd.Series(pd.date_range("2024-01-01", periods=50, freq="D").strftime("%Y-%m-%d"))
+    dates[7] = None
+    # 'later' only stops looking like dates after the first chunk
+    later = dates.fillna("2024-01-01").where(dates.index < 40, "soon")
+    pd.DataFrame({"when": dates, "later": later, "x": np.arange(50)}).to_csv(path, index=False)
+    acc = profile_csv_in_chunks(path, chunksize=10)
+    assert acc.datetime_columns == ["when"]
+    exact = datetime_section(profile_dataset(optimize_dtypes(pd.read_csv(path))[0]))
+    streamed = insights_from_accumulator(acc)
+    start = streamed.index("--- Datetime Columns ---")
+    assert streamed[start:start + len(exact)] == exact
@@ -0,0 +1,42 @@
+import io
+import os
+import types
+
+from utils import uploads
+from utils.uploads import UploadStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_touch_keeps_the_owners_upload(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(uploads, 'time', types.SimpleNamespace(time=clock))
+    store = UploadStore(str(tmp_path), str(tmp_path / "index.sqlite3"), ttl=100, grace=10)
+    _, kept = store.save(io.BytesIO(b"a,b\n1,2\n"), "kept.csv", "alice")
+    _, idle = store.save(io.BytesIO(b"a,b\n3,4\n"), "idle.csv", "alice")
+    clock.now += 80
+    store.touch(kept, "alice")
+    clock.now += 80
+    store.evict()
+    assert [upload["hash"] for upload in store.uploads("alice")] == [kept]
+    assert store.stats()["objects"] == 1
+
+
+def test_eviction_removes_every_extension(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(uploads, 'time', types.SimpleNamespace(time=clock))
+    store = UploadStore(str(tmp_path), str(tmp_path / "index.sqlite3"), ttl=100, grace=10)
+    csv_path, content_hash = store.save(io.BytesIO(b"a,b\n1,2\n"), "data.csv", "alice")
+    xlsx_path, same_hash = store.save(io.BytesIO(b"a,b\n1,2\n"), "data.xlsx", "bob")
+    assert same_hash == content_hash and csv_path != xlsx_path
+    assert os.path.exists(csv_path) and os.path.exists(xlsx_path)
+    clock.now += 200
+    store.evict()
+    assert store.stats()["objects"] == 0
+    assert not os.listdir(os.path.dirname(csv_path))
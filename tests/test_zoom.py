@@ -0,0 +1,29 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import data
+from conftest import wait_for
+from utils.datasets import DatasetRegistry
+
+
+def test_zoom_reads_only_the_series(client, monkeypatch):
+    rng = np.random.default_rng(2)
+    n = 2000
+    when = pd.Timestamp('2021-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 90 * 24 * 3600, n)), unit='s')
+    df = pd.DataFrame({"when": when.strftime('%Y-%m-%d %H:%M:%S'), "amount": rng.normal(size=n),
+                       "kind": rng.choice(list("abc"), n)})
+    response = client.post('/api/jobs', data={'dataset': (io.BytesIO(df.to_csv(index=False).encode()), 'ev.csv')},
+                           content_type='multipart/form-data')
+    dataset_id = response.get_json()["dataset_id"]
+    assert wait_for(client, response.get_json()["job_id"])["status"] == 'done'
+
+    loads = []
+    load = data.columnar_store.load
+    monkeypatch.setattr(data.columnar_store, 'load', lambda key, columns=None: loads.append(columns) or load(key, columns))
+    monkeypatch.setattr(data, 'time_pyramids', DatasetRegistry(max_datasets=float('inf')))
+    zoom = client.get(f'/api/datasets/{dataset_id}/timeseries/when?points=50').get_json()
+    assert list(zoom["series"]) == ["amount"]
+    assert loads == [["when", "amount"]]
+    assert client.get(f'/api/datasets/{dataset_id}/timeseries/kind').status_code == 404
@@ -0,0 +1,66 @@
+import numpy as np
+
+MAX_BINS = 100
+DEFAULT_BINS = 30
+BIN_RULES = ('fd', 'sturges', 'fixed')
+
+
+def bin_count(values, rule='fd', bins=DEFAULT_BINS, max_bins=MAX_BINS):
+    n = len(values)
+    span = values.max() - values.min()
+    sturges = int(np.ceil(np.log2(n))) + 1
+    if rule == 'fixed':
+        k = bins
+    elif rule == 'sturges':
+        k = sturges
+    elif rule == 'fd':
+        # Freedman-Diaconis: width = 2 * IQR / n^(1/3); falls back to Sturges when IQR is 0
+        q1, q3 = np.percentile(values, [25, 75])
+        width = 2 * (q3 - q1) / np.cbrt(n)
+        k = int(np.ceil(span / width)) if width > 0 else sturges
+    else:
+        raise ValueError(f"Unknown bin rule '{rule}', expected one of {BIN_RULES}")
+    return int(max(1, min(k, max_bins)))
+
+
+# Returns (edges, counts, discrete). Integer columns spanning fewer than
+# max_bins values get one unit-wide bin per value (discrete is True) so
+# discrete data keeps its exact counts.
+def histogram(values, rule='fd', bins=DEFAULT_BINS, max_bins=MAX_BINS):
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.array([]), np.array([], dtype=np.int64), False
+    lo, hi = values.min(), values.max()
+    if hi - lo < max_bins and np.all(values == np.round(values)):
+        edges = np.arange(lo - 0.5, hi + 1.5)
+        counts = np.bincount((values - lo).astype(np.int64), minlength=len(edges) - 1)
+        return edges, counts, True
+    if hi == lo:
+        return np.array([lo, hi]), np.array([len(values)], dtype=np.int64), False
+    k = bin_count(values, rule, bins, max_bins)
+    width = (hi - lo) / k
+    idx = ((values - lo) / width).astype(np.int64)
+    np.minimum(idx, k - 1, out=idx)
+    counts = np.bincount(idx, minlength=k)
+    return lo + np.arange(k + 1) * width, counts, False
+
+
+# Merges neighbouring bins of an existing histogram until at most max_bins remain
+def rebin(edges, counts, max_bins=MAX_BINS):
+    if len(counts) <= max_bins:
+        return edges, counts
+    factor = int(np.ceil(len(counts) / max_bins))
+    pad = -len(counts) % factor
+    counts = np.concatenate([counts, np.zeros(pad, dtype=counts.dtype)]).reshape(-1, factor).sum(axis=1)
+    width = edges[1] - edges[0]
+    return edges[0] + np.arange(len(counts) + 1) * width * factor, counts
+
+
+# Bins of a discrete histogram are labelled with the integer each one holds.
+# Edges alone cannot tell those apart from continuous bins that happen to be
+# one unit wide, which are labelled with their range like any other.
+def histogram_labels(edges, discrete=False):
+    if discrete:
+        return [str(int(edge + 0.5)) for edge in edges[:-1]]
+    return [f"{lo:.4g}" if lo == hi else f"{lo:.4g} – {hi:.4g}" for lo, hi in zip(edges[:-1], edges[1:])]
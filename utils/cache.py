@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+MEMORY_LIMIT_BYTES = 256 * 1024 * 1024
+DISK_LIMIT_BYTES = 2 * 1024 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def options_fingerprint(options):
+    encoded = json.dumps(options, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+
+# Two-tier cache for dashboard results: an in-memory LRU bounded by the
+# pickled size of its entries, backed by one pickle file per key on disk so
+# results survive worker restarts.
+class ResultCache:
+    def __init__(self, directory, memory_limit=MEMORY_LIMIT_BYTES, disk_limit=DISK_LIMIT_BYTES):
+        self.directory = directory
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._entries = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                         "memory_evictions": 0, "disk_evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._entries[key][0]
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            value = pickle.loads(payload)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        with self._lock:
+            self.counters["disk_hits"] += 1
+            self._remember(key, value, len(payload))
+        return value
+
+    def put(self, key, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._remember(key, value, len(payload))
+        self._evict_disk()
+
+    def _remember(self, key, value, size):
+        if size > self.memory_limit:
+            return
+        if key in self._entries:
+            self._memory_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_limit:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.counters["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.counters["disk_evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._entries)
+            stats["memory_bytes"] = self._memory_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -3,305 +3,488 @@ import numpy as np
 import uuid
 from itertools import combinations
 
-def generate_charts(df):
-    charts = []
-    
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-    
-    # 1. Histogram (bar chart of value counts for numeric cols)
-    for col in numeric_cols:
-        chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-        counts = df[col].dropna().value_counts().sort_index()
-        try:
-            config = {
-                "type": "bar",
-                "data": {
-                    "labels": counts.index.astype(str).tolist(),
-                    "datasets": [{
-                        "label": f"Histogram of {col}",
-                        "data": counts.tolist(),
-                        "backgroundColor": "rgba(75, 200, 192, 0.6)"
-                    }]
-                },
-                "options": {
-                    "scales": {
-                        "x": {"title": {"display": True, "text": col}},
-                        "y": {"title": {"display": True, "text": "Count"}}
-                    }
-                }
+from utils.profile import profile_dataset
+from utils.binning import histogram, histogram_labels, rebin, MAX_BINS
+from utils.decimation import decimate, LINE_MAX_POINTS, MIN_POINTS
+from utils.kde import binned_kde
+from utils.scatter import (PairSampler, DensityGrid, density_points,
+                           SCATTER_MAX_POINTS, SCATTER_MAX_PAIRS, DENSITY_GRID, SCATTER_MODES)
+from utils.correlation import top_correlations
+from utils.executor import Task, run_tasks, TASK_TIMEOUT
+from utils.encoding import encode_values, encode_points, ENCODINGS
+from utils.timeseries import TimePyramid, series_columns, format_times, json_floats
+
+# Bump whenever chart output changes so cached dashboards are recomputed
+CHARTS_VERSION = 12
+
+PIE_COLORS = [
+    "#FF6384", "#36A2EB", "#FFCE56", "#AA66CC", "#99CC00",
+    "#FF9F40", "#66FF66", "#FF6666", "#6699FF", "#CCCC00"
+]
+
+
+def new_chart_id():
+    return str(uuid.uuid4()).replace('-', '')[:8]
+
+
+def histogram_config(col, labels, counts):
+    return {
+        "type": "bar",
+        "data": {
+            "labels": labels,
+            "datasets": [{
+                "label": f"Histogram of {col}",
+                "data": counts,
+                "backgroundColor": "rgba(75, 200, 192, 0.6)"
+            }]
+        },
+        "options": {
+            "scales": {
+                "x": {"title": {"display": True, "text": col}},
+                "y": {"title": {"display": True, "text": "Count"}}
             }
-            charts.append({
-                "id": chart_id,
-                "title": f"Histogram of {col}",
-                "config": config,
-                "description": f"Histogram showing value counts for {col}.",
-                "error": False
-            })
-        except Exception:
-            charts.append({
-                "id": chart_id,
-                "title": f"Histogram of {col}",
-                "config": {},
-                "description": f"Could not generate histogram for {col}.",
-                "error": True
-            })
-    
-    # 2. Scatter plot for every numeric pair (x vs y)
-    for i in range(len(numeric_cols)):
-        for j in range(i + 1, len(numeric_cols)):
-            x_col = numeric_cols[i]
-            y_col = numeric_cols[j]
-            chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-            try:
-                filtered = df[[x_col, y_col]].dropna()
-                data_points = [{"x": float(x), "y": float(y)} for x, y in zip(filtered[x_col], filtered[y_col])]
-                config = {
-                    "type": "scatter",
-                    "data": {
-                        "datasets": [{
-                            "label": f"{x_col} vs {y_col}",
-                            "data": data_points,
-                            "backgroundColor": "rgba(153, 102, 255, 0.6)"
-                        }]
-                    },
-                    "options": {
-                        "scales": {
-                            "x": {"title": {"display": True, "text": x_col}},
-                            "y": {"title": {"display": True, "text": y_col}}
-                        }
-                    }
-                }
-                charts.append({
-                    "id": chart_id,
-                    "title": f"Scatter Plot: {x_col} vs {y_col}",
-                    "config": config,
-                    "description": f"Scatter plot showing relationship between {x_col} and {y_col}.",
-                    "error": False
-                })
-            except Exception:
-                charts.append({
-                    "id": chart_id,
-                    "title": f"Scatter Plot: {x_col} vs {y_col}",
-                    "config": {},
-                    "description": f"Could not generate scatter plot for {x_col} and {y_col}.",
-                    "error": True
-                })
-    
-    # 3. Line plot per numeric column over datetime index (if index is datetime)
-    if pd.api.types.is_datetime64_any_dtype(df.index):
-        for col in numeric_cols:
-            chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-            try:
-                config = {
-                    "type": "line",
-                    "data": {
-                        "labels": df.index.astype(str).tolist(),
-                        "datasets": [{
-                            "label": col,
-                            "data": df[col].fillna(0).tolist(),
-                            "borderColor": "rgba(54, 162, 235, 1)",
-                            "fill": False,
-                            "tension": 0.1
-                        }]
-                    },
-                    "options": {
-                        "scales": {
-                            "x": {"title": {"display": True, "text": "Date"}},
-                            "y": {"title": {"display": True, "text": col}}
-                        }
-                    }
-                }
-                charts.append({
-                    "id": chart_id,
-                    "title": f"Line Plot of {col}",
-                    "config": config,
-                    "description": f"Line plot of {col} over time.",
-                    "error": False
-                })
-            except Exception:
-                charts.append({
-                    "id": chart_id,
-                    "title": f"Line Plot of {col}",
-                    "config": {},
-                    "description": f"Could not generate line plot for {col}.",
-                    "error": True
-                })
-    
-    # 4. Pie chart for categorical cols with ≤10 categories
-    for col in cat_cols:
-        if df[col].nunique() <= 10:
-            chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-            try:
-                counts = df[col].value_counts()
-                colors = [
-                    "#FF6384", "#36A2EB", "#FFCE56", "#AA66CC", "#99CC00",
-                    "#FF9F40", "#66FF66", "#FF6666", "#6699FF", "#CCCC00"
-                ][:len(counts)]
-                config = {
-                    "type": "pie",
-                    "data": {
-                        "labels": counts.index.tolist(),
-                        "datasets": [{
-                            "data": counts.tolist(),
-                            "backgroundColor": colors
-                        }]
-                    },
-                    "options": {
-                        "plugins": {"legend": {"display": True}}
-                    }
-                }
-                charts.append({
-                    "id": chart_id,
-                    "title": f"Pie Chart of {col}",
-                    "config": config,
-                    "description": f"Pie chart showing distribution of {col}.",
-                    "error": False
-                })
-            except Exception:
-                charts.append({
-                    "id": chart_id,
-                    "title": f"Pie Chart of {col}",
-                    "config": {},
-                    "description": f"Could not generate pie chart for {col}.",
-                    "error": True
-                })
-    
-    
-    # Example: Bar chart for categorical features with limited categories
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-    for col in cat_cols:
-        if df[col].nunique() > 20:
-            continue  # skip too many categories
-        chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-        try:
-            counts = df[col].value_counts()
-            bar_config = {
-                "type": "bar",
-                "data": {
-                    "labels": counts.index.tolist(),
-                    "datasets": [{
-                        "label": col,
-                        "data": counts.tolist(),
-                        "backgroundColor": "#99CC00"
-                    }]
-                },
-                "options": {
-                    "responsive": True,
-                    "plugins": {"legend": {"display": False}},
-                    "scales": {
-                        "x": {"title": {"display": True, "text": col}},
-                        "y": {"title": {"display": True, "text": "Count"}}
-                    }
-                }
+        }
+    }
+
+
+def scatter_config(x_col, y_col, data_points, chart_type="scatter"):
+    return {
+        "type": chart_type,
+        "data": {
+            "datasets": [{
+                "label": f"{x_col} vs {y_col}",
+                "data": data_points,
+                "backgroundColor": "rgba(153, 102, 255, 0.6)"
+            }]
+        },
+        "options": {
+            "scales": {
+                "x": {"title": {"display": True, "text": x_col}},
+                "y": {"title": {"display": True, "text": y_col}}
             }
-            charts.append({
-                "id": chart_id,
-                "title": f"Bar chart of {col}",
-                "config": bar_config,
-                "description": f"Value counts of categorical column {col}.",
-                "error": False
-            })
-        except Exception:
-            charts.append({
-                "id": chart_id,
-                "title": f"Bar chart of {col}",
-                "config": {},
-                "description": f"Could not plot bar chart of {col}.",
-                "error": True
-            })
-    
-    # line plot 
-    num_cols = df.select_dtypes(include=['number']).columns.tolist()
-    for col in num_cols:
-        chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-        try:
-            line_config = {
-            "type": "line",
-            "data": {
-                "labels": df.index.astype(str).tolist(),
-                "datasets": [{
-                    "label": col,
-                    "data": df[col].tolist(),
-                    "fill": False,
-                    "borderColor": "rgba(54, 162, 235, 0.7)",
-                    "tension": 0.1
-                }]
-            },
-            "options": {
-                "responsive": True,
-                "plugins": {"legend": {"display": True}},
-                "scales": {
-                    "x": {"title": {"display": True, "text": "Index"}},
-                    "y": {"title": {"display": True, "text": col}}
-                }
+        }
+    }
+
+
+# Labels and values of the points kept by decimation for one series
+def decimated_series(values, index_labels, max_points, method, encoding='json'):
+    idx = decimate(values, max_points, method)
+    return index_labels[idx].tolist(), encode_values(values[idx], encoding)
+
+
+def pie_config(labels, counts):
+    return {
+        "type": "pie",
+        "data": {
+            "labels": labels,
+            "datasets": [{
+                "data": counts,
+                "backgroundColor": PIE_COLORS[:len(counts)]
+            }]
+        },
+        "options": {
+            "plugins": {"legend": {"display": True}}
+        }
+    }
+
+
+def category_bar_config(col, labels, counts):
+    return {
+        "type": "bar",
+        "data": {
+            "labels": labels,
+            "datasets": [{
+                "label": col,
+                "data": counts,
+                "backgroundColor": "#99CC00"
+            }]
+        },
+        "options": {
+            "responsive": True,
+            "plugins": {"legend": {"display": False}},
+            "scales": {
+                "x": {"title": {"display": True, "text": col}},
+                "y": {"title": {"display": True, "text": "Count"}}
+            }
+        }
+    }
+
+
+def error_chart(chart_id, title, description):
+    return {
+        "id": chart_id,
+        "title": title,
+        "config": {},
+        "description": description,
+        "error": True
+    }
+
+
+# Each *_chart function below is one independent task: it returns a list of
+# chart dicts and may raise, in which case the task's error placeholders are used.
+
+# 1. Histogram (binned counts for numeric cols, at most max_bins bars)
+def histogram_chart(chart_id, col, values, bin_rule, max_bins, encoding):
+    edges, counts, discrete = histogram(values, bin_rule, max_bins=max_bins)
+    config = histogram_config(col, histogram_labels(edges, discrete), encode_values(counts, encoding, 'int32'))
+    return [{
+        "id": chart_id,
+        "title": f"Histogram of {col}",
+        "config": config,
+        "description": f"Histogram showing binned counts for {col}.",
+        "error": False
+    }]
+
+
+# 2. Scatter plot for a numeric pair (x vs y), capped sample or density grid
+def scatter_chart(chart_id, x_col, y_col, source, i, j, encoding):
+    if isinstance(source, DensityGrid):
+        config = scatter_config(x_col, y_col, density_points(*source.pair(i, j), encoding=encoding),
+                                chart_type="bubble")
+        description = (f"Density of {x_col} vs {y_col} on a {source.grid}x{source.grid} grid; "
+                       f"bubble size shows the number of rows per cell.")
+    else:
+        x, y, total = source.pair(i, j)
+        config = scatter_config(x_col, y_col, encode_points(encoding, x=x, y=y))
+        description = f"Scatter plot showing relationship between {x_col} and {y_col}."
+        if total > len(x):
+            description += f" Random sample of {len(x)} of {total} rows."
+    return [{
+        "id": chart_id,
+        "title": f"Scatter Plot: {x_col} vs {y_col}",
+        "config": config,
+        "description": description,
+        "error": False
+    }]
+
+
+# 3. Line plot of a numeric column over a datetime index
+def datetime_line_chart(chart_id, col, values, index_labels, max_points, method, encoding):
+    labels, data = decimated_series(np.nan_to_num(values), index_labels, max_points, method, encoding)
+    config = {
+        "type": "line",
+        "data": {
+            "labels": labels,
+            "datasets": [{
+                "label": col,
+                "data": data,
+                "borderColor": "rgba(54, 162, 235, 1)",
+                "fill": False,
+                "tension": 0.1
+            }]
+        },
+        "options": {
+            "scales": {
+                "x": {"title": {"display": True, "text": "Date"}},
+                "y": {"title": {"display": True, "text": col}}
             }
+        }
+    }
+    return [{
+        "id": chart_id,
+        "title": f"Line Plot of {col}",
+        "config": config,
+        "description": f"Line plot of {col} over time.",
+        "error": False
+    }]
+
+
+# 3b. Rows per time bucket of a datetime column (col is None), or the
+# min/mean/max band of a numeric column, at the finest pyramid level that
+# fits max_points. "zoom" lets the client fetch other windows from
+# /api/datasets/<dataset_id>/timeseries/<time_col>.
+def time_series_chart(chart_id, time_col, col, pyramid, max_points, encoding):
+    window = pyramid.window(max_points=max_points, columns=[] if col is None else [col])
+    resolution = window["resolution"]
+    if col is None:
+        title = f"Rows per {resolution} of {time_col}"
+        datasets = [{"label": "Rows", "data": encode_values(window["count"], encoding, 'int32'),
+                     "borderColor": "rgba(54, 162, 235, 1)", "fill": False, "tension": 0.1}]
+    else:
+        title = f"{col} over {time_col}"
+        stats = {key: encode_values(values, encoding) if encoding == 'typed' else json_floats(values)
+                 for key, values in window["series"][col].items()}
+        datasets = [
+            {"label": f"mean {col}", "data": stats["mean"],
+             "borderColor": "rgba(54, 162, 235, 1)", "fill": False, "tension": 0.1},
+            {"label": f"min {col}", "data": stats["min"],
+             "borderColor": "rgba(54, 162, 235, 0.3)", "pointRadius": 0, "fill": False},
+            {"label": f"max {col}", "data": stats["max"],
+             "borderColor": "rgba(54, 162, 235, 0.3)", "backgroundColor": "rgba(54, 162, 235, 0.1)",
+             "pointRadius": 0, "fill": "-1"},
+        ]
+    config = {
+        "type": "line",
+        "data": {"labels": format_times(window["start"]), "datasets": datasets},
+        "options": {
+            "responsive": True,
+            "spanGaps": False,
+            "scales": {
+                "x": {"title": {"display": True, "text": f"{time_col} ({resolution})"}},
+                "y": {"title": {"display": True, "text": "Rows" if col is None else col}}
             }
-            charts.append({
-               "id": chart_id,
-             "title": f"Line plot of {col}",
-                 "config": line_config,
-             "description": f"Line plot of numeric column {col} over index.",
-             "error": False
-            })
-        except Exception:
-            charts.append({
-            "id": chart_id,
-            "title": f"Line plot of {col}",
-            "config": {},
-            "description": f"Could not plot line plot of {col}.",
-            "error": True
-            })
+        }
+    }
+    return [{
+        "id": chart_id,
+        "title": title,
+        "config": config,
+        "description": f"{title}, aggregated per {resolution}. Zoom in for finer buckets.",
+        "zoom": {"column": time_col, "series": col, "resolution": resolution},
+        "error": False
+    }]
 
-    # area plot 
-    for col in num_cols:
-        chart_id = str(uuid.uuid4()).replace('-', '')[:8]
-        try:
-            area_config = {
+
+# Every time series chart of one datetime column. The pyramid only goes down
+# to the level that fits max_points; zoom requests build a deeper one.
+def time_series_charts(chart_ids, time_col, times, values, max_points, encoding):
+    pyramid = TimePyramid(times, values, max_buckets=max_points)
+    return [chart for chart_id, col in zip(chart_ids, [None] + pyramid.columns)
+            for chart in time_series_chart(chart_id, time_col, col, pyramid, max_points, encoding)]
+
+
+# 4. Pie chart for a categorical col with ≤10 categories
+def pie_chart(chart_id, col, labels, counts):
+    return [{
+        "id": chart_id,
+        "title": f"Pie Chart of {col}",
+        "config": pie_config(labels, counts),
+        "description": f"Pie chart showing distribution of {col}.",
+        "error": False
+    }]
+
+
+# Bar chart for a categorical feature with limited categories
+def category_bar_chart(chart_id, col, labels, counts):
+    return [{
+        "id": chart_id,
+        "title": f"Bar chart of {col}",
+        "config": category_bar_config(col, labels, counts),
+        "description": f"Value counts of categorical column {col}.",
+        "error": False
+    }]
+
+
+# Decimated series, shared through series_cache by the line and area plots of a column
+def _cached_series(col, values, index_labels, max_points, method, encoding, series_cache):
+    if col not in series_cache:
+        series_cache[col] = decimated_series(values, index_labels, max_points, method, encoding)
+    return series_cache[col]
+
+
+# line plot 
+def line_chart(chart_id, col, values, index_labels, max_points, method, encoding, series_cache):
+    labels, data = _cached_series(col, values, index_labels, max_points, method, encoding, series_cache)
+    line_config = {
+        "type": "line",
+        "data": {
+            "labels": labels,
+            "datasets": [{
+                "label": col,
+                "data": data,
+                "fill": False,
+                "borderColor": "rgba(54, 162, 235, 0.7)",
+                "tension": 0.1
+            }]
+        },
+        "options": {
+            "responsive": True,
+            "plugins": {"legend": {"display": True}},
+            "scales": {
+                "x": {"title": {"display": True, "text": "Index"}},
+                "y": {"title": {"display": True, "text": col}}
+            }
+        }
+    }
+    return [{
+        "id": chart_id,
+        "title": f"Line plot of {col}",
+        "config": line_config,
+        "description": f"Line plot of numeric column {col} over index.",
+        "error": False
+    }]
+
+
+# area plot 
+def area_chart(chart_id, col, values, index_labels, max_points, method, encoding, series_cache):
+    labels, data = _cached_series(col, values, index_labels, max_points, method, encoding, series_cache)
+    area_config = {
+        "type": "line",
+        "data": {
+            "labels": labels,
+            "datasets": [{
+                "label": col,
+                "data": data,
+                "fill": True,
+                "backgroundColor": "rgba(75, 192, 192, 0.4)",
+                "borderColor": "rgba(75, 192, 192, 1)",
+                "tension": 0.1
+            }]
+        },
+        "options": {
+            "responsive": True,
+            "plugins": {"legend": {"display": True}},
+            "scales": {
+                "x": {"title": {"display": True, "text": "Index"}},
+                "y": {"title": {"display": True, "text": col}}
+            }
+        }
+    }
+    return [{
+        "id": chart_id,
+        "title": f"Area plot of {col}",
+        "config": area_config,
+        "description": f"Area plot of numeric column {col} over index.",
+        "error": False
+    }]
+
+
+# kde plot (all numeric columns in one binned FFT batch)
+def kde_charts(chart_ids, cols, values, bandwidth, encoding):
+    charts = []
+    for chart_id, col, result in zip(chart_ids, cols, binned_kde(values, bandwidth)):
+        if result is None:
+            charts.append(error_chart(chart_id, f"KDE plot of {col}", f"Could not plot KDE plot of {col}."))
+            continue
+        x_vals, y_vals = result
+        kde_config = {
             "type": "line",
             "data": {
-                "labels": df.index.astype(str).tolist(),
+                "labels": x_vals.round(2).astype(str).tolist(),
                 "datasets": [{
-                    "label": col,
-                    "data": df[col].tolist(),
+                    "label": f'KDE of {col}',
+                    "data": encode_values(y_vals, encoding),
                     "fill": True,
-                    "backgroundColor": "rgba(75, 192, 192, 0.4)",
-                    "borderColor": "rgba(75, 192, 192, 1)",
-                    "tension": 0.1
+                    "backgroundColor": "rgba(153, 102, 255, 0.4)",
+                    "borderColor": "rgba(153, 102, 255, 1)",
+                    "tension": 0.3
                 }]
             },
             "options": {
                 "responsive": True,
                 "plugins": {"legend": {"display": True}},
                 "scales": {
-                    "x": {"title": {"display": True, "text": "Index"}},
-                    "y": {"title": {"display": True, "text": col}}
+                    "x": {"title": {"display": True, "text": col}},
+                    "y": {"title": {"display": True, "text": "Density"}}
                 }
             }
-            }
-            charts.append({
-                "id": chart_id,
-                "title": f"Area plot of {col}",
-                "config": area_config,
-                "description": f"Area plot of numeric column {col} over index.",
-                "error": False
-            })
-        except Exception:
-            charts.append({
+        }
+        charts.append({
             "id": chart_id,
-            "title": f"Area plot of {col}",
-            "config": {},
-            "description": f"Could not plot area plot of {col}.",
-            "error": True
-            })
+            "title": f"KDE plot of {col}",
+            "config": kde_config,
+            "description": f"Kernel Density Estimate plot of numeric column {col}.",
+            "error": False
+        })
+    return charts
+
+
+# Relative cost of each chart kind; cheaper charts are started, and streamed, first
+CHART_COSTS = {pie_chart: 1, category_bar_chart: 1, histogram_chart: 2, time_series_charts: 2, line_chart: 3,
+               area_chart: 3, datetime_line_chart: 3, scatter_chart: 4, kde_charts: 5}
+
+
+def chart_tasks(df, profile, bin_rule='fd', max_bins=MAX_BINS, scatter_mode='sample',
+                scatter_max_points=SCATTER_MAX_POINTS, scatter_max_pairs=SCATTER_MAX_PAIRS,
+                density_grid=DENSITY_GRID, line_max_points=LINE_MAX_POINTS, decimation='lttb', kde_bandwidth='scott',
+                encoding='json'):
+    tasks = []
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding '{encoding}', expected one of {ENCODINGS}")
+    if line_max_points < MIN_POINTS:
+        raise ValueError(f"line_max_points must be at least {MIN_POINTS}, got {line_max_points}")
+
+    # Registers a task producing one chart per (title, description, error
+    # description); `batch` tasks take the list of chart ids, others one id
+    def add(fn, args, chart_type, charts, batch=False):
+        chart_ids = [new_chart_id() for _ in charts]
+        fallbacks = [error_chart(chart_id, title, error)
+                     for chart_id, (title, _, error) in zip(chart_ids, charts)]
+        meta = [{"id": chart_id, "title": title, "type": chart_type, "description": description}
+                for chart_id, (title, description, _) in zip(chart_ids, charts)]
+        chart_args = (chart_ids,) if batch else (chart_ids[0],)
+        tasks.append(Task(fn, chart_args + args, fallbacks, meta, CHART_COSTS[fn]))
+
+    numeric_cols = profile.numeric_cols
+    cat_cols = profile.cat_cols
+    numeric_values = profile.numeric_values
+    # Index labels are stringified once and shared by every line/area series
+    index_labels = df.index.astype(str).to_numpy()
+
+    # 1. Histogram
+    for i, col in enumerate(numeric_cols):
+        add(histogram_chart, (col, numeric_values[:, i], bin_rule, max_bins, encoding), "bar",
+            [(f"Histogram of {col}", f"Histogram showing binned counts for {col}.",
+              f"Could not generate histogram for {col}.")])
+
+    # 2. Scatter plot for every numeric pair
+    if scatter_mode not in SCATTER_MODES:
+        raise ValueError(f"Unknown scatter mode '{scatter_mode}', expected one of {SCATTER_MODES}")
+    pairs = list(combinations(range(len(numeric_cols)), 2))
+    if len(pairs) > scatter_max_pairs:
+        pairs = sorted((i, j) for i, j, _ in top_correlations(numeric_values, scatter_max_pairs))
+    if pairs:
+        if scatter_mode == 'density':
+            source = DensityGrid(numeric_values, density_grid)
+        else:
+            source = PairSampler(numeric_values, scatter_max_points)
+    for i, j in pairs:
+        x_col = numeric_cols[i]
+        y_col = numeric_cols[j]
+        add(scatter_chart, (x_col, y_col, source, i, j, encoding), "bubble" if scatter_mode == 'density' else "scatter",
+            [(f"Scatter Plot: {x_col} vs {y_col}", f"Scatter plot showing relationship between {x_col} and {y_col}.",
+              f"Could not generate scatter plot for {x_col} and {y_col}.")])
+
+    # 3. Line plot per numeric column over datetime index (if index is datetime)
+    if pd.api.types.is_datetime64_any_dtype(df.index):
+        for i, col in enumerate(numeric_cols):
+            add(datetime_line_chart, (col, numeric_values[:, i], index_labels, line_max_points, decimation, encoding),
+                "line",
+                [(f"Line Plot of {col}", f"Line plot of {col} over time.",
+                  f"Could not generate line plot for {col}.")])
+
+    # 3b. Time series over every datetime column, from utils.timeseries pyramids
+    series = series_columns(df)
+    values = {col: numeric_values[:, numeric_cols.index(col)] for col in series}
+    for time_col in profile.datetime_cols:
+        titles = [f"Rows per bucket of {time_col}"] + [f"{col} over {time_col}" for col in series]
+        add(time_series_charts, (time_col, df[time_col].to_numpy(dtype="datetime64[ns]"), values,
+                                 line_max_points, encoding), "line",
+            [(title, f"{title}, aggregated over time.", f"Could not plot {title.lower()}.") for title in titles],
+            batch=True)
+
+    # 4. Pie chart for categorical cols with ≤10 categories
+    for col in cat_cols:
+        if profile.columns[col].nunique <= 10:
+            counts = profile.columns[col].top_counts()
+            add(pie_chart, (col, counts.index.tolist(), counts.tolist()), "pie",
+                [(f"Pie Chart of {col}", f"Pie chart showing distribution of {col}.",
+                  f"Could not generate pie chart for {col}.")])
+
+    # Example: Bar chart for categorical features with limited categories
+    for col in cat_cols:
+        if profile.columns[col].nunique > 20:
+            continue  # skip too many categories
+        counts = profile.columns[col].top_counts()
+        add(category_bar_chart, (col, counts.index.tolist(), counts.tolist()), "bar",
+            [(f"Bar chart of {col}", f"Value counts of categorical column {col}.",
+              f"Could not plot bar chart of {col}.")])
+
+    # line and area plots
+    series_cache = {}
+    for chart_fn, kind in ((line_chart, "Line"), (area_chart, "Area")):
+        for i, col in enumerate(numeric_cols):
+            add(chart_fn, (col, numeric_values[:, i], index_labels, line_max_points, decimation, encoding,
+                           series_cache), "line",
+                [(f"{kind} plot of {col}", f"{kind} plot of numeric column {col} over index.",
+                  f"Could not plot {kind.lower()} plot of {col}.")])
 
-    
     # bubble plot 
     # num_cols_for_bubble = [col for col in num_cols if df[col].notnull().all()]
 
     # Try to generate bubble plots from combinations of 3 numeric cols
     # for x_col, y_col, size_col in combinations(num_cols_for_bubble, 3):
-    #     chart_id = str(uuid.uuid4()).replace('-', '')[:8]
+    #     chart_id = new_chart_id()
     #     try:
     #         bubble_config = {
     #          "type": "bubble",
@@ -344,55 +527,82 @@ def generate_charts(df):
 
 
 
-    # kde plot 
-    from scipy.stats import gaussian_kde
+    # kde plot
+    if numeric_cols:
+        add(kde_charts, (numeric_cols, numeric_values, kde_bandwidth, encoding), "line",
+            [(f"KDE plot of {col}", f"Kernel Density Estimate plot of numeric column {col}.",
+              f"Could not plot KDE plot of {col}.") for col in numeric_cols], batch=True)
+
+    return tasks
+
 
-    for col in num_cols:
-        chart_id = str(uuid.uuid4()).replace('-', '')[:8]
+def chart_metadata(chart):
+    return {
+        "id": chart["id"],
+        "title": chart["title"],
+        "type": chart["config"].get("type"),
+        "description": chart["description"],
+    }
+
+
+# Charts are built as independent tasks and run on `executor` (a thread or
+# process pool from utils.executor.make_executor, or inline when None). A task
+# that runs longer than task_timeout seconds degrades to its error placeholder.
+# Pass a dict as `report` to receive the wall/CPU timing of the run.
+def generate_charts(df, profile=None, executor=None, task_timeout=TASK_TIMEOUT, report=None, **options):
+    if profile is None:
+        profile = profile_dataset(df)
+    charts, run_report = run_tasks(chart_tasks(df, profile, **options), executor, task_timeout)
+    if report is not None:
+        report.update(run_report)
+    return charts
+
+
+# Charts for datasets profiled chunk by chunk (utils.streaming). Only charts
+# that can be built from the per-column accumulators are produced.
+def charts_from_accumulator(acc):
+    charts = []
+
+    for col in acc.numeric_columns:
+        chart_id = new_chart_id()
         try:
-            data = df[col].dropna().values
-            kde = gaussian_kde(data)
-            x_vals = np.linspace(data.min(), data.max(), 200)
-            y_vals = kde(x_vals)
-            kde_config = {
-            "type": "line",
-            "data": {
-                "labels": x_vals.round(2).astype(str).tolist(),
-                "datasets": [{
-                    "label": f'KDE of {col}',
-                    "data": y_vals.tolist(),
-                    "fill": True,
-                    "backgroundColor": "rgba(153, 102, 255, 0.4)",
-                    "borderColor": "rgba(153, 102, 255, 1)",
-                    "tension": 0.3
-                }]
-            },
-            "options": {
-                "responsive": True,
-                "plugins": {"legend": {"display": True}},
-                "scales": {
-                    "x": {"title": {"display": True, "text": col}},
-                    "y": {"title": {"display": True, "text": "Density"}}
-                }
-            }
-            }
+            edges, counts = rebin(*acc.columns[col].histogram.trimmed())
             charts.append({
-             "id": chart_id,
-             "title": f"KDE plot of {col}",
-             "config": kde_config,
-            "description": f"Kernel Density Estimate plot of numeric column {col}.",
+                "id": chart_id,
+                "title": f"Histogram of {col}",
+                "config": histogram_config(col, histogram_labels(edges), counts.tolist()),
+                "description": f"Binned histogram of {col}.",
                 "error": False
             })
         except Exception:
-         charts.append({
-            "id": chart_id,
-            "title": f"KDE plot of {col}",
-            "config": {},
-            "description": f"Could not plot KDE plot of {col}.",
-            "error": True
-        })
-
-
+            charts.append({
+                "id": chart_id,
+                "title": f"Histogram of {col}",
+                "config": {},
+                "description": f"Could not generate histogram for {col}.",
+                "error": True
+            })
 
+    for col in acc.categorical_columns:
+        top = acc.columns[col].top
+        if top.truncated or top.distinct > 20:
+            continue
+        labels = top.counts.index.tolist()
+        counts = top.counts.tolist()
+        if top.distinct <= 10:
+            charts.append({
+                "id": new_chart_id(),
+                "title": f"Pie Chart of {col}",
+                "config": pie_config(labels, counts),
+                "description": f"Pie chart showing distribution of {col}.",
+                "error": False
+            })
+        charts.append({
+            "id": new_chart_id(),
+            "title": f"Bar chart of {col}",
+            "config": category_bar_config(col, labels, counts),
+            "description": f"Value counts of categorical column {col}.",
+            "error": False
+        })
 
     return charts
@@ -0,0 +1,73 @@
+import os
+import uuid
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+STORE_FOLDER = 'columnar'
+
+
+# Parsed uploads kept as uncompressed Arrow IPC (Feather v2) files keyed by
+# content hash. Loads memory-map the file, so numeric columns come back
+# without parsing or copying and only the requested columns are touched.
+# Without pyarrow, or for frames Arrow cannot represent, nothing is stored
+# and callers fall back to parsing the upload.
+class ColumnarStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def __contains__(self, key):
+        return pa is not None and os.path.exists(self._path(key))
+
+    def save(self, key, df):
+        if pa is None or key in self:
+            return False
+        # Arrow would stringify other labels and the reload would not match
+        if not all(isinstance(col, str) for col in df.columns):
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            return False
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        feather.write_feather(table, tmp, compression='uncompressed')
+        os.replace(tmp, path)
+        return True
+
+    # Every copy stored under a key starting with `prefix` (an upload's content hash)
+    def remove(self, prefix):
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(prefix) and entry.name.endswith('.arrow'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    # A zero-row frame with the columns and dtypes stored under `key`, read
+    # from the file's schema alone; None when nothing is stored
+    def header(self, key):
+        if key not in self:
+            return None
+        try:
+            with pa.memory_map(self._path(key)) as source:
+                schema = pa.ipc.open_file(source).schema
+        except (OSError, pa.ArrowException):
+            return None
+        return schema.empty_table().to_pandas()
+
+    def load(self, key, columns=None):
+        if key not in self:
+            return None
+        try:
+            table = feather.read_table(self._path(key), columns=columns, memory_map=True)
+        except (OSError, pa.ArrowException):
+            return None
+        return table.to_pandas(split_blocks=True)
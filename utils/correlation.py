@@ -0,0 +1,78 @@
+import warnings
+
+import numpy as np
+
+CORR_BLOCK = 256
+
+
+# The k entries with the largest |score| as (rows, cols, scores), in
+# descending order; NaN scores never qualify
+def _top_k(rows, cols, scores, k):
+    finite = np.isfinite(scores)
+    rows, cols, scores = rows[finite], cols[finite], scores[finite]
+    if len(scores) > k:
+        keep = np.argpartition(-np.abs(scores), k - 1)[:k]
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+    order = np.argsort(-np.abs(scores), kind='stable')
+    return rows[order], cols[order], scores[order]
+
+
+# Strongest k off-diagonal pairs (i < j) of an already computed correlation matrix
+def top_pairs(corr, k):
+    rows, cols = np.triu_indices(len(corr), 1)
+    rows, cols, scores = _top_k(rows, cols, np.asarray(corr)[rows, cols], k)
+    return list(zip(rows.tolist(), cols.tolist(), scores.tolist()))
+
+
+# Strongest k Pearson correlations between the columns of `values` (rows x
+# columns, NaN for missing) as (i, j, r) with i < j. Each pair uses the rows
+# where both columns are present, like DataFrame.corr(). Columns are
+# standardized once in float64, then correlated block by block in float32 so
+# only a `block` x `block` tile and the k best candidates are ever held.
+def top_correlations(values, k=3, block=CORR_BLOCK):
+    n, m = values.shape
+    if m < 2 or k <= 0:
+        return []
+    valid = ~np.isnan(values)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+    scale = np.where(scale > 0, scale, 1.0)
+    x = np.where(valid, (values - mean) / scale, 0.0).astype(np.float32)
+    present = valid.astype(np.float32)
+    complete = valid.all(axis=0)
+
+    best_rows = best_cols = np.array([], dtype=np.int64)
+    best_scores = np.array([], dtype=np.float64)
+    for a in range(0, m, block):
+        xa, ma = x[:, a:a + block], present[:, a:a + block]
+        for b in range(a, m, block):
+            xb, mb = x[:, b:b + block], present[:, b:b + block]
+            sxy = xa.T @ xb
+            if complete[a:a + block].all() and complete[b:b + block].all():
+                count = np.float32(n)
+                sx = xa.sum(axis=0)[:, None]
+                sy = xb.sum(axis=0)[None, :]
+                sxx = (xa * xa).sum(axis=0)[:, None]
+                syy = (xb * xb).sum(axis=0)[None, :]
+            else:
+                count = ma.T @ mb
+                sx = xa.T @ mb
+                sy = ma.T @ xb
+                sxx = (xa * xa).T @ mb
+                syy = ma.T @ (xb * xb)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cov = sxy - sx * sy / count
+                var = (sxx - sx * sx / count) * (syy - sy * sy / count)
+                r = np.where((count > 1) & (var > 0), cov / np.sqrt(var), np.nan)
+            rows, cols = np.indices(r.shape).reshape(2, -1)
+            rows, cols = rows + a, cols + b
+            upper = rows < cols
+            candidates = (
+                np.concatenate([best_rows, rows[upper]]),
+                np.concatenate([best_cols, cols[upper]]),
+                np.concatenate([best_scores, np.clip(r.ravel()[upper], -1, 1)]),
+            )
+            best_rows, best_cols, best_scores = _top_k(*candidates, k)
+    return [(int(i), int(j), float(r)) for i, j, r in zip(best_rows, best_cols, best_scores)]
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+from utils.chart_generator import chart_metadata
+from utils.executor import run_tasks, TASK_TIMEOUT
+
+MAX_DATASETS = 16
+
+
+# Charts of one uploaded dataset, listed up front from the task metadata and
+# computed one task at a time on first request.
+class LazyChartSet:
+    def __init__(self, tasks, executor=None, timeout=TASK_TIMEOUT):
+        self.tasks = tasks
+        self.executor = executor
+        self.timeout = timeout
+        self.metadata = [meta for task in tasks for meta in task.meta]
+        self._task_of = {meta["id"]: n for n, task in enumerate(tasks) for meta in task.meta}
+        self._locks = [threading.Lock() for _ in tasks]
+        self._charts = {}
+
+    @classmethod
+    def from_charts(cls, charts):
+        chart_set = cls([])
+        chart_set.metadata = [chart_metadata(chart) for chart in charts]
+        chart_set._charts = {chart["id"]: chart for chart in charts}
+        return chart_set
+
+    def chart(self, chart_id):
+        if chart_id in self._charts:
+            return self._charts[chart_id]
+        n = self._task_of.get(chart_id)
+        if n is None:
+            return None
+        with self._locks[n]:
+            if chart_id not in self._charts:
+                charts, report = run_tasks([self.tasks[n]], self.executor, self.timeout)
+                if report["timeouts"]:
+                    # Placeholder for now; the next request tries again
+                    return next(c for c in charts if c["id"] == chart_id)
+                for chart in charts:
+                    self._charts[chart["id"]] = chart
+        return self._charts[chart_id]
+
+
+# In-memory LRU of recently uploaded datasets, keyed by dataset id. With
+# `max_bytes`, entries are also evicted until the sizes given to add() fit.
+class DatasetRegistry:
+    def __init__(self, max_datasets=MAX_DATASETS, max_bytes=None):
+        self.max_datasets = max_datasets
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, dataset_id, chart_set, nbytes=0):
+        with self._lock:
+            if dataset_id in self._datasets:
+                self._bytes -= self._datasets.pop(dataset_id)[1]
+            self._datasets[dataset_id] = (chart_set, nbytes)
+            self._bytes += nbytes
+            while len(self._datasets) > self.max_datasets or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes and len(self._datasets) > 1):
+                self._bytes -= self._datasets.popitem(last=False)[1][1]
+
+    def get(self, dataset_id):
+        with self._lock:
+            entry = self._datasets.get(dataset_id)
+            if entry is None:
+                return None
+            self._datasets.move_to_end(dataset_id)
+            return entry[0]
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return self._bytes
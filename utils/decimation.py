@@ -0,0 +1,61 @@
+import numpy as np
+
+LINE_MAX_POINTS = 1000
+# The first and last points are always kept, plus at least one in between
+MIN_POINTS = 3
+DECIMATION_METHODS = ('lttb', 'minmax')
+
+
+# Largest-Triangle-Three-Buckets: keeps the first and last point and, per
+# bucket, the point forming the largest triangle with the previously kept
+# point and the average of the next bucket. Returns positions into x/y.
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        selected[b + 1] = a
+    return selected
+
+
+# Minimum and maximum of each of (threshold - 2) / 2 equal buckets, plus the
+# first and last points, fully vectorized
+def minmax(y, threshold):
+    n = len(y)
+    if n <= threshold:
+        return np.arange(n)
+    buckets = (threshold - 2) // 2
+    if buckets < 1:
+        return np.array([0, n - 1])
+    size = int(np.ceil(n / buckets))
+    pad = -n % size
+    lows = np.concatenate([y, np.full(pad, np.inf)]).reshape(-1, size)
+    highs = np.concatenate([y, np.full(pad, -np.inf)]).reshape(-1, size)
+    starts = np.arange(len(lows)) * size
+    return np.unique(np.concatenate([starts + lows.argmin(axis=1), starts + highs.argmax(axis=1), [0, n - 1]]))
+
+
+# Positions of the points to plot for a series, skipping NaNs
+def decimate(values, max_points=LINE_MAX_POINTS, method='lttb'):
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Unknown decimation method '{method}', expected one of {DECIMATION_METHODS}")
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}, got {max_points}")
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) <= max_points:
+        return valid
+    y = values[valid]
+    if method == 'minmax':
+        return valid[minmax(y, max_points)]
+    return valid[lttb(valid.astype(np.float64), y, max_points)]
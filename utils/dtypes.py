@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Bump when the conversions change; parsed frames are stored per version
+DTYPES_VERSION = 1
+# String columns with fewer unique values than this share of rows become categories
+CATEGORY_RATIO = 0.5
+DATETIME_SAMPLE = 100
+
+
+def _is_text(s):
+    return pd.api.types.infer_dtype(s, skipna=True) == 'string'
+
+
+def _lossless_float32(s):
+    as_float32 = s.astype(np.float32)
+    return bool(((as_float32.astype(np.float64) == s) | s.isna()).all())
+
+
+# The format of a text column's dates, guessed from its first value and
+# checked on a sample, or None when they do not look like dates
+def datetime_format(s):
+    values = s.dropna()
+    if values.empty or not isinstance(values.iloc[0], str):
+        return None
+    fmt = guess_datetime_format(values.iloc[0])
+    if fmt is None:
+        return None
+    sample = pd.to_datetime(values.head(DATETIME_SAMPLE), format=fmt, errors='coerce')
+    if sample.isna().any():
+        return None
+    return fmt
+
+
+# Date strings become datetime64 when every non-null value parses with the
+# format guessed from the first one
+def _parse_datetimes(s):
+    fmt = datetime_format(s)
+    if fmt is None:
+        return None
+    values = s.dropna()
+    parsed = pd.to_datetime(s, format=fmt, errors='coerce')
+    if parsed.notna().sum() != len(values):
+        return None
+    return parsed
+
+
+# Shrinks a freshly parsed frame in one pass over its columns: integers and
+# floats are downcast where no value changes, date strings become datetimes
+# and repetitive strings become categories. Returns the converted frame and
+# a report with deep memory usage before and after.
+def optimize_dtypes(df):
+    report = {"memory_before": int(df.memory_usage(deep=True).sum()),
+              "downcast": [], "datetime": [], "category": []}
+    converted = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s.dtype):
+            continue
+        if pd.api.types.is_integer_dtype(s.dtype):
+            small = pd.to_numeric(s, downcast='integer')
+            if small.dtype != s.dtype:
+                converted[col] = small
+                report["downcast"].append(col)
+        elif pd.api.types.is_float_dtype(s.dtype):
+            if s.dtype != np.float32 and _lossless_float32(s):
+                converted[col] = s.astype(np.float32)
+                report["downcast"].append(col)
+        elif (pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)) and _is_text(s):
+            parsed = _parse_datetimes(s)
+            if parsed is not None:
+                converted[col] = parsed
+                report["datetime"].append(col)
+            elif len(s) and s.nunique() / len(s) < CATEGORY_RATIO:
+                converted[col] = s.astype('category')
+                report["category"].append(col)
+    if converted:
+        df = df.copy(deep=False)
+        for col, values in converted.items():
+            df[col] = values
+    report["memory_after"] = int(df.memory_usage(deep=True).sum())
+    return df, report
+
@@ -0,0 +1,35 @@
+import base64
+
+import numpy as np
+
+ENCODINGS = ('json', 'typed')
+TYPED_DTYPES = {'float32': '<f4', 'float64': '<f8', 'int32': '<i4'}
+
+
+# Little-endian packed buffer, base64 encoded straight from the NumPy memory.
+# static/js/chart_payload.js turns these back into plain arrays for Chart.js.
+def typed_array(values, dtype='float32'):
+    data = np.ascontiguousarray(values, dtype=TYPED_DTYPES[dtype])
+    return {
+        "__typed__": dtype,
+        "length": len(data),
+        "data": base64.b64encode(data.tobytes()).decode('ascii'),
+    }
+
+
+def encode_values(values, encoding='json', dtype='float32'):
+    values = np.asarray(values)
+    if encoding == 'typed':
+        if dtype == 'int32' and len(values) and np.abs(values).max() > np.iinfo(np.int32).max:
+            dtype = 'float64'
+        return typed_array(values, dtype)
+    return values.tolist()
+
+
+# Point lists such as [{"x": .., "y": ..}, ...]; packed column-wise when typed
+def encode_points(encoding='json', **columns):
+    if encoding == 'typed':
+        return {"__points__": {name: typed_array(values) for name, values in columns.items()}}
+    names = list(columns)
+    rows = zip(*(np.asarray(values).tolist() for values in columns.values()))
+    return [dict(zip(names, row)) for row in rows]
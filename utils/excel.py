@@ -0,0 +1,112 @@
+import importlib.util
+
+import pandas as pd
+
+from utils.streaming import DatasetAccumulator, CHUNK_SIZE
+
+# The Rust calamine reader is several times faster than openpyxl when
+# installed. Both are imported by pandas (or below) only when a workbook is read.
+EXCEL_ENGINE = 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+
+# Added when several sheets are read together, naming each row's sheet
+SHEET_COLUMN = 'source_sheet'
+
+
+def list_sheets(filepath):
+    with pd.ExcelFile(filepath, engine=EXCEL_ENGINE) as book:
+        return book.sheet_names
+
+
+def _read_sheet(filepath, sheet):
+    return pd.read_excel(filepath, sheet_name=sheet, engine=EXCEL_ENGINE)
+
+
+# The first sheet by default. Several sheets are parsed side by side on
+# `executor`, a process pool since parsing holds the GIL, and stacked.
+def read_excel_sheets(filepath, sheets=None, executor=None):
+    if not sheets:
+        return _read_sheet(filepath, 0)
+    if len(sheets) == 1:
+        return _read_sheet(filepath, sheets[0])
+    mapper = executor.map if executor is not None else map
+    frames = mapper(_read_sheet, [filepath] * len(sheets), sheets)
+    return pd.concat([frame.assign(**{SHEET_COLUMN: sheet}) for frame, sheet in zip(frames, sheets)],
+                     ignore_index=True)
+
+
+# Header labels the way read_excel makes them: blanks become "Unnamed: i"
+# and repeated labels get ".1", ".2", ... suffixes
+def _column_names(header):
+    names = []
+    seen = {}
+    for i, label in enumerate(header):
+        name = f"Unnamed: {i}" if label is None else str(label)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+# Rows of one sheet as DataFrames of up to `chunksize` rows, streamed with
+# openpyxl's read-only mode so the workbook is never held in memory
+def iter_sheet_chunks(filepath, sheet=0, chunksize=CHUNK_SIZE):
+    from openpyxl import load_workbook
+
+    book = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        worksheet = book.worksheets[sheet] if isinstance(sheet, int) else book[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _column_names(header)
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) == chunksize:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        book.close()
+
+
+def iter_excel_chunks(filepath, sheets=None, chunksize=CHUNK_SIZE):
+    if not sheets or len(sheets) == 1:
+        yield from iter_sheet_chunks(filepath, sheets[0] if sheets else 0, chunksize)
+        return
+    for sheet in sheets:
+        for chunk in iter_sheet_chunks(filepath, sheet, chunksize):
+            yield chunk.assign(**{SHEET_COLUMN: sheet})
+
+
+def _accumulate_sheet(filepath, sheet, label, chunksize):
+    acc = DatasetAccumulator()
+    for chunk in iter_sheet_chunks(filepath, sheet, chunksize):
+        acc.update(chunk if label is None else chunk.assign(**{SHEET_COLUMN: label}))
+    return acc
+
+
+# Like utils.streaming.profile_csv_in_chunks for workbooks. Each sheet is
+# accumulated separately (on `executor`, a process pool, when given) and the
+# sketches merged, so the selected sheets must share their columns.
+def profile_excel_in_chunks(filepath, sheets=None, chunksize=CHUNK_SIZE, executor=None):
+    sheets = sheets or [0]
+    labels = sheets if len(sheets) > 1 else [None]
+    n = len(sheets)
+    mapper = executor.map if executor is not None else map
+    parts = mapper(_accumulate_sheet, [filepath] * n, sheets, labels, [chunksize] * n)
+    acc = DatasetAccumulator()
+    for sheet, part in zip(sheets, parts):
+        if not part.columns:
+            continue  # empty sheet
+        if acc.columns and list(part.columns) != list(acc.columns):
+            raise ValueError(f"Sheet '{sheet}' has different columns from the first selected sheet")
+        acc.merge(part)
+    return acc
@@ -0,0 +1,117 @@
+import concurrent.futures as cf
+import time
+
+TASK_TIMEOUT = 30.0
+POLL_INTERVAL = 0.05
+EXECUTOR_KINDS = ('serial', 'thread', 'process')
+
+
+# One independent unit of chart or insight work. fn(*args) returns a list of
+# results; `fallbacks` is the same-length list used when the task raises or
+# misses its deadline, and `meta` optionally describes each result before it
+# is computed. `cost` ranks tasks so cheap ones start (and finish) first.
+# fn and args must be picklable for process pools.
+class Task:
+    def __init__(self, fn, args, fallbacks, meta=None, cost=0):
+        self.fn = fn
+        self.args = args
+        self.fallbacks = fallbacks
+        self.meta = meta or []
+        self.cost = cost
+
+
+def make_executor(kind='thread', workers=None):
+    if kind == 'serial':
+        return None
+    if kind == 'thread':
+        return cf.ThreadPoolExecutor(max_workers=workers)
+    if kind == 'process':
+        return cf.ProcessPoolExecutor(max_workers=workers)
+    raise ValueError(f"Unknown executor '{kind}', expected one of {EXECUTOR_KINDS}")
+
+
+def _timed_call(fn, args):
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    result = fn(*args)
+    return result, time.perf_counter() - wall, time.thread_time() - cpu
+
+
+# Runs tasks on `executor` (in the calling thread when None) and yields
+# (n, results) for task n as each one settles, in completion order. Tasks are
+# started cheapest first by their `cost`. A task whose run time exceeds
+# `timeout` seconds, counted from when a worker picked it up, is replaced by
+# its fallbacks; pool workers cannot be interrupted, so the abandoned call
+# still finishes in the background. Tasks not yet started are cancelled if
+# the caller stops early. Pass a dict as `report` to receive the timing
+# report once the generator is exhausted; its "timings" lists (function
+# name, wall, cpu) per finished task.
+def iter_tasks(tasks, executor=None, timeout=TASK_TIMEOUT, report=None):
+    started_wall = time.perf_counter()
+    started_cpu = time.process_time()
+    if report is None:
+        report = {}
+    report.update({"tasks": len(tasks), "errors": 0, "timeouts": 0, "task_wall": 0.0, "task_cpu": 0.0,
+                   "timings": []})
+    order = sorted(range(len(tasks)), key=lambda n: tasks[n].cost)
+
+    def finish(n, outcome):
+        result, wall, cpu = outcome
+        report["task_wall"] += wall
+        report["task_cpu"] += cpu
+        report["timings"].append((tasks[n].fn.__name__, wall, cpu))
+        return result
+
+    if executor is None:
+        for n in order:
+            try:
+                result = finish(n, _timed_call(tasks[n].fn, tasks[n].args))
+            except Exception:
+                report["errors"] += 1
+                result = tasks[n].fallbacks
+            yield n, result
+    else:
+        futures = {executor.submit(_timed_call, tasks[n].fn, tasks[n].args): n for n in order}
+        running_since = {}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = cf.wait(pending, timeout=POLL_INTERVAL, return_when=cf.FIRST_COMPLETED)
+                for future in done:
+                    n = futures[future]
+                    try:
+                        result = finish(n, future.result())
+                    except Exception:
+                        report["errors"] += 1
+                        result = tasks[n].fallbacks
+                    yield n, result
+                now = time.perf_counter()
+                for future in list(pending):
+                    if future.running():
+                        running_since.setdefault(future, now)
+                    if timeout is not None and now - running_since.get(future, now) > timeout:
+                        future.cancel()
+                        pending.discard(future)
+                        report["timeouts"] += 1
+                        yield futures[future], tasks[futures[future]].fallbacks
+        finally:
+            for future in pending:
+                future.cancel()
+
+    report["wall"] = time.perf_counter() - started_wall
+    # Worker processes' CPU time is only visible through task_cpu
+    report["cpu"] = time.process_time() - started_cpu
+    report["parallelism"] = report["task_cpu"] / report["wall"] if report["wall"] else 0.0
+
+
+# Runs every task through iter_tasks and returns the flattened results in
+# task order plus the timing report. `on_result(n, results)`, if given, is
+# called from the calling thread as each task settles.
+def run_tasks(tasks, executor=None, timeout=TASK_TIMEOUT, on_result=None):
+    results = [None] * len(tasks)
+    report = {}
+    for n, result in iter_tasks(tasks, executor, timeout, report):
+        results[n] = result
+        if on_result is not None:
+            on_result(n, result)
+    return [item for result in results for item in result], report
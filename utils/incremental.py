@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import pickle
+import uuid
+
+import pandas as pd
+
+from utils.streaming import DatasetAccumulator, CHUNK_SIZE
+
+# Files are hashed in blocks of about this size, each extended to the end of
+# its last line, so a mismatch is found without reading the whole prefix
+BLOCK_SIZE = 1024 * 1024
+# Most recent states kept per header; older ones are deleted
+STATES_PER_HEADER = 4
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+# [end offset, sha256] of each block of `filepath` from `start` on
+def block_digests(filepath, start=0, block_size=BLOCK_SIZE):
+    blocks = []
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for block in iter(lambda: f.read(block_size), b''):
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            offset += len(block)
+            blocks.append([offset, _digest(block)])
+    return blocks
+
+
+def header_digest(filepath):
+    with open(filepath, 'rb') as f:
+        return _digest(f.readline().rstrip(b'\r\n'))
+
+
+# Offset of the first appended row when `filepath` starts with the file
+# described by `meta` (same bytes block for block) and only adds whole rows
+# after it; None otherwise
+def extension_offset(filepath, meta):
+    if os.path.getsize(filepath) <= meta["size"]:
+        return None
+    with open(filepath, 'rb') as f:
+        start = 0
+        for end, digest in meta["blocks"]:
+            if _digest(f.read(end - start)) != digest:
+                return None
+            start = end
+        if meta["terminated"]:
+            return start
+        # The old last row had no line break; the new file must end it there
+        # rather than extend it
+        ending = f.read(2)
+        if ending.startswith(b'\n'):
+            return start + 1
+        if ending == b'\r\n':
+            return start + 2
+    return None
+
+
+# A numeric column whose appended values no longer parse as numbers has
+# become text: the stored sketches cannot absorb that
+def _same_schema(acc, chunk):
+    if list(chunk.columns) != list(acc.columns):
+        return False
+    for col, column in acc.columns.items():
+        values = chunk[col]
+        if column.is_numeric and not pd.api.types.is_numeric_dtype(values):
+            if pd.to_numeric(values, errors='coerce').notna().sum() < values.notna().sum():
+                return False
+    return True
+
+
+# `acc`, the profile of the rows before `offset`, updated in place with the
+# rows of `filepath` from `offset` on. None when they do not fit its schema.
+def extend_profile(acc, filepath, offset, chunksize=CHUNK_SIZE):
+    columns = list(acc.columns)
+    if not columns:
+        return None
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        try:
+            chunks = pd.read_csv(f, header=None, names=columns, index_col=False, chunksize=chunksize)
+            for chunk in chunks:
+                if not _same_schema(acc, chunk):
+                    return None
+                acc.update(chunk)
+        except pd.errors.EmptyDataError:
+            pass
+    return acc
+
+
+# Mergeable profiles (utils.streaming.DatasetAccumulator) of past CSV
+# uploads, keyed by content hash, next to the block digests of the file each
+# one covers. States are grouped by a digest of the header line, so an upload
+# is only compared with files that have the same columns.
+class ProfileStateStore:
+    def __init__(self, directory, per_header=STATES_PER_HEADER):
+        self.directory = directory
+        self.per_header = per_header
+        os.makedirs(directory, exist_ok=True)
+
+    def _group(self, header):
+        return os.path.join(self.directory, header)
+
+    def _metas(self, header):
+        group = self._group(header)
+        try:
+            entries = [entry for entry in os.scandir(group) if entry.name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+        metas = []
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime, reverse=True):
+            try:
+                with open(entry.path) as f:
+                    metas.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return metas
+
+    def _load(self, header, key):
+        try:
+            with open(os.path.join(self._group(header), f"{key}.pkl"), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def get(self, filepath, key):
+        return self._load(header_digest(filepath), key)
+
+    # (accumulator, meta, offset) of the largest stored file that `filepath`
+    # extends, or (None, None, None)
+    def find_prefix(self, filepath):
+        header = header_digest(filepath)
+        for meta in sorted(self._metas(header), key=lambda meta: meta["size"], reverse=True):
+            offset = extension_offset(filepath, meta)
+            if offset is None:
+                continue
+            acc = self._load(header, meta["key"])
+            if isinstance(acc, DatasetAccumulator):
+                return acc, meta, offset
+        return None, None, None
+
+    # `base`, the meta of the file `filepath` extends, spares re-hashing its blocks
+    def put(self, filepath, key, acc, base=None):
+        header = header_digest(filepath)
+        group = self._group(header)
+        os.makedirs(group, exist_ok=True)
+        blocks = block_digests(filepath) if base is None else base["blocks"] + block_digests(filepath, base["size"])
+        size = blocks[-1][0] if blocks else 0
+        with open(filepath, 'rb') as f:
+            f.seek(max(size - 1, 0))
+            terminated = f.read(1) == b'\n'
+        meta = {"key": key, "size": size, "rows": acc.rows, "terminated": terminated, "blocks": blocks}
+        for name, write in ((f"{key}.pkl", lambda f: pickle.dump(acc, f, protocol=pickle.HIGHEST_PROTOCOL)),
+                            (f"{key}.json", lambda f: f.write(json.dumps(meta).encode()))):
+            path = os.path.join(group, name)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, 'wb') as f:
+                write(f)
+            os.replace(tmp, path)
+        self._evict(header)
+
+    def _evict(self, header):
+        for meta in self._metas(header)[self.per_header:]:
+            for suffix in ('.json', '.pkl'):
+                try:
+                    os.remove(os.path.join(self._group(header), meta["key"] + suffix))
+                except OSError:
+                    pass
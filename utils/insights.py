@@ -1,79 +1,270 @@
 import pandas as pd
 import numpy as np
-from rich import print
 
-def generate_insights(df):
+from utils.profile import profile_dataset
+from utils.executor import Task, run_tasks, TASK_TIMEOUT
+from utils.correlation import top_correlations, top_pairs
+
+# Bump whenever insight output changes so cached dashboards are recomputed
+INSIGHTS_VERSION = 7
+
+# Each section below is one independent task returning its own lines.
+
+# 1. Data Overview
+def overview_section(profile):
+    insights = ["--- Data Overview ---"]
+    insights.append(f"Total rows: {profile.rows}")
+    insights.append(f"Total columns: {len(profile.columns)}")
+    return insights
+
+
+# 2. Missing Values
+def missing_section(profile):
+    insights = ["--- Missing Values ---"]
+    missing_cols = [(col, c.nulls) for col, c in profile.columns.items() if c.nulls > 0]
+    if missing_cols:
+        for col, miss_count in missing_cols:
+            insights.append(f"Column '{col}' has {miss_count} missing values ({miss_count / profile.rows:.2%})")
+    else:
+        insights.append("No missing values detected.")
+    return insights
+
+
+# 3. Duplicate Rows
+def duplicates_section(profile):
+    return ["--- Duplicate Rows ---", f"Duplicate rows: {profile.duplicates}"]
+
+
+# 4. Data Types
+def dtypes_section(profile):
+    insights = ["--- Data Types ---"]
+    for dtype, count in profile.dtype_counts.items():
+        insights.append(f"{count} column(s) of type '{dtype}'")
+    return insights
+
+
+# 5. Unique Values and Cardinality
+def cardinality_section(profile):
+    insights = ["--- Unique Values & Cardinality ---"]
+    columns = profile.columns
+    for col, c in columns.items():
+        unique_vals = c.nunique_with_nulls
+        if unique_vals == 1:
+            insights.append(f"Column '{col}' is constant (1 unique value)")
+        elif unique_vals <= 10:
+            examples = c.examples
+            insights.append(f"Column '{col}' has {unique_vals} unique values: {examples}")
+        else:
+            insights.append(f"Column '{col}' has {unique_vals} unique values")
+
+    for col in profile.object_cols:
+        c = columns[col]
+        if c.nunique / profile.rows > 0.5:
+            insights.append(f"Column '{col}' has high cardinality ({c.nunique} unique values)")
+    return insights
+
+
+# 6. Imbalanced Categorical Columns
+def imbalance_section(profile):
+    insights = ["--- Imbalanced Categorical Columns ---"]
+    columns = profile.columns
+    for col in profile.object_cols:
+        counts = columns[col].value_counts
+        top_freq = counts.iloc[0] / profile.rows
+        if top_freq > 0.9:
+            top_val = columns[col].top_counts().idxmax()
+            insights.append(f"Column '{col}' is imbalanced — '{top_val}' occurs in {top_freq:.1%} of rows")
+    if not any("is imbalanced" in i for i in insights[-3:]):
+        insights.append("No highly imbalanced categorical columns found.")
+    return insights
+
+
+# 7. Numeric Column Statistics
+def numeric_stats_section(profile):
+    insights = ["--- Numeric Column Statistics ---"]
+    for col in profile.numeric_cols:
+        c = profile.columns[col]
+        insights.append(
+            f"Numeric column '{col}': mean={c.mean:.2f}, std={c.std:.2f}, "
+            f"min={c.min}, max={c.max}"
+        )
+    return insights
+
+
+# 8. Skewness
+def skewness_section(profile):
+    insights = ["--- Skewness ---"]
+    for col in profile.numeric_cols:
+        skew = profile.columns[col].skew
+        if abs(skew) > 1:
+            skew_label = "highly skewed"
+        elif abs(skew) > 0.5:
+            skew_label = "moderately skewed"
+        else:
+            skew_label = "approximately symmetric"
+        insights.append(f"Column '{col}' is {skew_label} (skewness={skew:.2f})")
+    return insights
+
+
+# 9. Outliers (IQR Method)
+def outliers_section(profile):
+    insights = ["--- Outliers (IQR Method) ---"]
+    numeric_cols = profile.numeric_cols
+    for col in numeric_cols:
+        c = profile.columns[col]
+        if c.outliers > 0:
+            insights.append(f"Column '{col}' has {c.outliers} potential outliers (IQR method)")
+    if not any("potential outliers" in i for i in insights[-len(numeric_cols):]):
+        insights.append("No significant outliers detected in numeric columns.")
+    return insights
+
+
+# 10. Correlation
+def correlation_section(profile):
+    insights = ["--- Correlation ---"]
+    cols = profile.numeric_cols
+    top_corr = top_correlations(profile.numeric_values, 3)
+    for i, j, val in top_corr:
+        insights.append(f"High correlation between '{cols[i]}' and '{cols[j]}': {abs(val):.2f}")
+    if not top_corr:
+        insights.append("No strong correlations found between numeric columns.")
+    return insights
+
+
+# 11. Datetime Columns
+def datetime_section(profile):
+    insights = ["--- Datetime Columns ---"]
+    if profile.datetime_cols:
+        for col in profile.datetime_cols:
+            c = profile.columns[col]
+            insights.append(f"Datetime column '{col}': range from {c.min} to {c.max}, missing: {c.nulls}")
+    else:
+        insights.append("No datetime columns found.")
+    return insights
+
+
+# 12. Text Column Summary
+def text_section(profile):
+    # Bold + Blue
+    insights = ["--- Text Column Summary ---"]
+    # insights.append('<div style="font-weight:bold; color:blue; font-size:16px; margin-top:20px;">--- Text Column Summary ---</div>')
+
+    for col in profile.object_cols:
+        c = profile.columns[col]
+        if c.text_ratio > 0.8:
+            avg_len = c.avg_length
+            insights.append(f"Text column '{col}' has average length {avg_len:.1f} characters")
+    return insights
+
+
+# Sections needing more than one pass over the profile run after the rest
+INSIGHT_COSTS = {correlation_section: 1}
+
+
+def insight_tasks(profile):
+    sections = [overview_section, missing_section, duplicates_section, dtypes_section,
+                cardinality_section, imbalance_section, numeric_stats_section]
+    if profile.numeric_cols:
+        sections += [skewness_section, outliers_section, correlation_section]
+    sections += [datetime_section, text_section]
+    return [Task(section, (profile,), [f"Could not compute {section.__name__.replace('_section', '')} insights."],
+                 cost=INSIGHT_COSTS.get(section, 0))
+            for section in sections]
+
+
+# Runs every section as an independent task, like generate_charts; a section
+# that fails or misses task_timeout is replaced by a one-line notice.
+def generate_insights(df, profile=None, executor=None, task_timeout=TASK_TIMEOUT, report=None):
+    if profile is None:
+        profile = profile_dataset(df)
+    insights, run_report = run_tasks(insight_tasks(profile), executor, task_timeout)
+    if report is not None:
+        report.update(run_report)
+    return insights
+
+
+# Same sections as generate_insights, computed from a utils.streaming
+# DatasetAccumulator instead of a materialized DataFrame.
+def insights_from_accumulator(acc):
     insights = []
+    total_rows = acc.rows
+    columns = acc.columns
 
     # 1. Data Overview
     insights.append("--- Data Overview ---")
-    total_rows = len(df)
-    total_columns = df.shape[1]
     insights.append(f"Total rows: {total_rows}")
-    insights.append(f"Total columns: {total_columns}")
+    insights.append(f"Total columns: {len(columns)}")
 
     # 2. Missing Values
     insights.append("--- Missing Values ---")
-    missing = df.isnull().sum()
-    missing_cols = missing[missing > 0]
-    if not missing_cols.empty:
-        for col, miss_count in missing_cols.items():
-            insights.append(f"Column '{col}' has {miss_count} missing values ({miss_count / total_rows:.2%})")
-    else:
+    missing_cols = [(col, c.nulls) for col, c in columns.items() if c.nulls > 0]
+    for col, miss_count in missing_cols:
+        insights.append(f"Column '{col}' has {miss_count} missing values ({miss_count / total_rows:.2%})")
+    if not missing_cols:
         insights.append("No missing values detected.")
 
     # 3. Duplicate Rows
     insights.append("--- Duplicate Rows ---")
-    dup_count = df.duplicated().sum()
-    insights.append(f"Duplicate rows: {dup_count}")
+    insights.append(f"Duplicate rows: {acc.duplicates}")
 
     # 4. Data Types
     insights.append("--- Data Types ---")
-    type_counts = df.dtypes.value_counts()
+    type_counts = pd.Series([str(c.dtype) for c in columns.values()]).value_counts()
     for dtype, count in type_counts.items():
         insights.append(f"{count} column(s) of type '{dtype}'")
 
     # 5. Unique Values and Cardinality
     insights.append("--- Unique Values & Cardinality ---")
-    for col in df.columns:
-        unique_vals = df[col].nunique(dropna=False)
+    for col, c in columns.items():
+        if c.top.truncated:
+            insights.append(f"Column '{col}' has ~{c.nunique} unique values (±{c.nunique_error:.1%})")
+            continue
+        unique_vals = c.top.distinct + (1 if c.nulls else 0)
         if unique_vals == 1:
             insights.append(f"Column '{col}' is constant (1 unique value)")
         elif unique_vals <= 10:
-            examples = df[col].dropna().unique()
-            insights.append(f"Column '{col}' has {unique_vals} unique values: {examples}")
+            insights.append(f"Column '{col}' has {unique_vals} unique values: {c.top.counts.index.to_numpy()}")
         else:
             insights.append(f"Column '{col}' has {unique_vals} unique values")
 
-    for col in df.select_dtypes(include='object'):
-        if df[col].nunique() / total_rows > 0.5:
-            insights.append(f"Column '{col}' has high cardinality ({df[col].nunique()} unique values)")
+    for col in acc.categorical_columns:
+        c = columns[col]
+        if total_rows and c.nunique / total_rows > 0.5:
+            if c.nunique_error:
+                insights.append(f"Column '{col}' has high cardinality (~{c.nunique} unique values, ±{c.nunique_error:.1%})")
+            else:
+                insights.append(f"Column '{col}' has high cardinality ({c.nunique} unique values)")
 
     # 6. Imbalanced Categorical Columns
     insights.append("--- Imbalanced Categorical Columns ---")
-    for col in df.select_dtypes(include='object'):
-        top_freq = df[col].value_counts(normalize=True, dropna=False).iloc[0]
+    imbalanced = False
+    for col in acc.categorical_columns:
+        c = columns[col]
+        if c.top.counts.empty or not total_rows:
+            continue
+        top_freq = max(c.top.counts.iloc[0], c.nulls) / total_rows
         if top_freq > 0.9:
-            top_val = df[col].value_counts().idxmax()
-            insights.append(f"Column '{col}' is imbalanced — '{top_val}' occurs in {top_freq:.1%} of rows")
-    if not any("is imbalanced" in i for i in insights[-3:]):
+            imbalanced = True
+            bound = f" (±{c.top.error / total_rows:.1%})" if c.top.error else ""
+            insights.append(f"Column '{col}' is imbalanced — '{c.top.counts.index[0]}' occurs in {top_freq:.1%} of rows{bound}")
+    if not imbalanced:
         insights.append("No highly imbalanced categorical columns found.")
 
-    # 7. Numeric Column Statistics
+    # 7. Numeric Column Statistics (columns with no finite value have none)
     insights.append("--- Numeric Column Statistics ---")
-    numeric_cols = df.select_dtypes(include='number')
-    if not numeric_cols.empty:
-        desc = numeric_cols.describe().T
-        for col in desc.index:
+    numeric = [col for col in acc.numeric_columns if columns[col].moments.count]
+    if numeric:
+        for col in numeric:
+            m = columns[col].moments
             insights.append(
-                f"Numeric column '{col}': mean={desc.loc[col, 'mean']:.2f}, std={desc.loc[col, 'std']:.2f}, "
-                f"min={desc.loc[col, 'min']}, max={desc.loc[col, 'max']}"
+                f"Numeric column '{col}': mean={m.mean:.2f}, std={m.std:.2f}, "
+                f"min={m.min}, max={m.max}"
             )
 
         # 8. Skewness
         insights.append("--- Skewness ---")
-        skewness = numeric_cols.skew()
-        for col, skew in skewness.items():
+        for col in numeric:
+            skew = columns[col].moments.skew
             if abs(skew) > 1:
                 skew_label = "highly skewed"
             elif abs(skew) > 0.5:
@@ -82,52 +273,46 @@ def generate_insights(df):
                 skew_label = "approximately symmetric"
             insights.append(f"Column '{col}' is {skew_label} (skewness={skew:.2f})")
 
-        # 9. Outliers (IQR Method)
+        # 9. Outliers (IQR Method), with quartiles read off the histogram
         insights.append("--- Outliers (IQR Method) ---")
-        for col in numeric_cols.columns:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
+        found = False
+        for col in numeric:
+            hist = columns[col].histogram
+            Q1 = hist.quantile(0.25)
+            Q3 = hist.quantile(0.75)
             IQR = Q3 - Q1
-            outliers = ((df[col] < (Q1 - 1.5 * IQR)) | (df[col] > (Q3 + 1.5 * IQR))).sum()
+            outliers = hist.count_outside(Q1 - 1.5 * IQR, Q3 + 1.5 * IQR)
             if outliers > 0:
-                insights.append(f"Column '{col}' has {outliers} potential outliers (IQR method)")
-        if not any("potential outliers" in i for i in insights[-len(numeric_cols.columns):]):
+                found = True
+                error = hist.count_outside_error(Q1 - 1.5 * IQR, Q3 + 1.5 * IQR)
+                insights.append(f"Column '{col}' has ~{outliers} potential outliers (±{error}, IQR method)")
+        if not found:
             insights.append("No significant outliers detected in numeric columns.")
 
         # 10. Correlation
         insights.append("--- Correlation ---")
-        corr = numeric_cols.corr()
-        corr_pairs = corr.abs().unstack().sort_values(ascending=False)
-        corr_pairs = corr_pairs[corr_pairs < 1]  # exclude self-correlation
-        top_corr = corr_pairs.drop_duplicates().head(3)
-        for (col1, col2), val in top_corr.items():
-            insights.append(f"High correlation between '{col1}' and '{col2}': {val:.2f}")
-        if top_corr.empty:
+        correlated = [col for col in numeric if col in acc.correlation.columns]
+        corr = acc.correlation.corr().loc[correlated, correlated]
+        cols = list(corr.columns)
+        top_corr = top_pairs(corr.to_numpy(), 3)
+        for i, j, val in top_corr:
+            insights.append(f"High correlation between '{cols[i]}' and '{cols[j]}': {abs(val):.2f}")
+        if not top_corr:
             insights.append("No strong correlations found between numeric columns.")
 
-    # 11. Datetime Columns
+    # 11. Datetime Columns (text columns whose every value parsed as a date)
     insights.append("--- Datetime Columns ---")
-    datetime_cols = df.select_dtypes(include='datetime')
-    if not datetime_cols.empty:
-        for col in datetime_cols.columns:
-            min_date = df[col].min()
-            max_date = df[col].max()
-            missing = df[col].isnull().sum()
-            insights.append(f"Datetime column '{col}': range from {min_date} to {max_date}, missing: {missing}")
-    else:
+    for col in acc.datetime_columns:
+        c = columns[col]
+        insights.append(f"Datetime column '{col}': range from {c.date_min} to {c.date_max}, missing: {c.nulls}")
+    if not acc.datetime_columns:
         insights.append("No datetime columns found.")
 
     # 12. Text Column Summary
-    # Bold + Blue
     insights.append("--- Text Column Summary ---")
-    # insights.append('<div style="font-weight:bold; color:blue; font-size:16px; margin-top:20px;">--- Text Column Summary ---</div>')
-
-    object_cols = df.select_dtypes(include='object')
-    for col in object_cols.columns:
-        if df[col].apply(lambda x: isinstance(x, str)).mean() > 0.8:
-            avg_len = df[col].dropna().apply(len).mean()
-            insights.append(f"Text column '{col}' has average length {avg_len:.1f} characters")
-      
- 
+    for col in acc.categorical_columns:
+        c = columns[col]
+        if total_rows and c.text_count / total_rows > 0.8:
+            insights.append(f"Text column '{col}' has average length {c.text_length / c.text_count:.1f} characters")
 
     return insights
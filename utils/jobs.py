@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = 2
+# Jobs left 'running' longer than this (e.g. by a killed worker) are re-queued on startup
+STALE_AFTER = 60 * 60
+LATENCY_WINDOW = 100
+# Results of this many recent jobs are kept in memory for polling clients
+MAX_RESULTS = 32
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    total INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+)
+'''
+
+
+# Passed to the job function so it can report progress and partial results
+class JobHandle:
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+
+    def add_work(self, total):
+        self.queue._execute("UPDATE jobs SET total = total + ? WHERE id = ?", (total, self.job_id))
+
+    def add_results(self, kind, items, steps=1):
+        with self.queue._lock:
+            self.queue._results_of(self.job_id)[kind].extend(items)
+        self.queue._execute("UPDATE jobs SET completed = completed + ? WHERE id = ?", (steps, self.job_id))
+
+    # Replaces the partial results (in completion order) with the final ones
+    def set_result(self, result):
+        with self.queue._lock:
+            self.queue._results_of(self.job_id).update(result)
+
+
+# Profiling jobs in a local thread pool, tracked in a SQLite table so status
+# survives restarts and can be read by every worker process. A job is a call
+# of `runner(handle, **payload)` with a JSON-serializable payload. Partial
+# results are kept in memory, for the most recent jobs only, by the process
+# running the job.
+class JobQueue:
+    def __init__(self, db_path, runner, workers=JOB_WORKERS):
+        self.db_path = db_path
+        self.runner = runner
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='profiling-job')
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # Callers hold self._lock
+    def _results_of(self, job_id):
+        if job_id not in self._results:
+            self._results[job_id] = {"charts": [], "insights": []}
+            while len(self._results) > MAX_RESULTS:
+                self._results.popitem(last=False)
+        return self._results[job_id]
+
+    def _execute(self, sql, params=()):
+        with self._connect() as conn:
+            return conn.execute(sql, params).rowcount
+
+    def submit(self, **payload):
+        job_id = uuid.uuid4().hex
+        self._execute("INSERT INTO jobs (id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                      (job_id, json.dumps(payload), time.time()))
+        self._executor.submit(self._run, job_id, payload)
+        return job_id
+
+    def recover(self):
+        self._execute("UPDATE jobs SET status = 'queued', total = 0, completed = 0 "
+                      "WHERE status = 'running' AND started_at < ?", (time.time() - STALE_AFTER,))
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        for row in rows:
+            self._executor.submit(self._run, row["id"], json.loads(row["payload"]))
+
+    def _run(self, job_id, payload):
+        # Claim atomically so a job re-queued by several processes runs once
+        claimed = self._execute("UPDATE jobs SET status = 'running', started_at = ? "
+                                "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+        if not claimed:
+            return
+        try:
+            self.runner(JobHandle(self, job_id), **payload)
+        except Exception as e:
+            self._execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                          (time.time(), str(e), job_id))
+        else:
+            self._execute("UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ?",
+                          (time.time(), job_id))
+
+    def status(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = job["completed"] / job["total"] if job["total"] else 0.0
+        return job
+
+    # None when the results are not held by this process (e.g. after a restart)
+    def results(self, job_id):
+        with self._lock:
+            result = self._results.get(job_id)
+            return None if result is None else {key: list(items) for key, items in result.items()}
+
+    def metrics(self):
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            recent = conn.execute(
+                "SELECT started_at - created_at, finished_at - started_at FROM jobs "
+                "WHERE status IN ('done', 'failed') ORDER BY finished_at DESC LIMIT ?",
+                (LATENCY_WINDOW,)).fetchall()
+        metrics = {
+            "queue_depth": counts.get('queued', 0),
+            "running": counts.get('running', 0),
+            "done": counts.get('done', 0),
+            "failed": counts.get('failed', 0),
+        }
+        for name, values in (("wait", [r[0] for r in recent]), ("run", [r[1] for r in recent])):
+            values = sorted(values)
+            metrics[f"{name}_seconds"] = {
+                "mean": sum(values) / len(values) if values else None,
+                "p50": values[len(values) // 2] if values else None,
+                "p95": values[int(len(values) * 0.95)] if values else None,
+            }
+        return metrics
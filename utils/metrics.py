@@ -0,0 +1,181 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Upper bounds of the Prometheus histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MEMORY_BUCKETS = tuple(2**20 * mb for mb in (1, 4, 16, 64, 256, 1024, 4096))
+# Dataset size label of every observation, by row count
+SIZE_BUCKETS = ((10_000, "<=10k"), (100_000, "<=100k"), (1_000_000, "<=1M"), (10_000_000, "<=10M"))
+SIZE_UNKNOWN = "unknown"
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_current = contextvars.ContextVar('trace', default=None)
+
+
+def size_bucket(rows):
+    if rows is None:
+        return SIZE_UNKNOWN
+    for bound, label in SIZE_BUCKETS:
+        if rows <= bound:
+            return label
+    return f">{SIZE_BUCKETS[-1][1][2:]}"
+
+
+# Resident set size in bytes, or None where it cannot be read cheaply
+def current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+# Stage timings of one request or job. Repeated names (one per chart task,
+# say) are summed.
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = None
+        self.spans = OrderedDict()
+        self._token = None
+
+    def add(self, name, seconds, rss_delta=None):
+        span = self.spans.setdefault(name, {"seconds": 0.0, "count": 0, "rss_delta": None})
+        span["seconds"] += seconds
+        span["count"] += 1
+        if rss_delta is not None:
+            span["rss_delta"] = max(span["rss_delta"] or 0, rss_delta)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        entries = []
+        for name, span in self.spans.items():
+            entry = f"{name};dur={span['seconds'] * 1000:.1f}"
+            if span["count"] > 1:
+                entry += f';desc="{span["count"]} tasks"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+def begin_trace():
+    trace = Trace()
+    trace._token = _current.set(trace)
+    return trace
+
+
+def end_trace(trace):
+    if trace._token is not None:
+        _current.reset(trace._token)
+        trace._token = None
+
+
+def current_trace():
+    return _current.get()
+
+
+# Times the block into the current trace, with the growth of resident memory
+# across it. A no-op outside a trace.
+@contextmanager
+def span(name):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    rss = current_rss()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        trace.add(name, seconds, None if rss is None else max(current_rss() - rss, 0))
+
+
+def set_rows(rows):
+    trace = _current.get()
+    if trace is not None:
+        trace.rows = rows
+
+
+# Per-task wall times from a utils.executor.run_tasks report, as `prefix`.<task>
+# spans. Tasks run on pool workers, so memory is not attributed to them.
+def record_tasks(prefix, report):
+    trace = _current.get()
+    if trace is None:
+        return
+    for name, wall, _ in report.get("timings", []):
+        trace.add(f"{prefix}.{name}", wall)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, metric, labels):
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float('inf') else f"{bound:g}"
+            yield f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}'
+        yield f"{metric}_sum{{{labels}}} {self.sum:g}"
+        yield f"{metric}_count{{{labels}}} {self.count}"
+
+
+# Histograms of stage durations and memory growth, labelled by stage and
+# dataset size bucket, rendered in the Prometheus text format.
+class MetricsRegistry:
+    def __init__(self):
+        self._durations = {}
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def observe(self, trace):
+        size = size_bucket(trace.rows)
+        with self._lock:
+            for name, span in trace.spans.items():
+                key = (name, size)
+                if key not in self._durations:
+                    self._durations[key] = Histogram(DURATION_BUCKETS)
+                self._durations[key].observe(span["seconds"])
+                if span["rss_delta"] is not None:
+                    if key not in self._memory:
+                        self._memory[key] = Histogram(MEMORY_BUCKETS)
+                    self._memory[key].observe(span["rss_delta"])
+
+    def render(self):
+        lines = []
+        families = (
+            ("dashboard_stage_seconds", "Wall time of each dashboard stage.", self._durations),
+            ("dashboard_stage_rss_growth_bytes", "Growth of resident memory across each stage.", self._memory),
+        )
+        with self._lock:
+            for metric, help_text, histograms in families:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (stage, size), histogram in sorted(histograms.items()):
+                    lines.extend(histogram.lines(metric, f'stage="{stage}",size="{size}"'))
+        rss = current_rss()
+        if rss is not None:
+            lines.append("# HELP process_resident_memory_bytes Resident memory size in bytes.")
+            lines.append("# TYPE process_resident_memory_bytes gauge")
+            lines.append(f"process_resident_memory_bytes {rss}")
+        return "\n".join(lines) + "\n"
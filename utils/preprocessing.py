@@ -1,13 +1,107 @@
+import numpy as np
 import pandas as pd
 
-def preprocess_dataset(df):
-    # Example preprocessing steps
-    # 1. Drop duplicates
-    df = df.drop_duplicates()
-    # 2. Fill missing numeric values with mean
-    for col in df.select_dtypes(include=['float64', 'int64']).columns:
-        df[col].fillna(df[col].mean(), inplace=True)
-    # 3. Fill missing categorical with mode
-    for col in df.select_dtypes(include=['object']).columns:
-        df[col].fillna(df[col].mode()[0], inplace=True)
+from utils.streaming import RowHashSet, TopValues, row_hashes, CHUNK_SIZE
+
+TEXT_DTYPES = ['object', 'string', 'category']
+
+
+# Each stage takes a DataFrame and returns a new one; stages compose in
+# preprocess_dataset.
+
+# Text columns whose every non-null value is a number become numeric
+def coerce_types(df):
+    converted = {}
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        numbers = pd.to_numeric(df[col], errors='coerce')
+        if numbers.notna().sum() == df[col].notna().sum():
+            converted[col] = numbers
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for col, values in converted.items():
+        df[col] = values
     return df
+
+
+def drop_duplicate_rows(df):
+    return df.drop_duplicates()
+
+
+# Mean of each numeric column and mode of each text column, for fillna
+def fill_values(df):
+    fills = df.select_dtypes(include=[np.number]).mean().dropna().to_dict()
+    text = df.select_dtypes(include=TEXT_DTYPES)
+    if not text.empty:
+        modes = text.mode(dropna=True)
+        if len(modes):
+            fills.update(modes.iloc[0].dropna().to_dict())
+    return fills
+
+
+def impute_missing(df):
+    return df.fillna(fill_values(df))
+
+
+PIPELINE = (coerce_types, drop_duplicate_rows, impute_missing)
+
+
+def preprocess_dataset(df, stages=PIPELINE):
+    for stage in stages:
+        df = stage(df)
+    return df
+
+
+# The same pipeline over a file read in chunks, for files that do not fit in
+# memory. `read_chunks()` must return a fresh iterator of the same DataFrame
+# chunks each time it is called. The first pass drops duplicate rows by their
+# hash (8 bytes per distinct row) and accumulates means and modes of the kept
+# rows; the second pass reads the chunks again and writes the kept, filled
+# rows as CSV to `output_path`. Column kinds are fixed by the first chunk, as
+# in utils.streaming.
+def preprocess_chunks(read_chunks, output_path):
+    seen = RowHashSet()
+    keep_masks = []
+    numeric_cols = None
+    sums = counts = None
+    tops = {}
+    rows = 0
+
+    def coerced(chunk):
+        return chunk.assign(**{col: pd.to_numeric(chunk[col], errors='coerce') for col in numeric_cols})
+
+    for chunk in read_chunks():
+        if numeric_cols is None:
+            first = coerce_types(chunk)
+            numeric_cols = first.select_dtypes(include=[np.number]).columns.tolist()
+            tops = {col: TopValues() for col in first.select_dtypes(include=TEXT_DTYPES).columns}
+            sums = pd.Series(0.0, index=numeric_cols)
+            counts = pd.Series(0, index=numeric_cols)
+        chunk = coerced(chunk)
+        keep = seen.add(row_hashes(chunk))
+        keep_masks.append(np.packbits(keep))
+        kept = chunk[keep]
+        rows += len(chunk)
+        sums += kept[numeric_cols].sum()
+        counts += kept[numeric_cols].count()
+        for col, top in tops.items():
+            top.update(kept[col])
+
+    fills = (sums[counts > 0] / counts[counts > 0]).to_dict() if numeric_cols else {}
+    for col, top in tops.items():
+        if not top.counts.empty:
+            # Approximate when more distinct values were seen than TopValues keeps
+            fills[col] = top.counts.index[0]
+
+    kept_rows = 0
+    chunks = read_chunks()
+    for n, (chunk, packed) in enumerate(zip(chunks, keep_masks)):
+        keep = np.unpackbits(packed, count=len(chunk)).astype(bool)
+        cleaned = coerced(chunk)[keep].fillna(fills)
+        cleaned.to_csv(output_path, mode='w' if n == 0 else 'a', header=n == 0, index=False)
+        kept_rows += len(cleaned)
+    return {"rows": rows, "kept": kept_rows, "duplicates": rows - kept_rows, "fills": fills}
+
+
+def preprocess_csv_in_chunks(filepath, output_path, chunksize=CHUNK_SIZE):
+    return preprocess_chunks(lambda: pd.read_csv(filepath, chunksize=chunksize), output_path)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+class ColumnProfile:
+    def __init__(self, name, dtype):
+        self.name = name
+        self.dtype = dtype
+        self.nulls = 0
+        self.nunique = 0
+        # value_counts(dropna=False), only for object/category columns
+        self.value_counts = None
+        # Non-null unique values in order of appearance, when there are at most 10
+        self.examples = None
+        self.mean = None
+        self.std = None
+        self.min = None
+        self.max = None
+        self.skew = None
+        self.q1 = None
+        self.q3 = None
+        self.outliers = 0
+        self.text_ratio = 0.0
+        self.avg_length = None
+
+    @property
+    def nunique_with_nulls(self):
+        return self.nunique + (1 if self.nulls else 0)
+
+    def top_counts(self):
+        counts = self.value_counts
+        return counts[counts.index.notna()]
+
+
+# Every per-column statistic used by generate_charts and generate_insights,
+# each computed once with frame-level vectorized calls.
+class DatasetProfile:
+    def __init__(self, df):
+        self._profile_layout(df)
+        self.duplicates = int(df.duplicated().sum())
+
+        for col, count in df.isna().sum().items():
+            self.columns[col].nulls = int(count)
+        for col, count in df.nunique().items():
+            self.columns[col].nunique = int(count)
+        for col, c in self.columns.items():
+            if c.nunique_with_nulls <= 10:
+                values = df[col].dropna()
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.astype(values.cat.categories.dtype)
+                c.examples = values.unique()
+        for col in self.cat_cols:
+            self.columns[col].value_counts = df[col].value_counts(dropna=False)
+
+        self._profile_numeric()
+        self._profile_datetime(df)
+        self._profile_text(df)
+
+    # Column lists, dtypes and the numeric matrix
+    def _profile_layout(self, df):
+        self.rows = len(df)
+        self.columns = {col: ColumnProfile(col, dtype) for col, dtype in df.dtypes.items()}
+        self.numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        self.cat_cols = df.select_dtypes(include=['object', 'string', 'category']).columns.tolist()
+        # String columns, including those utils.dtypes turned into categories
+        text_cols = set(df.select_dtypes(include=['object', 'string']).columns)
+        self.object_cols = [col for col in self.cat_cols
+                            if col in text_cols or df[col].cat.categories.inferred_type == 'string']
+        self.datetime_cols = df.select_dtypes(include='datetime').columns.tolist()
+        # By name: every CategoricalDtype (one per set of categories) is distinct
+        self.dtype_counts = df.dtypes.astype(str).value_counts()
+        self.numeric_values = df[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _profile_numeric(self):
+        if not self.numeric_cols:
+            return
+        numeric = pd.DataFrame(self.numeric_values, columns=self.numeric_cols)
+        stats = pd.DataFrame({
+            'mean': numeric.mean(),
+            'std': numeric.std(),
+            'min': numeric.min(),
+            'max': numeric.max(),
+            'skew': numeric.skew(),
+        })
+        quartiles = numeric.quantile([0.25, 0.75])
+        q1 = quartiles.iloc[0].to_numpy()
+        q3 = quartiles.iloc[1].to_numpy()
+        iqr = q3 - q1
+        outliers = ((self.numeric_values < q1 - 1.5 * iqr) | (self.numeric_values > q3 + 1.5 * iqr)).sum(axis=0)
+        for i, col in enumerate(self.numeric_cols):
+            c = self.columns[col]
+            c.mean, c.std, c.min, c.max, c.skew = stats.loc[col, ['mean', 'std', 'min', 'max', 'skew']]
+            c.q1, c.q3 = q1[i], q3[i]
+            c.outliers = int(outliers[i])
+
+    def _profile_datetime(self, df):
+        if not self.datetime_cols:
+            return
+        mins = df[self.datetime_cols].min()
+        maxs = df[self.datetime_cols].max()
+        for col in self.datetime_cols:
+            self.columns[col].min = mins[col]
+            self.columns[col].max = maxs[col]
+
+    def _profile_text(self, df):
+        for col in self.object_cols:
+            try:
+                lengths = df[col].str.len()
+            except AttributeError:
+                continue  # object column holding no strings at all
+            c = self.columns[col]
+            c.text_ratio = lengths.notna().mean() if self.rows else 0.0
+            c.avg_length = lengths.mean()
+
+
+def profile_dataset(df):
+    return DatasetProfile(df)
+
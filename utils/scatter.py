@@ -0,0 +1,57 @@
+import warnings
+
+import numpy as np
+
+from utils.encoding import encode_points
+
+SCATTER_MAX_POINTS = 2000
+DENSITY_GRID = 40
+SCATTER_MODES = ('sample', 'density')
+# Above this many numeric pairs only the most strongly correlated get a chart
+SCATTER_MAX_PAIRS = 50
+
+
+# Uniform sample of the complete rows of every pair. One random priority per
+# row is shared by all pairs (reservoir sampling with precomputed keys), so
+# each pair costs a couple of vectorized boolean passes over the column mask.
+class PairSampler:
+    def __init__(self, values, max_points=SCATTER_MAX_POINTS, seed=0):
+        self.values = values
+        self.max_points = max_points
+        self.order = np.random.default_rng(seed).permutation(len(values))
+        self.valid_ordered = ~np.isnan(values[self.order])
+
+    def pair(self, i, j):
+        both = self.valid_ordered[:, i] & self.valid_ordered[:, j]
+        total = int(both.sum())
+        rows = np.sort(self.order[np.flatnonzero(both)[:self.max_points]])
+        return self.values[rows, i], self.values[rows, j], total
+
+
+# Count grid of every pair over `grid` x `grid` cells. Each column is binned
+# once up front; a pair is then a single bincount over the combined cell ids.
+class DensityGrid:
+    def __init__(self, values, grid=DENSITY_GRID):
+        self.grid = grid
+        self.valid = ~np.isnan(values)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            lo = np.nanmin(values, axis=0)
+            hi = np.nanmax(values, axis=0)
+        width = np.where(hi > lo, (hi - lo) / grid, 1.0)
+        cells = np.floor((np.nan_to_num(values) - lo) / width)
+        self.cells = np.clip(np.nan_to_num(cells), 0, grid - 1).astype(np.int64)
+        self.centers = lo + (np.arange(grid)[:, None] + 0.5) * width
+
+    def pair(self, i, j):
+        grid = self.grid
+        both = self.valid[:, i] & self.valid[:, j]
+        counts = np.bincount(self.cells[both, i] * grid + self.cells[both, j], minlength=grid * grid)
+        return self.centers[:, i], self.centers[:, j], counts.reshape(grid, grid)
+
+
+def density_points(x_centers, y_centers, counts, max_radius=12, encoding='json'):
+    xi, yi = np.nonzero(counts)
+    cell_counts = counts[xi, yi]
+    radius = 2 + (max_radius - 2) * np.sqrt(cell_counts / cell_counts.max()) if len(xi) else cell_counts
+    return encode_points(encoding, x=x_centers[xi], y=y_centers[yi], r=radius.round(1), count=cell_counts)
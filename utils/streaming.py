@@ -0,0 +1,513 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.dtypes import datetime_format
+
+CHUNK_SIZE = 100_000
+HISTOGRAM_BINS = 1024
+TOP_K_CAPACITY = 1000
+# 2**12 registers: about 1.6% relative error on distinct counts, in 4 KiB
+HLL_PRECISION = 12
+
+
+# Mergeable mean / M2 / M3 (Pebay's pairwise update) plus min and max.
+class Moments:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        mean = values.mean()
+        dev = values - mean
+        other = Moments()
+        other.count = len(values)
+        other.mean = float(mean)
+        other.m2 = float((dev ** 2).sum())
+        other.m3 = float((dev ** 3).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        m3 = (self.m3 + other.m3
+              + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        self.m3 = m3
+        self.mean = self.mean + delta * nb / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return np.nan
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+    @property
+    def skew(self):
+        # Same adjusted Fisher-Pearson estimator as pandas' Series.skew()
+        n = self.count
+        if n < 3:
+            return np.nan
+        m2 = self.m2 / n
+        if m2 == 0:
+            return 0.0
+        g1 = (self.m3 / n) / m2 ** 1.5
+        return float(g1 * np.sqrt(n * (n - 1)) / (n - 2))
+
+
+# Fixed bin count over a range that doubles (merging neighbouring bins)
+# whenever a value falls outside it, so the range never has to be known upfront.
+class StreamingHistogram:
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.bins = bins + bins % 2
+        self.lo = None
+        self.width = None
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+
+    def update(self, values, weights=None):
+        if len(values) == 0:
+            return
+        vmin, vmax = float(values.min()), float(values.max())
+        if self.lo is None:
+            span = vmax - vmin
+            self.lo = vmin
+            self.width = span / self.bins if span > 0 else max(abs(vmin), 1.0) / self.bins
+        while vmin < self.lo:
+            self._coarsen(extend_down=True)
+        while vmax >= self.lo + self.width * self.bins:
+            self._coarsen(extend_down=False)
+        idx = ((values - self.lo) // self.width).astype(np.int64)
+        np.clip(idx, 0, self.bins - 1, out=idx)
+        binned = np.bincount(idx, weights=weights, minlength=self.bins)
+        self.counts += np.rint(binned).astype(np.int64)
+
+    def _coarsen(self, extend_down):
+        half = self.bins // 2
+        merged = self.counts.reshape(half, 2).sum(axis=1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        if extend_down:
+            self.counts[half:] = merged
+            self.lo -= self.width * self.bins
+        else:
+            self.counts[:half] = merged
+        self.width *= 2
+
+    def merge(self, other):
+        if other.lo is None:
+            return
+        nonzero = other.counts > 0
+        self.update(other.centers()[nonzero], other.counts[nonzero])
+
+    # Empty until the first value is seen: the range is not known before
+    def edges(self):
+        if self.lo is None:
+            return np.array([])
+        return self.lo + np.arange(self.bins + 1) * self.width
+
+    def centers(self):
+        if self.lo is None:
+            return np.array([])
+        return self.lo + (np.arange(self.bins) + 0.5) * self.width
+
+    def trimmed(self):
+        # Edges and counts with empty leading/trailing bins removed
+        nonzero = np.flatnonzero(self.counts)
+        if len(nonzero) == 0:
+            return np.array([]), np.array([], dtype=np.int64)
+        first, last = nonzero[0], nonzero[-1] + 1
+        return self.edges()[first:last + 1], self.counts[first:last]
+
+    def quantile(self, q):
+        total = self.counts.sum()
+        if total == 0:
+            return np.nan
+        cdf = np.concatenate([[0], np.cumsum(self.counts)]) / total
+        return float(np.interp(q, cdf, self.edges()))
+
+    def count_outside(self, low, high):
+        if self.lo is None:
+            return 0
+        centers = self.centers()
+        return int(self.counts[(centers < low) | (centers > high)].sum())
+
+    # count_outside is off by at most the counts of the bins holding the fences
+    def count_outside_error(self, low, high):
+        if self.lo is None:
+            return 0
+        edges = self.edges()
+        fences = np.array([low, high])
+        fences = fences[(fences >= edges[0]) & (fences < edges[-1])]
+        bins = np.searchsorted(edges, fences, side='right') - 1
+        return int(self.counts[np.unique(bins)].sum())
+
+
+# Exact value counts until more than `capacity` distinct values are seen,
+# after which only the heaviest `capacity` values are kept (as lower bounds).
+# `error` bounds how far any kept count can be below the true one: each
+# truncation can drop at most the largest discarded count from a value.
+class TopValues:
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.truncated = False
+        self.error = 0
+
+    def update(self, series):
+        self._add(series.value_counts())
+
+    def merge(self, other):
+        self.truncated = self.truncated or other.truncated
+        self.error += other.error
+        self._add(other.counts)
+
+    def _add(self, counts):
+        if self.counts.empty:
+            merged = counts.astype(np.int64)
+        else:
+            merged = self.counts.add(counts, fill_value=0).astype(np.int64)
+        merged = merged.sort_values(ascending=False, kind='stable')
+        if len(merged) > self.capacity:
+            self.error += int(merged.iloc[self.capacity])
+            merged = merged.iloc[:self.capacity]
+            self.truncated = True
+        self.counts = merged
+
+    @property
+    def distinct(self):
+        return len(self.counts)
+
+
+def value_hashes(values, numeric=False):
+    # Numbers hash as float64 so int and float chunks of one column agree
+    if numeric:
+        return pd.util.hash_array(np.asarray(values, dtype=np.float64))
+    return pd.util.hash_pandas_object(pd.Series(values, copy=False), index=False).to_numpy()
+
+
+# Row hashes from per-column hashes (the same mixing as pandas' hash_pandas_object)
+def combine_hashes(arrays, rows):
+    out = np.full(rows, 0x345678, dtype=np.uint64)
+    mult = np.uint64(1000003)
+    for i, hashes in enumerate(arrays):
+        out ^= hashes
+        out *= mult
+        mult += np.uint64(82520 + 2 * (len(arrays) - i))
+    out += np.uint64(97531)
+    return out
+
+
+# Distinct count sketch over 64-bit value hashes; merging is a register-wise max
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes):
+        if len(hashes) == 0:
+            return
+        p = self.precision
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # frexp's exponent is the bit length; float rounding only matters
+        # within 2**-53 of a power of two
+        rank = (64 - p) - np.frexp(rest.astype(np.float64))[1] + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))  # linear counting for small sets
+        return int(round(raw))
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class ColumnAccumulator:
+    # Missing from states pickled before dates were tracked
+    date_format = None
+    date_min = date_max = None
+
+    # `date_format`, from utils.dtypes.datetime_format on the first chunk, makes
+    # this a datetime column for as long as every value parses with it
+    def __init__(self, name, dtype, date_format=None):
+        self.name = name
+        self.dtype = dtype
+        self.date_format = date_format
+        self.is_numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        self.count = 0
+        self.nulls = 0
+        self.top = TopValues()
+        # Only fed once `top` is truncated, seeded with the exact set it had
+        self.distinct = HyperLogLog()
+        self.moments = Moments() if self.is_numeric else None
+        self.histogram = StreamingHistogram() if self.is_numeric else None
+        self.text_count = 0
+        self.text_length = 0
+        # +/-inf values: counted, but kept out of the moments and histogram
+        self.infinite = 0
+
+    # `hashes`, when given, are the value_hashes of the (coerced) series
+    def update(self, series, hashes=None):
+        if self.is_numeric:
+            series = pd.to_numeric(series, errors='coerce')
+            if series.dtype != self.dtype:
+                self.dtype = np.result_type(self.dtype, series.dtype)
+        nulls = int(series.isna().sum())
+        self.nulls += nulls
+        self.count += len(series) - nulls
+        if self.date_format is not None:
+            self._update_dates(series, len(series) - nulls)
+        was_truncated = self.top.truncated
+        seen = self.top.counts.index
+        # Numeric columns stop tracking values once they are clearly continuous
+        if not (self.is_numeric and was_truncated):
+            self.top.update(series)
+        if self.top.truncated:
+            if not was_truncated:
+                self.distinct.add_hashes(value_hashes(seen, self.is_numeric))
+            if hashes is None:
+                hashes = value_hashes(series, self.is_numeric)
+            self.distinct.add_hashes(hashes[series.notna().to_numpy()])
+        if self.is_numeric:
+            values = series.dropna().to_numpy(dtype=np.float64)
+            finite = np.isfinite(values)
+            if not finite.all():
+                self.infinite += int((~finite).sum())
+                values = values[finite]
+            self.moments.update(values)
+            self.histogram.update(values)
+        elif pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            try:
+                lengths = series.str.len()
+            except AttributeError:
+                return  # object column without any strings in this chunk
+            self.text_count += int(lengths.notna().sum())
+            self.text_length += int(lengths.sum())
+
+    def _update_dates(self, series, count):
+        dates = pd.to_datetime(series, format=self.date_format, errors='coerce')
+        if dates.notna().sum() != count:
+            self.date_format = self.date_min = self.date_max = None
+        elif count:
+            self._extend_dates(dates.min(), dates.max())
+
+    def _extend_dates(self, lo, hi):
+        self.date_min = lo if self.date_min is None else min(self.date_min, lo)
+        self.date_max = hi if self.date_max is None else max(self.date_max, hi)
+
+    def merge(self, other):
+        if self.date_format != other.date_format:
+            self.date_format = self.date_min = self.date_max = None
+        elif other.date_min is not None:
+            self._extend_dates(other.date_min, other.date_max)
+        self.count += other.count
+        self.nulls += other.nulls
+        was_truncated = self.top.truncated
+        seen = self.top.counts.index
+        self.top.merge(other.top)
+        if self.top.truncated:
+            if not was_truncated:
+                self.distinct.add_hashes(value_hashes(seen, self.is_numeric))
+            if other.top.truncated:
+                self.distinct.merge(other.distinct)
+            else:
+                self.distinct.add_hashes(value_hashes(other.top.counts.index, self.is_numeric))
+        if self.is_numeric:
+            self.moments.merge(other.moments)
+            self.histogram.merge(other.histogram)
+        self.infinite += other.infinite
+        self.text_count += other.text_count
+        self.text_length += other.text_length
+
+    @property
+    def rows(self):
+        return self.count + self.nulls
+
+    # Exact while every distinct value is still counted, else the HLL estimate
+    @property
+    def nunique(self):
+        return self.distinct.estimate() if self.top.truncated else self.top.distinct
+
+    @property
+    def nunique_error(self):
+        return self.distinct.relative_error if self.top.truncated else 0.0
+
+
+# Pairwise-complete sums for Pearson correlation, shifted by the first chunk's
+# means to keep the sums well conditioned.
+class CorrelationAccumulator:
+    def __init__(self, columns):
+        k = len(columns)
+        self.columns = list(columns)
+        self.shift = None
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def update(self, values):
+        if self.shift is None:
+            # All-NaN columns (no value yet) are shifted by 0
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+        present = ~np.isnan(values)
+        mask = present.astype(np.float64)
+        centered = np.where(present, values - self.shift, 0.0)
+        self.n += mask.T @ mask
+        self.sx += centered.T @ mask
+        self.sxx += (centered ** 2).T @ mask
+        self.sxy += centered.T @ centered
+
+    def merge(self, other):
+        if other.shift is None:
+            return
+        if self.shift is None:
+            self.shift = other.shift
+        # Re-centre the other side's sums onto our shift before adding them
+        d = (other.shift - self.shift)[:, None]
+        sx = other.sx + d * other.n
+        self.sxx += other.sxx + 2 * d * other.sx + d ** 2 * other.n
+        self.sxy += (other.sxy + d * other.sx.T + d.T * other.sx
+                     + d * d.T * other.n)
+        self.sx += sx
+        self.n += other.n
+
+    def corr(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.n * self.sxy - self.sx * self.sx.T
+            var = self.n * self.sxx - self.sx ** 2
+            corr = cov / np.sqrt(var * var.T)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+# Distinct rows seen so far, as one uint64 hash per row rather than the rows
+# themselves. Exact duplicate counting needs all of them: memory is 8 bytes
+# per distinct row, whatever the chunk size. Hashes are kept in sorted runs,
+# each more than twice the size of the next (as in a log-structured merge),
+# so there are O(log n) runs to search and each hash is copied O(log n)
+# times rather than once per chunk.
+class RowHashSet:
+    def __init__(self):
+        self._runs = []
+
+    @property
+    def hashes(self):
+        return np.concatenate(self._runs) if self._runs else np.array([], dtype=np.uint64)
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    # Marks the rows whose hash was not seen before (first occurrence only)
+    def add(self, hashes):
+        unique, first = np.unique(hashes, return_index=True)
+        found = np.zeros(len(unique), dtype=bool)
+        for run in self._runs:
+            pos = np.searchsorted(run, unique)
+            inside = pos < len(run)
+            found[inside] |= run[pos[inside]] == unique[inside]
+        if not found.all():
+            self._runs.append(unique[~found])
+            while len(self._runs) > 1 and len(self._runs[-2]) < 2 * len(self._runs[-1]):
+                last = self._runs.pop()
+                self._runs[-1] = np.sort(np.concatenate([self._runs[-1], last]), kind="stable")
+        new = np.zeros(len(hashes), dtype=bool)
+        new[first[~found]] = True
+        return new
+
+
+def row_hashes(chunk):
+    numeric = [pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+               for dtype in chunk.dtypes]
+    return combine_hashes([value_hashes(chunk.iloc[:, i], is_numeric) for i, is_numeric in enumerate(numeric)],
+                          len(chunk))
+
+
+class DatasetAccumulator:
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+        self.correlation = None
+        self.duplicates = 0
+        self._seen = RowHashSet()
+
+    def update(self, chunk):
+        if not self.columns:
+            for col in chunk.columns:
+                self.columns[col] = ColumnAccumulator(col, chunk[col].dtype, datetime_format(chunk[col]))
+            numeric = [col for col, acc in self.columns.items() if acc.is_numeric]
+            self.correlation = CorrelationAccumulator(numeric)
+        self.rows += len(chunk)
+        numeric = self.correlation.columns
+        coerced = chunk
+        if numeric:
+            values = chunk[numeric].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            self.correlation.update(np.where(np.isinf(values), np.nan, values))
+            coerced = chunk.assign(**{col: values[:, i] for i, col in enumerate(numeric)})
+        # Each column is hashed once, for its distinct-count sketch and the row hashes
+        hashes = []
+        for col, acc in self.columns.items():
+            hashes.append(value_hashes(coerced[col], acc.is_numeric))
+            acc.update(chunk[col], hashes[-1])
+        self._count_duplicates(combine_hashes(hashes, len(chunk)))
+
+    def _count_duplicates(self, hashes):
+        self.duplicates += len(hashes) - int(self._seen.add(hashes).sum())
+
+    def merge(self, other):
+        if not self.columns:
+            self.__dict__.update(other.__dict__)
+            return
+        self.rows += other.rows
+        for col, acc in self.columns.items():
+            acc.merge(other.columns[col])
+        self.correlation.merge(other.correlation)
+        self.duplicates += other.duplicates
+        self._count_duplicates(other._seen.hashes)
+
+    @property
+    def numeric_columns(self):
+        return [col for col, acc in self.columns.items() if acc.is_numeric]
+
+    @property
+    def categorical_columns(self):
+        return [col for col, acc in self.columns.items() if not acc.is_numeric]
+
+    @property
+    def datetime_columns(self):
+        return [col for col, acc in self.columns.items() if acc.date_format is not None]
+
+
+def profile_csv_in_chunks(filepath, chunksize=CHUNK_SIZE):
+    acc = DatasetAccumulator()
+    for chunk in pd.read_csv(filepath, chunksize=chunksize):
+        acc.update(chunk)
+    return acc
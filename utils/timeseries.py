@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+
+from utils.decimation import LINE_MAX_POINTS
+
+# Pyramid levels from finest to coarsest: (name, NumPy datetime64 unit, level
+# aggregated from). Weeks straddle months, so both are built from days; 'W'
+# is handled separately so weeks start on Monday. A level whose source was
+# skipped is aggregated from the rows.
+LEVELS = (("minute", "m", None), ("hour", "h", "minute"), ("day", "D", "hour"),
+          ("week", "W", "day"), ("month", "M", "day"))
+# Numeric columns aggregated alongside each datetime column
+TIMESERIES_MAX_COLUMNS = 8
+# Levels finer than the first one with at most this many buckets are not
+# built: zooming stops at that resolution, and memory stays bounded whatever
+# the row count (about 1.7 MB per numeric column at float32)
+PYRAMID_MAX_BUCKETS = 100_000
+# Upper bound on the points one zoom request may ask for
+ZOOM_MAX_POINTS = 5000
+
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+_WEEK_SHIFT = np.timedelta64(3, 'D')
+
+
+def _floor(times, unit):
+    if unit == "W":
+        days = (times + _WEEK_SHIFT).astype("datetime64[D]").astype(np.int64)
+        return (np.datetime64(0, 'D') + (days // 7 * 7) - _WEEK_SHIFT).astype("datetime64[ns]")
+    return times.astype(f"datetime64[{unit}]").astype("datetime64[ns]")
+
+
+# Start positions of each run of equal keys in a sorted array
+def _runs(keys):
+    return np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1])
+
+
+def _reduce(level, starts):
+    return {
+        "count": np.add.reduceat(level["count"], starts),
+        "series": {name: {"min": np.minimum.reduceat(stats["min"], starts),
+                          "max": np.maximum.reduceat(stats["max"], starts),
+                          "sum": np.add.reduceat(stats["sum"], starts),
+                          "n": np.add.reduceat(stats["n"], starts)}
+                   for name, stats in level["series"].items()},
+    }
+
+
+# Min/max/mean/count of numeric columns over one datetime column at minute,
+# hour, day, week and month resolution, from the finest level with at most
+# `max_buckets` buckets up (months are always kept). Each level is aggregated
+# from a finer one, and only non-empty buckets are stored. Statistics are
+# float32 and counts int32.
+class TimePyramid:
+    def __init__(self, times, columns, max_buckets=PYRAMID_MAX_BUCKETS):
+        times = np.asarray(times, dtype="datetime64[ns]")
+        present = ~np.isnat(times)
+        order = np.argsort(times[present], kind='stable')
+        times = times[present][order]
+        rows = {"start": times, "count": np.ones(len(times), dtype=np.int32), "series": {}}
+        for name, values in columns.items():
+            values = np.asarray(values, dtype=np.float32)[present][order]
+            valid = ~np.isnan(values)
+            rows["series"][name] = {
+                "min": np.where(valid, values, np.float32(np.inf)),
+                "max": np.where(valid, values, np.float32(-np.inf)),
+                "sum": np.where(valid, values, np.float32(0)),
+                "n": valid.astype(np.int32),
+            }
+        self.columns = list(columns)
+        self.rows = len(times)
+        self.levels = {}
+        for name, unit, source in LEVELS:
+            level = self.levels.get(source, rows)
+            keys = _floor(level["start"], unit)
+            starts = _runs(keys) if len(keys) else np.array([], dtype=np.int64)
+            if len(starts) > max_buckets and name != LEVELS[-1][0]:
+                continue
+            self.levels[name] = dict(_reduce(level, starts), start=keys[starts])
+
+    @property
+    def nbytes(self):
+        return sum(level["start"].nbytes + level["count"].nbytes
+                   + sum(values.nbytes for stats in level["series"].values() for values in stats.values())
+                   for level in self.levels.values())
+
+    @property
+    def span(self):
+        level = next(iter(self.levels.values()))
+        if not len(level["start"]):
+            return None, None
+        return level["start"][0], level["start"][-1]
+
+    # The buckets of [start, end] (datetime64 or None for open ends) at the
+    # finest level that fits in `max_points`. When even months do not fit,
+    # consecutive months are merged.
+    def window(self, start=None, end=None, max_points=LINE_MAX_POINTS, columns=None):
+        columns = self.columns if columns is None else [c for c in columns if c in self.columns]
+        max_points = max(1, min(max_points, ZOOM_MAX_POINTS))
+        for name, unit, _ in LEVELS:
+            if name not in self.levels:
+                continue
+            level = self.levels[name]
+            lo, hi = self._bounds(level["start"], unit, start, end)
+            if hi - lo <= max_points:
+                break
+        starts = np.arange(lo, hi)
+        if hi - lo > max_points:
+            group = -(-(hi - lo) // max_points)
+            name = f"{group} months"
+            starts = np.arange(lo, hi, group)
+        window = {"resolution": name, "start": level["start"][starts]}
+        if len(starts) == hi - lo:
+            window["count"] = level["count"][lo:hi]
+            series = {col: {key: stats[key][lo:hi] for key in stats} for col, stats in level["series"].items()
+                      if col in columns}
+        else:
+            merged = _reduce({"count": level["count"][lo:hi],
+                              "series": {col: {key: stats[key][lo:hi] for key in stats}
+                                         for col, stats in level["series"].items() if col in columns}},
+                             starts - lo)
+            window["count"] = merged["count"]
+            series = merged["series"]
+        window["series"] = {}
+        for col, stats in series.items():
+            empty = stats["n"] == 0
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = (stats["sum"] / stats["n"]).astype(np.float32)
+            window["series"][col] = {
+                "min": np.where(empty, np.nan, stats["min"]),
+                "max": np.where(empty, np.nan, stats["max"]),
+                "mean": np.where(empty, np.nan, mean),
+            }
+        return window
+
+    @staticmethod
+    def _bounds(keys, unit, start, end):
+        lo = 0
+        hi = len(keys)
+        if start is not None:
+            # Include the bucket that contains `start`
+            lo = int(np.searchsorted(keys, _floor(np.array([start], dtype="datetime64[ns]"), unit)[0]))
+        if end is not None:
+            hi = int(np.searchsorted(keys, np.datetime64(end, 'ns'), side='right'))
+        return lo, max(hi, lo)
+
+
+# Numeric columns aggregated over the datetime columns of `df`
+def series_columns(df, max_columns=TIMESERIES_MAX_COLUMNS):
+    return df.select_dtypes(include=[np.number]).columns[:max_columns].tolist()
+
+
+# The pyramid of datetime column `time_col` of `df`, over its first numeric columns
+def build_pyramid(df, time_col, max_columns=TIMESERIES_MAX_COLUMNS, max_buckets=PYRAMID_MAX_BUCKETS):
+    values = {col: df[col].to_numpy(dtype=np.float32, na_value=np.nan) for col in series_columns(df, max_columns)}
+    return TimePyramid(df[time_col].to_numpy(dtype="datetime64[ns]"), values, max_buckets)
+
+
+def format_times(times):
+    return pd.DatetimeIndex(times).strftime('%Y-%m-%dT%H:%M').tolist()
+
+
+# NaN (a bucket with no values) becomes None, which JSON can carry. float32
+# values are written with their shortest float32 repr, not the float64 one.
+def json_floats(values):
+    values = np.asarray(values)
+    if values.dtype == np.float32:
+        return [None if v != v else float(str(v)) for v in values]
+    return [None if v != v else v for v in values.tolist()]
+
+
+def window_json(window):
+    return {
+        "resolution": window["resolution"],
+        "buckets": format_times(window["start"]),
+        "count": window["count"].tolist(),
+        "series": {col: {key: json_floats(values) for key, values in stats.items()}
+                   for col, stats in window["series"].items()},
+    }
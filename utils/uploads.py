@@ -0,0 +1,204 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from utils.cache import HASH_BLOCK_SIZE
+
+OBJECTS_FOLDER = 'objects'
+# Bytes of uploads one owner may reference, and of all stored uploads
+USER_QUOTA_BYTES = 2 * 1024 * 1024 * 1024
+TOTAL_QUOTA_BYTES = 20 * 1024 * 1024 * 1024
+# Uploads nobody has touched for this long are deleted
+UPLOAD_TTL = 7 * 24 * 60 * 60
+# Uploads accessed more recently than this are never evicted, so a file is
+# not deleted while the request or job that saved it is still reading it
+EVICTION_GRACE = 10 * 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    dtypes TEXT
+);
+CREATE TABLE IF NOT EXISTS refs (
+    owner TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (owner, hash)
+);
+CREATE INDEX IF NOT EXISTS refs_hash ON refs (hash);
+'''
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+# Uploads stored once per content hash and extension (objects/ab/abcd....csv;
+# the same bytes uploaded as .xlsx are a second file of the same object), with a
+# SQLite index of size, last access and dtype summary per object and of which
+# owners (sessions or clients) reference it under which filename. Each owner
+# is charged for the objects it references; owners over USER_QUOTA_BYTES lose
+# their least recently used references, objects nobody references are
+# deleted, and the whole store is trimmed to TOTAL_QUOTA_BYTES the same way.
+# `on_evict(hash)` is called for each deleted object, to drop copies derived
+# from it.
+class UploadStore:
+    def __init__(self, directory, db_path, user_quota=USER_QUOTA_BYTES, total_quota=TOTAL_QUOTA_BYTES,
+                 ttl=UPLOAD_TTL, grace=EVICTION_GRACE, on_evict=None):
+        self.directory = directory
+        self.db_path = db_path
+        self.user_quota = user_quota
+        self.total_quota = total_quota
+        self.ttl = ttl
+        self.grace = grace
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "deduplicated": 0, "rejected": 0, "evicted": 0, "evicted_bytes": 0}
+        os.makedirs(os.path.join(directory, OBJECTS_FOLDER), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def path(self, content_hash, ext):
+        return os.path.join(self.directory, OBJECTS_FOLDER, content_hash[:2], f"{content_hash}.{ext}")
+
+    # The object's files under every extension it was uploaded with
+    def _paths(self, content_hash):
+        return glob.glob(os.path.join(self.directory, OBJECTS_FOLDER, content_hash[:2], f"{content_hash}.*"))
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    # Streams `stream` to disk in blocks while hashing it and returns
+    # (path, content hash). Content already stored is not written again.
+    # Raises QuotaExceeded, without keeping anything, for uploads larger
+    # than one owner's quota.
+    def save(self, stream, filename, owner):
+        ext = filename.rsplit('.', 1)[-1].lower()
+        tmp = os.path.join(self.directory, OBJECTS_FOLDER, f"{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp, 'wb') as f:
+                for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b''):
+                    size += len(block)
+                    if size > self.user_quota:
+                        self._count("rejected")
+                        raise QuotaExceeded(f"Uploads are limited to {self.user_quota // 2**20} MB")
+                    digest.update(block)
+                    f.write(block)
+            content_hash = digest.hexdigest()
+            path = self.path(content_hash, ext)
+            if os.path.exists(path):
+                self._count("deduplicated")
+                os.remove(tmp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+                self._count("stored")
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT INTO objects (hash, ext, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                         "ON CONFLICT (hash) DO UPDATE SET accessed_at = excluded.accessed_at",
+                         (content_hash, ext, size, now, now))
+            conn.execute("INSERT INTO refs (owner, hash, filename, accessed_at) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (owner, hash) DO UPDATE SET filename = excluded.filename, "
+                         "accessed_at = excluded.accessed_at",
+                         (owner, content_hash, filename, now))
+        self.evict(owner)
+        return path, content_hash
+
+    # Records a use of the upload (by `owner`, when it references it), which
+    # postpones its eviction
+    def touch(self, content_hash, owner=None):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("UPDATE objects SET accessed_at = ? WHERE hash = ?", (now, content_hash))
+            if owner is not None:
+                conn.execute("UPDATE refs SET accessed_at = ? WHERE owner = ? AND hash = ?",
+                             (now, owner, content_hash))
+
+    # {column: dtype} of the parsed upload, recorded once it has been read
+    def describe(self, content_hash, dtypes):
+        with self._connect() as conn:
+            conn.execute("UPDATE objects SET dtypes = ? WHERE hash = ?", (json.dumps(dtypes), content_hash))
+
+    def uploads(self, owner):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT refs.hash, refs.filename, refs.accessed_at, objects.size, objects.dtypes "
+                "FROM refs JOIN objects ON objects.hash = refs.hash WHERE refs.owner = ? "
+                "ORDER BY refs.accessed_at DESC", (owner,)).fetchall()
+        return [dict(row, dtypes=json.loads(row["dtypes"]) if row["dtypes"] else None) for row in rows]
+
+    def evict(self, owner=None):
+        now = time.time()
+        settled = now - self.grace
+        with self._connect() as conn:
+            conn.execute("DELETE FROM refs WHERE accessed_at < ?", (now - self.ttl,))
+            if owner is not None:
+                refs = conn.execute(
+                    "SELECT refs.hash, refs.accessed_at, objects.size FROM refs "
+                    "JOIN objects ON objects.hash = refs.hash WHERE refs.owner = ? "
+                    "ORDER BY refs.accessed_at", (owner,)).fetchall()
+                used = sum(ref["size"] for ref in refs)
+                for ref in refs:
+                    if used <= self.user_quota or ref["accessed_at"] >= settled:
+                        break
+                    conn.execute("DELETE FROM refs WHERE owner = ? AND hash = ?", (owner, ref["hash"]))
+                    used -= ref["size"]
+            unreferenced = conn.execute(
+                "SELECT hash, ext, size FROM objects WHERE accessed_at < ? "
+                "AND hash NOT IN (SELECT hash FROM refs)", (settled,)).fetchall()
+            objects = conn.execute("SELECT hash, ext, size, accessed_at FROM objects ORDER BY accessed_at").fetchall()
+            total = sum(obj["size"] for obj in objects)
+            doomed = {obj["hash"]: obj for obj in unreferenced}
+            total -= sum(obj["size"] for obj in unreferenced)
+            for obj in objects:
+                if total <= self.total_quota or obj["accessed_at"] >= settled:
+                    break
+                if obj["hash"] not in doomed:
+                    doomed[obj["hash"]] = obj
+                    total -= obj["size"]
+            for content_hash in doomed:
+                conn.execute("DELETE FROM refs WHERE hash = ?", (content_hash,))
+                conn.execute("DELETE FROM objects WHERE hash = ?", (content_hash,))
+        for content_hash, obj in doomed.items():
+            for path in self._paths(content_hash):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if self.on_evict is not None:
+                self.on_evict(content_hash)
+            self._count("evicted")
+            self._count("evicted_bytes", obj["size"])
+
+    def stats(self):
+        with self._connect() as conn:
+            objects, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+            owners, referenced = conn.execute(
+                "SELECT COUNT(DISTINCT owner), COALESCE(SUM(objects.size), 0) FROM refs "
+                "JOIN objects ON objects.hash = refs.hash").fetchone()
+        with self._lock:
+            stats = dict(self.counters)
+        stats.update(objects=objects, bytes=size, owners=owners, referenced_bytes=referenced)
+        return stats